@@ -2,29 +2,57 @@
 #
 # DB(ocr_data) 실제 컬럼: ocr_text, answers, user_answers, quiz_html (모두 jsonb)
 # - ocr_text (jsonb): { "pages": [...], "blanks": [...], "quiz": {} }
+#   pages[i].geometry: 단어 좌표 (service/ocr_geometry_service.py) — OCR 응답의 ocr_id 로 /study/grade 가 서버 보관분을 저장
+#   (보관분이 없으면 OCR 응답 때 서명한 geometry 를 클라이언트가 돌려보낸 경우에만 저장)
+#   → GET /ocr/quiz/{id}/text 로 영역 텍스트 조회
 # - answers (jsonb): 정답 배열 [ "단어1", "단어2", ... ]
 # - user_answers (jsonb): 사용자 작성 답변 [ "답1", "답2", ... ]
 # - quiz_html (jsonb): 퀴즈 메타 { "raw": "..." }
 
-import io
+import asyncio
 import json
 from fastapi import APIRouter, UploadFile, File, Form, Body, Depends, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, Iterator, List, Optional, Any, Tuple, Union
 import os
-from PIL import Image
 from core.database import supabase
 
-from service.clova_ocr_service import CLOVAOCRService
+from service.clova_ocr_service import KEYWORD_MODE_LOCAL, KEYWORD_SOURCE_LOCAL, CLOVAOCRService
 
 
 from service.ocr_usage_service import (
     OCR_PAGE_LIMIT,
-    estimate_page_count,
     get_user_ocr_usage,
     add_ocr_usage,
     check_can_use,
 )
+from service.ocr_job_service import OCRJobQueueFullError, get_job, submit_job
+from service.image_preprocess_service import (
+    OCR_AUTO_CROP,
+    OCR_MAX_REGIONS,
+    crop_and_preprocess,
+    crop_regions_to_canvas,
+    get_preprocess_stats,
+    preprocess_image,
+    record_preprocess,
+)
+from service.image_quality_service import (
+    OCR_QUALITY_MODE,
+    ImageQualityError,
+    assess_image_quality,
+    get_quality_stats,
+    record_quality,
+)
+from service.compute_service import ComputeBusyError, ComputeTimeoutError, get_compute_stats, run_compute, run_compute_async
+from service.ocr_cache_service import OCR_CACHE_COUNT_HITS, make_cache_key, ocr_result_cache
+from service.keyword_cache_service import keyword_cache
+from service.keyword_router_service import keyword_router
+from service.resilience_service import get_upstream_stats
+from service.ocr_geometry_service import geometry_store, sign_geometry, text_in_rect
+from service.pdf_service import count_pdf_pages, is_pdf, parse_page_selection, select_pages
+from service.upload_service import UploadTooLargeError, get_upload_stats, spool_upload
 
 
 from app.security_app import get_current_user
@@ -89,36 +117,416 @@ async def get_ocr_usage(email: str = Depends(get_current_user)):
     }
 
 
-# 예상 소요 시간 반환
+def _page_spec(pages: Optional[str], page_range: Optional[str]) -> Optional[str]:
+    """pages("1,3,5") / page_range("2-10") Form 값을 하나의 선택 문자열로 합침 (둘 다 없으면 None)"""
+    parts = [v.strip() for v in (pages, page_range) if v and v.strip()]
+    return ",".join(parts) or None
+
+
+def _flag(value: Optional[str], default: bool) -> bool:
+    """Form 불리언 값 (1/true/yes/on) — 비어 있으면 default"""
+    if value is None or not str(value).strip():
+        return default
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
+def _keyword_mode(value: Optional[str]) -> Optional[str]:
+    """keyword_mode Form 값: fast(또는 local)면 GPT 없이 로컬 키워드 추출, 그 외(비어 있음 포함)는 기본 모드"""
+    if value and value.strip().lower() in ("fast", KEYWORD_MODE_LOCAL):
+        return KEYWORD_MODE_LOCAL
+    return None
+
+
+def _too_large_response(e: UploadTooLargeError) -> JSONResponse:
+    return JSONResponse(status_code=413, content={"status": "error", "message": str(e)})
+
+
+def _estimate_pages(file_bytes, filename: str) -> int:
+    """OCR 전 페이지 수 추정 (PDF: CPU 프로세스 풀에서 페이지 트리 /Count 읽기, 읽을 수 없으면 1 / 이미지: 1)"""
+    if not is_pdf(filename):
+        return 1
+    try:
+        return run_compute(count_pdf_pages, file_bytes)
+    except (ComputeBusyError, ComputeTimeoutError):
+        raise
+    except Exception:
+        return 1
+
+
+async def _estimate_pages_async(file_bytes, filename: str) -> int:
+    """_estimate_pages의 async 버전 (async 핸들러에서 이벤트 루프를 막지 않음)"""
+    if not is_pdf(filename):
+        return 1
+    try:
+        return await run_compute_async(count_pdf_pages, file_bytes)
+    except (ComputeBusyError, ComputeTimeoutError):
+        raise
+    except Exception:
+        return 1
+
+
+# 예상 소요 시간 반환 (pages/page_range 지정 시 선택한 페이지만 계산)
 @app.post("/ocr/estimate")
-async def get_estimate(file: UploadFile = File(...)):
-    # 가볍게 파일 정보만 읽어서 시간 계산
-    file_bytes = await file.read()
-    filename = file.filename or "image.jpg"
-    page_count = estimate_page_count(file_bytes, filename)
+async def get_estimate(
+    file: UploadFile = File(...),
+    pages: Optional[str] = Form(None),
+    page_range: Optional[str] = Form(None),
+):
+    # 가볍게 파일 정보만 읽어서 시간 계산 (임시 파일 스풀링 + mmap, 페이지 트리 /Count만 읽음)
+    try:
+        upload = await spool_upload(file)
+    except UploadTooLargeError as e:
+        return _too_large_response(e)
+    with upload:
+        filename = upload.filename
+        spec = _page_spec(pages, page_range)
+        try:
+            page_count = await _estimate_pages_async(upload.open_map(), filename)
+            if spec and is_pdf(filename):
+                page_count = len(parse_page_selection(spec, page_count))
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
+        except (ComputeBusyError, ComputeTimeoutError) as e:
+            return {"status": "busy", "message": str(e)}
     result_msg = f"약 {page_count}페이지 분량" if page_count else "1페이지 미만"
     return {"estimated_time": result_msg}
 
-def _crop_image_to_region(file_bytes: bytes, filename: str, px: int, py: int, pw: int, ph: int) -> bytes:
-    """원본 이미지에서 (px, py) 크기 (pw, ph) 영역만 잘라 bytes로 반환. 좌표는 원본 픽셀 기준."""
-    img = Image.open(io.BytesIO(file_bytes)).convert("RGB")
-    w, h = img.size
-    # 경계 클램프
-    x1 = max(0, min(px, w - 1))
-    y1 = max(0, min(py, h - 1))
-    x2 = max(x1 + 1, min(px + pw, w))
-    y2 = max(y1 + 1, min(py + ph, h))
-    cropped = img.crop((x1, y1, x2, y2))
-    buf = io.BytesIO()
-    ext = (filename or "").split(".")[-1].lower()
-    if ext == "png":
-        cropped.save(buf, format="PNG")
+def _crop_image_to_region(file_bytes: bytes, filename: str, px: int, py: int, pw: int, ph: int) -> Tuple[bytes, str, Dict[str, Any]]:
+    """원본 이미지에서 (px, py) 크기 (pw, ph) 영역만 잘라 전처리 후 (bytes, filename, info) 반환. 좌표는 원본 픽셀 기준.
+    디코딩·crop·재인코딩은 CPU 프로세스 풀에서 실행."""
+    file_bytes, filename, info = run_compute(crop_and_preprocess, file_bytes, filename, px, py, pw, ph)
+    record_preprocess(info)
+    return file_bytes, filename, info
+
+
+def _parse_regions(regions: Optional[str]) -> List[Tuple[int, int, int, int]]:
+    """
+    regions Form 값(JSON 배열) → [(x, y, width, height), ...] (원본 픽셀 기준).
+    각 항목은 {"x", "y", "width", "height"} 객체 또는 [x, y, width, height] 배열. 형식 오류는 ValueError.
+    """
+    if not regions or not regions.strip():
+        return []
+    try:
+        items = json.loads(regions)
+    except ValueError:
+        raise ValueError("regions는 JSON 배열이어야 합니다. 예: [{\"x\": 0, \"y\": 0, \"width\": 100, \"height\": 50}]")
+    if not isinstance(items, list):
+        raise ValueError("regions는 JSON 배열이어야 합니다.")
+    if len(items) > OCR_MAX_REGIONS:
+        raise ValueError(f"영역은 최대 {OCR_MAX_REGIONS}개까지 지정할 수 있습니다.")
+
+    parsed = []
+    for i, item in enumerate(items):
+        try:
+            if isinstance(item, dict):
+                values = (item["x"], item["y"], item["width"], item["height"])
+            else:
+                values = tuple(item)
+            x, y, w, h = (int(float(v)) for v in values)
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"{i + 1}번째 영역 형식이 올바르지 않습니다.")
+        if w <= 0 or h <= 0:
+            raise ValueError(f"{i + 1}번째 영역의 너비/높이는 0보다 커야 합니다.")
+        parsed.append((x, y, w, h))
+    return parsed
+
+
+def _check_image_quality(file_bytes, filename: str, info: Dict[str, Any]) -> None:
+    """
+    Clova로 보낼 이미지의 로컬 품질 검사 (OCR_QUALITY_MODE). PDF는 검사하지 않음.
+    reject 모드에서 기준 미달이면 ImageQualityError, warn 모드면 info["quality"]에 결과를 남겨 summary에 표시.
+    검사용 프로세스 풀이 혼잡하면 검사를 건너뜀 (OCR 자체는 진행).
+    """
+    if OCR_QUALITY_MODE not in ("warn", "reject") or is_pdf(filename):
+        return
+    try:
+        report = run_compute(assess_image_quality, file_bytes, filename)
+    except (ComputeBusyError, ComputeTimeoutError) as e:
+        print(f"⚠️ 이미지 품질 검사 생략: {e}")
+        return
+    rejected = not report["ok"] and OCR_QUALITY_MODE == "reject"
+    record_quality(report, rejected)
+    if report["ok"]:
+        return
+    print(f"⚠️ 이미지 품질 기준 미달 ({'거부' if rejected else '경고'}): {[i['code'] for i in report['issues']]} {report['metrics']}")
+    if rejected:
+        raise ImageQualityError(report)
+    info["quality"] = report
+
+
+def _quality_error_response(e: ImageQualityError) -> Dict[str, Any]:
+    return {"status": "error", "code": "low_quality", "message": str(e), "quality": e.report}
+
+
+def _prepare_ocr_input(
+    file_bytes: bytes,
+    filename: str,
+    crop_x: Optional[str],
+    crop_y: Optional[str],
+    crop_width: Optional[str],
+    crop_height: Optional[str],
+    page_spec: Optional[str] = None,
+    regions: Optional[str] = None,
+    auto_crop: Optional[str] = None,
+) -> Tuple[bytes, str, Dict[str, Any]]:
+    """
+    Clova로 보낼 최종 (bytes, filename, info) 반환. file_bytes는 bytes 또는 스풀링된 업로드의 mmap.
+    PDF에 page_spec이 오면 선택한 페이지만 남긴 PDF (info["selected_pages"]: 원본 페이지 번호, 1부터).
+    이미지에 regions(JSON 배열)가 오면 영역들을 캔버스 한 장에 이어 붙임 (info["regions"], info["tiles"]).
+    crop 좌표가 모두 오면 해당 영역만 잘라 전처리, 없으면 전체 이미지 전처리 (EXIF 방향·축소·재인코딩).
+    crop이 없고 auto_crop(미지정 시 OCR_AUTO_CROP)이 켜져 있으면 글자 영역을 감지해 배경을 잘라냄 (info["detected_box"]).
+    이미지는 Clova로 보내기 전에 품질 검사 (_check_image_quality, reject 모드 기준 미달 시 ImageQualityError).
+    잘못된 페이지 선택/영역은 ValueError. PDF·이미지 처리는 CPU 프로세스 풀에서 실행 (혼잡/시간 초과 시 ComputeBusyError/ComputeTimeoutError).
+    """
+    # 페이지 선택: Clova·GPT·사용량 계산 모두 선택한 페이지만 대상
+    if page_spec and is_pdf(filename):
+        file_bytes, indices = run_compute(select_pages, file_bytes, page_spec)
+        print(f"✅ PDF 페이지 선택: {page_spec} → {len(indices)}페이지")
+        return file_bytes, filename, {"selected_pages": [idx + 1 for idx in indices]}
+
+    # 여러 영역: 한 번 디코딩해서 잘라 캔버스 한 장으로 → Clova 1회 호출, 결과는 영역별 page로 분리
+    boxes = _parse_regions(regions) if not is_pdf(filename) else []
+    if len(boxes) > 1:
+        file_bytes, filename, info = run_compute(crop_regions_to_canvas, file_bytes, filename, boxes)
+        record_preprocess(info)
+        info["regions"] = [list(box) for box in boxes]
+        print(f"✅ 여러 영역 OCR: {len(boxes)}개 영역 → 캔버스 {info['size']}, {len(file_bytes)} bytes")
+        _check_image_quality(file_bytes, filename, info)
+        return file_bytes, filename, info
+    if boxes:
+        # 영역이 하나면 기존 crop과 동일
+        crop_x, crop_y, crop_width, crop_height = (str(v) for v in boxes[0])
+
+    # 수신한 crop 값 로그 (디버깅)
+    print(f"[OCR] 수신 crop_x={crop_x!r}, crop_y={crop_y!r}, crop_width={crop_width!r}, crop_height={crop_height!r}")
+
+    # 이미지 좌표( crop )가 오면 그 영역만 잘라서 OCR — 전체 이미지 사용 안 함
+    if all(v is not None and str(v).strip() != "" for v in (crop_x, crop_y, crop_width, crop_height)):
+        try:
+            px, py, pw, ph = int(float(crop_x)), int(float(crop_y)), int(float(crop_width)), int(float(crop_height))
+            if pw > 0 and ph > 0:
+                print(f"✅ OCR crop 수신: px={px}, py={py}, pw={pw}, ph={ph} → 좌표 영역만 OCR")
+                # 잘린 이미지 포맷에 맞춰 파일명 변경 (Clova 포맷 인식용)
+                file_bytes, filename, info = _crop_image_to_region(file_bytes, filename, px, py, pw, ph)
+                print(f"✅ crop 적용 완료, 좌표 영역만 추출 대상. 크기: {len(file_bytes)} bytes")
+                if boxes:
+                    info["regions"] = [list(boxes[0])]
+                _check_image_quality(file_bytes, filename, info)
+                return file_bytes, filename, info
+            else:
+                print(f"⚠️ OCR crop 무시 (pw 또는 ph 0): pw={pw}, ph={ph}")
+        except (ValueError, TypeError) as e:
+            print(f"⚠️ OCR crop 파싱 실패: {e}")
+
+    if is_pdf(filename):
+        return file_bytes, filename, {}
+    file_bytes, filename, info = run_compute(preprocess_image, file_bytes, filename, _flag(auto_crop, OCR_AUTO_CROP))
+    record_preprocess(info)
+    if info.get("detected_box"):
+        print(f"✅ 자동 영역 감지: {info['detected_box']} → {info['size']}, {len(file_bytes)} bytes")
+    _check_image_quality(file_bytes, filename, info)
+    return file_bytes, filename, info
+
+
+def _limit_reached_response(used: int) -> Dict[str, Any]:
+    return {
+        "status": "limit_reached",
+        "message": "이용가능한 무료 횟수를 다 사용하셨습니다",
+        "pages_used": used,
+        "pages_limit": OCR_PAGE_LIMIT,
+    }
+
+
+def _billable_pages(result: Dict[str, Any]) -> int:
+    """사용량 차감 페이지 수: Clova로 보낸 페이지만 (PDF 텍스트 레이어 페이지는 제외)"""
+    return result.get("ocr_page_count", result.get("page_count", 1))
+
+
+def _geometry_transform(info: Dict[str, Any], page_index: int) -> Dict[str, Any]:
+    """
+    Clova 입력 이미지 좌표 → 업로드 원본 좌표 변환 정보 (원본 = origin + 좌표 / scale).
+    여러 영역은 영역마다 자른 위치와 캔버스 안 크기 비율, crop은 자른 위치와 축소 비율, 전체 이미지는 축소 비율만.
+    """
+    tiles, boxes = info.get("tiles"), info.get("boxes")
+    if tiles and boxes:
+        box, tile = boxes[page_index], tiles[page_index]
+        origin, scale = box[:2], (tile[2] - tile[0]) / max(1, box[2] - box[0])
+    elif info.get("box"):
+        origin, scale = info["box"][:2], info.get("scale", 1.0)
     else:
-        cropped.save(buf, format="JPEG", quality=95)
-    return buf.getvalue()
+        origin, scale = [0, 0], info.get("scale", 1.0)
+    return {"origin": list(origin), "scale": round(float(scale), 6), "rotated": bool(info.get("rotated"))}
+
+
+def _annotate_pages(event: Dict[str, Any], info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    _prepare_ocr_input 정보를 이벤트에 표시 (캐시에는 저장 안 함).
+    - 페이지 선택: page → page_number(원본 페이지 번호), summary → selected_pages
+    - 여러 영역: page → region([x, y, width, height] 원본 좌표), summary → region_count
+    - 단어 좌표: page.geometry 에 원본 좌표 변환 정보(origin/scale/rotated) 추가
+    - 품질 경고(warn 모드): summary → quality_warnings
+    - 자동 영역 감지: summary → detected_box([x, y, width, height] 원본 좌표)
+    """
+    page_numbers, regions = info.get("selected_pages"), info.get("regions")
+    if event["event"] == "page":
+        extra = {}
+        if page_numbers:
+            extra["page_number"] = page_numbers[event["page_index"]]
+        if regions:
+            extra["region"] = regions[event["page_index"]]
+        if event.get("geometry"):
+            # 캐시된 결과를 바꾸지 않도록 새 dict로
+            extra["geometry"] = {**event["geometry"], **_geometry_transform(info, event["page_index"])}
+        return {**event, **extra} if extra else event
+    if event["event"] == "summary":
+        extra = {}
+        if page_numbers:
+            extra["selected_pages"] = page_numbers
+        if regions:
+            extra["region_count"] = len(regions)
+        if info.get("quality"):
+            extra["quality_warnings"] = info["quality"]["issues"]
+        if info.get("detected_box"):
+            extra["detected_box"] = info["detected_box"]
+        return {**event, **extra} if extra else event
+    return event
+
+
+def _iter_ocr_pipeline(
+    email: str,
+    file_bytes: bytes,
+    filename: str,
+    progress_callback=None,
+    info: Optional[Dict[str, Any]] = None,
+    keyword_mode: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    _iter_ocr_results 이벤트를 그대로 내보내면서 페이지 텍스트·단어 좌표를 geometry_store 에 보관,
+    summary 에 ocr_id 추가 (/study/grade 가 ocr_id 로 서버가 만든 geometry 를 ocr_text 에 저장).
+    page.geometry 에는 서명(sig)을 붙임 → 보관분이 없는 워커에서도 /study/grade 가 돌려받은 geometry 를 검증해 저장.
+    """
+    pages: Dict[int, Dict[str, Any]] = {}
+    for event in _iter_ocr_results(
+        email, file_bytes, filename, progress_callback=progress_callback, info=info, keyword_mode=keyword_mode
+    ):
+        if event["event"] == "page":
+            if event.get("geometry"):
+                event = {**event, "geometry": sign_geometry(email, event.get("original_text"), event["geometry"])}
+            pages[event["page_index"]] = {"original_text": event.get("original_text"), "geometry": event.get("geometry")}
+        elif event["event"] == "summary" and any(page["geometry"] for page in pages.values()):
+            stored = [pages.get(idx) for idx in range(max(pages) + 1)]
+            event = {**event, "ocr_id": geometry_store.put(email, stored)}
+        yield event
+
+
+def _iter_ocr_results(
+    email: str,
+    file_bytes: bytes,
+    filename: str,
+    progress_callback=None,
+    info: Optional[Dict[str, Any]] = None,
+    keyword_mode: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    사용량 체크 → (캐시 조회) → Clova OCR + GPT 키워드 → 사용량 저장까지 실행하며 이벤트를 yield (동기, 스레드/워커에서 호출).
+    이벤트: page / summary / error (CLOVAOCRService.iter_process_file 과 동일) + limit_reached
+    info: _prepare_ocr_input 정보 — 여러 영역 캔버스면 tiles로 영역별 분리, 페이지 선택/영역 정보는 이벤트에 표시.
+    keyword_mode: _keyword_mode 결과 (local이면 로컬 키워드 추출, 사용자의 이전 학습 자료를 코퍼스로 사용)
+    """
+    info = info or {}
+    tiles = info.get("tiles")
+    # 같은 bytes(crop 적용 후)로 이미 처리한 결과가 있으면 Clova·GPT 호출 없이 반환
+    cache_key = None
+    if ocr_result_cache is not None:
+        version = clova_service.cache_version()
+        if tiles:
+            # 캔버스는 영역 분할 방식까지 같아야 같은 결과
+            version = f"{version}|tiles={json.dumps(tiles)}"
+        if keyword_mode == KEYWORD_MODE_LOCAL:
+            version = f"{version}|kw=local"
+        cache_key = make_cache_key(file_bytes, filename, version)
+        cached = ocr_result_cache.get(cache_key)
+        if cached is not None:
+            print(f"⚡ OCR 캐시 적중: {cache_key[:12]}")
+            billable = _billable_pages(cached)
+            if OCR_CACHE_COUNT_HITS and billable > 0:
+                can_use, used = check_can_use(email, billable)
+                if not can_use:
+                    yield {"event": "limit_reached", **_limit_reached_response(used)}
+                    return
+                add_ocr_usage(email, billable)
+            for idx, page in enumerate(cached.get("pages", [])):
+                yield _annotate_pages({"event": "page", "page_index": idx, **page}, info)
+            summary = {k: v for k, v in cached.items() if k not in ("status", "pages")}
+            yield _annotate_pages({"event": "summary", **summary, "cached": True}, info)
+            return
+
+    # 사용량 한도 체크 (OCR 호출 전)
+    estimated = _estimate_pages(file_bytes, filename)
+    can_use, used = check_can_use(email, estimated)
+    if not can_use:
+        yield {"event": "limit_reached", **_limit_reached_response(used)}
+        return
+
+    # 네이버 OCR: crop 이 있으면 잘린 영역 이미지만 전달 → 좌표 영역에서 추출한 텍스트만 결과로 반환
+    events = []
+    for event in clova_service.iter_process_file(
+        file_bytes, filename, progress_callback=progress_callback, tiles=tiles,
+        keyword_mode=keyword_mode, corpus_key=email,
+    ):
+        events.append(event)
+        if event["event"] == "summary":
+            result = CLOVAOCRService.result_from_events(events)
+            print(f"ocr 결과:{result}")
+            # OCR 실패 페이지가 섞인 부분 결과, GPT 대신 로컬 키워드로 대체된 결과는 캐시하지 않음 (다음 업로드에서 재시도)
+            complete = all(
+                p.get("source") != "failed"
+                and (keyword_mode == KEYWORD_MODE_LOCAL or p.get("keyword_source") != KEYWORD_SOURCE_LOCAL)
+                for p in result.get("pages", [])
+            )
+            if cache_key is not None and complete:
+                ocr_result_cache.put(cache_key, result)
+            # 사용량 DB 저장 (summary를 내보내기 전에 반영, 텍스트 레이어 페이지는 차감 안 함)
+            billable = _billable_pages(result)
+            if billable > 0:
+                add_ocr_usage(email, billable)
+        yield _annotate_pages(event, info)
+
+
+def _run_ocr_pipeline(
+    email: str,
+    file_bytes: bytes,
+    filename: str,
+    progress_callback=None,
+    info: Optional[Dict[str, Any]] = None,
+    keyword_mode: Optional[str] = None,
+) -> Dict[str, Any]:
+    """_iter_ocr_pipeline 결과를 모아 /ocr 응답 본문으로 반환."""
+    events = list(_iter_ocr_pipeline(
+        email, file_bytes, filename, progress_callback=progress_callback, info=info, keyword_mode=keyword_mode
+    ))
+    last = events[-1] if events else {"event": "error", "message": "OCR 처리 결과가 없습니다."}
+    if last["event"] == "limit_reached":
+        return {k: v for k, v in last.items() if k != "event"}
+
+    result = CLOVAOCRService.result_from_events(events)
+    if result["status"] == "error":
+        return result
+
+    # 응답: 잘린 영역에서 추출한 텍스트(original_text, keywords)만 반환. 이미지 bytes는 반환하지 않음.
+    return {"status": "success", "data": result}
+
+
+def _format_stream_event(event: Dict[str, Any], stream_format: str) -> str:
+    """NDJSON: 한 줄에 이벤트 하나 / SSE: event 이름 + data 줄"""
+    data = json.dumps(event, ensure_ascii=False)
+    if stream_format == "sse":
+        return f"event: {event.get('event', 'message')}\ndata: {data}\n\n"
+    return data + "\n"
 
 
 # 1. OCR 텍스트 추출 엔드포인트 (crop: 프론트에서 전달 시 잘린 영역만 OCR)
+# Clova/GPT 호출은 동기(blocking)이므로 스레드에서 실행해 이벤트 루프를 막지 않음
 @app.post("/ocr")
 async def run_ocr_endpoint(
     file: UploadFile = File(...),
@@ -127,61 +535,164 @@ async def run_ocr_endpoint(
     crop_y: Optional[str] = Form(None),
     crop_width: Optional[str] = Form(None),
     crop_height: Optional[str] = Form(None),
+    pages: Optional[str] = Form(None),
+    page_range: Optional[str] = Form(None),
+    regions: Optional[str] = Form(None),
+    auto_crop: Optional[str] = Form(None),
+    keyword_mode: Optional[str] = Form(None),
 ):
     try:
-        file_bytes = await file.read()
-        filename = file.filename or "image.jpg"
+        upload = await spool_upload(file)
+    except UploadTooLargeError as e:
+        return _too_large_response(e)
 
-        # 수신한 crop 값 로그 (디버깅)
-        print(f"[OCR] 수신 crop_x={crop_x!r}, crop_y={crop_y!r}, crop_width={crop_width!r}, crop_height={crop_height!r}")
+    try:
+        with upload:
+            file_bytes, filename, info = await asyncio.to_thread(
+                _prepare_ocr_input, upload.open_map(), upload.filename,
+                crop_x, crop_y, crop_width, crop_height, _page_spec(pages, page_range), regions, auto_crop
+            )
+            return await asyncio.to_thread(
+                _run_ocr_pipeline, email, file_bytes, filename, None, info, _keyword_mode(keyword_mode)
+            )
+
+    except ImageQualityError as e:
+        return _quality_error_response(e)
+    except Exception as e:
+        print(f"서버 내부 에러: {e}")
+        return {"status": "error", "message": str(e)}
 
-        # 이미지 좌표( crop )가 오면 그 영역만 잘라서 OCR — 전체 이미지 사용 안 함
-        if all(v is not None and str(v).strip() != "" for v in (crop_x, crop_y, crop_width, crop_height)):
-            try:
-                px, py, pw, ph = int(float(crop_x)), int(float(crop_y)), int(float(crop_width)), int(float(crop_height))
-                if pw > 0 and ph > 0:
-                    print(f"✅ OCR crop 수신: px={px}, py={py}, pw={pw}, ph={ph} → 좌표 영역만 OCR")
-                    file_bytes = _crop_image_to_region(file_bytes, filename, px, py, pw, ph)
-                    # 잘린 이미지 포맷에 맞춰 파일명 변경 (Clova 포맷 인식용)
-                    ext = (filename or "").split(".")[-1].lower()
-                    filename = f"cropped.{'png' if ext == 'png' else 'jpg'}"
-                    print(f"✅ crop 적용 완료, 좌표 영역만 추출 대상. 크기: {len(file_bytes)} bytes")
-                else:
-                    print(f"⚠️ OCR crop 무시 (pw 또는 ph 0): pw={pw}, ph={ph}")
-            except (ValueError, TypeError) as e:
-                print(f"⚠️ OCR crop 파싱 실패: {e}")
-
-        # 사용량 한도 체크 (OCR 호출 전)
-        estimated = estimate_page_count(file_bytes, filename)
-        can_use, used = check_can_use(email, estimated)
-        if not can_use:
-            return {
-                "status": "limit_reached",
-                "message": "이용가능한 무료 횟수를 다 사용하셨습니다",
-                "pages_used": used,
-                "pages_limit": OCR_PAGE_LIMIT,
-            }
-
-        # 네이버 OCR: crop 이 있으면 잘린 영역 이미지만 전달 → 좌표 영역에서 추출한 텍스트만 결과로 반환
-        result = clova_service.process_file(file_bytes, filename)
-        print(f"ocr 결과:{result}")
-
-        if result["status"] == "error":
-            return result
-
-        # 사용량 DB 저장
-        page_count = result.get("page_count", 1)
-        add_ocr_usage(email, page_count)
-
-        # 응답: 잘린 영역에서 추출한 텍스트(original_text, keywords)만 반환. 이미지 bytes는 반환하지 않음.
-        return {"status": "success", "data": result}
 
+# 1-1. OCR 작업 제출 (비동기 모드): 즉시 job_id 반환, 결과는 GET /ocr/jobs/{job_id}로 폴링
+@app.post("/ocr/jobs")
+async def submit_ocr_job(
+    file: UploadFile = File(...),
+    email: str = Depends(get_current_user),
+    crop_x: Optional[str] = Form(None),
+    crop_y: Optional[str] = Form(None),
+    crop_width: Optional[str] = Form(None),
+    crop_height: Optional[str] = Form(None),
+    pages: Optional[str] = Form(None),
+    page_range: Optional[str] = Form(None),
+    regions: Optional[str] = Form(None),
+    auto_crop: Optional[str] = Form(None),
+    keyword_mode: Optional[str] = Form(None),
+):
+    try:
+        upload = await spool_upload(file)
+    except UploadTooLargeError as e:
+        return _too_large_response(e)
+
+    try:
+        page_spec = _page_spec(pages, page_range)
+
+        # 임시 파일은 작업이 끝날 때 정리 (요청 응답 후에도 워커가 읽음)
+        def job(report):
+            with upload:
+                report("prepare")
+                try:
+                    data, name, info = _prepare_ocr_input(
+                        upload.open_map(), upload.filename, crop_x, crop_y, crop_width, crop_height, page_spec, regions,
+                        auto_crop,
+                    )
+                except ImageQualityError as e:
+                    return _quality_error_response(e)
+                return _run_ocr_pipeline(
+                    email, data, name, progress_callback=report, info=info, keyword_mode=_keyword_mode(keyword_mode)
+                )
+
+        job_id = submit_job(email, job)
+        return {"status": "queued", "job_id": job_id, "poll_url": f"/ocr/jobs/{job_id}"}
+
+    except OCRJobQueueFullError as e:
+        upload.close()
+        return {"status": "busy", "message": str(e)}
     except Exception as e:
-        print(f"서버 내부 에러: {e}")
+        upload.close()
+        print(f"OCR 작업 등록 에러: {e}")
         return {"status": "error", "message": str(e)}
 
 
+# 1-2. OCR 작업 상태/결과 조회 — state: queued | running | done | error
+@app.get("/ocr/jobs/{job_id}")
+async def get_ocr_job(job_id: str, email: str = Depends(get_current_user)):
+    job = get_job(job_id, email)
+    if not job:
+        return {"status": "error", "message": "작업을 찾을 수 없습니다."}
+    return {"status": "success", "data": job}
+
+
+
+
+# 1-3. OCR 스트리밍: 페이지가 끝나는 대로 page 이벤트, 마지막에 summary(page_count, total_duration) 전송
+# format=ndjson(기본, application/x-ndjson) | sse(text/event-stream)
+# 이벤트를 page_index 순으로 모으면 /ocr 응답의 data.pages 와 동일
+@app.post("/ocr/stream")
+async def stream_ocr_endpoint(
+    file: UploadFile = File(...),
+    email: str = Depends(get_current_user),
+    crop_x: Optional[str] = Form(None),
+    crop_y: Optional[str] = Form(None),
+    crop_width: Optional[str] = Form(None),
+    crop_height: Optional[str] = Form(None),
+    pages: Optional[str] = Form(None),
+    page_range: Optional[str] = Form(None),
+    regions: Optional[str] = Form(None),
+    auto_crop: Optional[str] = Form(None),
+    keyword_mode: Optional[str] = Form(None),
+    format: str = Form("ndjson"),
+):
+    try:
+        upload = await spool_upload(file)
+    except UploadTooLargeError as e:
+        return _too_large_response(e)
+    # 응답을 만들기 전에 실패하면 여기서 바로 정리 (이후 정리는 제너레이터 finally / BackgroundTask)
+    try:
+        stream_format = "sse" if (format or "").strip().lower() == "sse" else "ndjson"
+        page_spec = _page_spec(pages, page_range)
+        mode = _keyword_mode(keyword_mode)
+
+        # 동기 제너레이터 → StreamingResponse가 스레드풀에서 순회하므로 이벤트 루프를 막지 않음
+        def event_stream():
+            try:
+                data, name, info = _prepare_ocr_input(
+                    upload.open_map(), upload.filename, crop_x, crop_y, crop_width, crop_height,
+                    page_spec, regions, auto_crop
+                )
+                for event in _iter_ocr_pipeline(email, data, name, info=info, keyword_mode=mode):
+                    yield _format_stream_event(event, stream_format)
+            except ImageQualityError as e:
+                yield _format_stream_event({"event": "error", **_quality_error_response(e)}, stream_format)
+            except Exception as e:
+                print(f"OCR 스트리밍 에러: {e}")
+                yield _format_stream_event({"event": "error", "message": str(e)}, stream_format)
+            finally:
+                upload.close()
+
+        # 제너레이터가 한 번도 순회되지 않은 채 끝나면(첫 이벤트 전 클라이언트 끊김 등) finally가 실행되지 않음
+        # → 응답이 끝날 때 BackgroundTask로 한 번 더 정리 (close는 여러 번 호출해도 안전)
+        media_type = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+        return StreamingResponse(event_stream(), media_type=media_type, background=BackgroundTask(upload.close))
+    except Exception as e:
+        upload.close()
+        print(f"OCR 스트리밍 에러: {e}")
+        return {"status": "error", "message": str(e)}
+
 
+# OCR 파이프라인 지표 (캐시 적중률 등) — 모니터링용
+@app.get("/ocr/metrics")
+async def get_ocr_metrics():
+    return {
+        "status": "success",
+        "cache": ocr_result_cache.stats() if ocr_result_cache is not None else None,
+        "keyword_cache": keyword_cache.stats() if keyword_cache is not None else None,
+        "keyword_routing": keyword_router.stats(),
+        "upstreams": get_upstream_stats(),
+        "preprocess": get_preprocess_stats(),
+        "upload": get_upload_stats(),
+        "compute": get_compute_stats(),
+        "quality": get_quality_stats(),
+    }
 
 
 # 복습 시 퀴즈 데이터 JSON으로 가져오기 (앱에서 ScaffoldingPayload 형태로 사용)
@@ -238,6 +749,49 @@ async def get_quiz_for_review(quiz_id: int, email: str = Depends(get_current_use
         return {"status": "error", "message": str(e)}
 
 
+# 저장된 단어 좌표로 사각형 영역 안 텍스트 조회 (Clova 재호출·사용량 차감 없음)
+@app.get("/ocr/quiz/{quiz_id}/text")
+async def get_text_in_rect(
+    quiz_id: int,
+    x: float = Query(..., description="영역 왼쪽 x"),
+    y: float = Query(..., description="영역 위쪽 y"),
+    width: float = Query(..., gt=0),
+    height: float = Query(..., gt=0),
+    page_index: int = Query(0, ge=0, description="ocr_text.pages 인덱스"),
+    space: str = Query("original", description="좌표 기준: original(업로드 원본) | ocr(Clova 입력 이미지)"),
+    email: str = Depends(get_current_user),
+):
+    try:
+        res = (
+            supabase.table("ocr_data")
+            .select("ocr_text")
+            .eq("id", quiz_id)
+            .eq("user_email", email)
+            .single()
+            .execute()
+        )
+        if not res.data:
+            return {"status": "error", "message": "데이터를 찾을 수 없습니다."}
+
+        pages = (res.data.get("ocr_text") or {}).get("pages") or []
+        if page_index >= len(pages):
+            return {"status": "error", "message": f"페이지 {page_index}가 없습니다. (전체 {len(pages)}페이지)"}
+        page = pages[page_index]
+        if not page.get("geometry"):
+            return {"status": "error", "message": "단어 좌표가 저장되지 않은 페이지입니다. (텍스트 레이어 페이지 또는 이전 OCR 결과)"}
+
+        found = text_in_rect(page.get("original_text", ""), page["geometry"], (x, y, width, height), space=space)
+        return {
+            "status": "success",
+            "data": {"page_index": page_index, "word_count": len(found["words"]), **found},
+        }
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    except Exception as e:
+        print(f"영역 텍스트 조회 에러: {e}")
+        return {"status": "error", "message": str(e)}
+
+
 # 해당 학습 삭제 로직 /ocr/ocr-data/delete/{학습파일 번호}
 @app.delete("/ocr/ocr-data/delete/{quiz_id}")
 async def delete_ocr_data(quiz_id: int, email: str = Depends(get_current_user)):
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, Form
 from core.database import supabase
-from datetime import date, datetime
 from typing import Tuple, Optional
 
 from app.security_app import get_current_user
+from service.activity_service import kst_midnight, kst_today
+from service.points_service import PointsError, award_points
 
 
 app = APIRouter(tags=["Reward"])
@@ -17,40 +18,19 @@ def _auto_attendance_check(email: str) -> Tuple[bool, int]:
     앱 실행 시 자동 출석체크: rewards DB에 당일 출석체크 row가 없으면 리워드 적립.
     - 당일 row 있음 → (False, 현재 포인트)
     - 당일 row 없음 → INSERT 후 users.points 갱신, (True, 갱신된 포인트)
+    당일 확인·이력 INSERT·포인트 증가는 award_points 1회 (service/points_service.py, 동시 요청에도 1일 1회)
+    사용자(users 행)가 없으면 PointsError
+    하루 기준은 KST 0시 (서버 시간대가 UTC여도 한국 날짜로 1일 1회)
     """
-    today = date.today()
     try:
-        # 1. 당일 출석체크 row 존재 여부 확인 (rewards 테이블)
-        check_res = supabase.table("reward_history") \
-            .select("id") \
-            .eq("user_email", email) \
-            .eq("reason", REASON_ATTENDANCE) \
-            .gte("created_at", f"{today}T00:00:00") \
-            .lt("created_at", f"{today}T23:59:59") \
-            .execute()
-
-        if check_res.data and len(check_res.data) > 0:
-            user_res = supabase.table("users").select("points").eq("email", email).single().execute()
-            current_pt = user_res.data.get("points", 0) if user_res.data else 0
-            return False, current_pt
-
-        # 2. 당일 row 없음 → rewards 테이블에 INSERT (리워드 적립)
-        supabase.table("reward_history").insert({
-            "user_email": email,
-            "reward_amount": REWARD_AMOUNT,
-            "reason": REASON_ATTENDANCE,
-            "created_at": datetime.utcnow().isoformat(),
-        }).execute()
-
-        # 3. users.points 업데이트
-        user_res = supabase.table("users").select("points").eq("email", email).single().execute()
-        current_points = user_res.data.get("points", 0) if user_res.data else 0
-        new_total = current_points + REWARD_AMOUNT
-        supabase.table("users").update({"points": new_total}).eq("email", email).execute()
-
-        print(f"🎊 [자동 출석체크] {email}: rewards 적립 완료 ({REWARD_AMOUNT}P, 총: {new_total}P)")
-        return True, new_total
-
+        is_new, total = award_points(email, REWARD_AMOUNT, REASON_ATTENDANCE, once_since=kst_midnight(kst_today()))
+        if is_new:
+            print(f"🎊 [자동 출석체크] {email}: rewards 적립 완료 ({REWARD_AMOUNT}P, 총: {total}P)")
+        return is_new, total
+
+    except PointsError:
+        # 사용자 없음 등 → 호출한 쪽에서 error 응답
+        raise
     except Exception as e:
         print(f"❌ 출석체크 리워드 처리 오류: {e}")
         return False, 0
@@ -72,7 +52,10 @@ async def auto_attendance_check(email: str = Depends(get_current_user)):
     앱 실행 시 호출. 자동 출석체크 후 당일 출석체크 row가 없으면 rewards DB에 적립.
     - GET/POST 모두 지원 (앱 로드 시 GET으로 호출 가능)
     """
-    is_new, points = _auto_attendance_check(email)
+    try:
+        is_new, points = _auto_attendance_check(email)
+    except PointsError as e:
+        return {"status": "error", "code": e.code, "message": str(e)}
 
     print(f"is_new: {is_new}, points: {points}")
     return {
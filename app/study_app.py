@@ -14,6 +14,10 @@ from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 
 from app.security_app import get_current_user
+from service.activity_service import KST
+from service.ocr_geometry_service import attach_geometry, geometry_store
+from service.points_service import PointsError, award_points, get_points
+from service.study_session_service import STUDY_REWARD_PER_CORRECT, StudySessionError, record_study_session
 
 app = APIRouter(prefix="/study", tags=["study"])
 templates = Jinja2Templates(directory="templates")
@@ -28,12 +32,54 @@ class QuizSubmitRequest(BaseModel):
     keywords: List[str] = []
     quiz_html: str = ""
     ocr_text: Optional[Dict[str, Any]] = None  # { pages, blanks, quiz } 또는 생략
+    ocr_id: Optional[str] = None  # OCR 응답의 ocr_id → 서버가 보관한 단어 좌표를 pages[i].geometry 로 저장 (없으면 서명된 geometry)
     subject_name: Optional[str] = None
     study_name: Optional[str] = None
 
 
 
-# 채점 — 프론트: POST /study/grade, JSON body (QuizSubmitRequest) → { status, score, reward_given, new_points }
+async def _record_study_session_legacy(
+    email: str, row: Dict[str, Any], correct_count: int, question_count: int, reward_amount: int, reason: str
+):
+    """record_study_session RPC가 없는 DB용 단계별 저장 → (새 퀴즈 id, 포인트 잔액 또는 None)"""
+    insert_res = await asyncio.to_thread(lambda: supabase.table("ocr_data").insert(row).execute())
+    new_id = insert_res.data[0]["id"] if insert_res.data else None
+
+    # RLS 등으로 insert 반환값이 비어 있으면, 방금 넣은 행을 조회해서 id 사용
+    if new_id is None:
+        fallback = await asyncio.to_thread(
+            lambda: supabase.table("ocr_data")
+            .select("id")
+            .eq("user_email", email)
+            .order("id", desc=True)
+            .limit(1)
+            .execute()
+        )
+        if fallback.data and len(fallback.data) > 0:
+            new_id = fallback.data[0]["id"]
+    if new_id is None:
+        return None, None
+
+    # [2] 학습 로그 + [3] 리워드: 서로 독립이므로 병렬 실행 (DB 왕복 횟수 감소)
+    log = asyncio.to_thread(
+        lambda: supabase.table("study_logs").insert({
+            "quiz_id": new_id,
+            "user_email": email,
+            "completed_at": datetime.now(KST).isoformat(),
+            "correct_count": correct_count,
+            "question_count": question_count,
+        }).execute()
+    )
+    if reward_amount <= 0:
+        await log
+        return new_id, None
+    print(f"reward_amount: {reward_amount}")
+    # 리워드 이력 + 포인트 증가는 award_points 1회 (원자적, 새 잔액 반환)
+    _, (_, new_points) = await asyncio.gather(log, asyncio.to_thread(award_points, email, reward_amount, reason))
+    return new_id, new_points
+
+
+# 채점 — 프론트: POST /study/grade, JSON body (QuizSubmitRequest) → { status, quiz_id, score, reward_given, new_points }
 @app.post("/grade")
 async def grade_quiz(
     email: str = Depends(get_current_user),
@@ -56,6 +102,13 @@ async def grade_quiz(
             "blanks": [{"blank_index": i, "word": w, "page_index": 0} for i, w in enumerate(payload.keywords)],
             "quiz": {"raw": payload.quiz_html or ""},
         }
+    # 단어 좌표는 OCR 때 서버가 만든 것만 저장 (원문이 그대로인 페이지만):
+    # ocr_id 보관분 우선, 없으면(다른 워커·재시작·만료) 서명이 맞는 클라이언트 geometry
+    if isinstance(ocr_text.get("pages"), list):
+        stored = geometry_store.get(email, payload.ocr_id)
+        if payload.ocr_id and stored is None:
+            print(f"⚠️ ocr_id 보관분 없음 (다른 워커·만료): {payload.ocr_id} → 서명된 geometry 만 저장")
+        ocr_text = {**ocr_text, "pages": attach_geometry(ocr_text["pages"], stored, email)}
 
     if not correct_ans or not email:
         return {"status": "error", "message": "필수 데이터가 누락되었습니다."}
@@ -71,80 +124,28 @@ async def grade_quiz(
             "ocr_text": ocr_text,
             "quiz_html": {"raw": quiz_html} if isinstance(quiz_html, str) else quiz_html,
         }
-        insert_res = supabase.table("ocr_data").insert(row).execute()
-        new_id = insert_res.data[0]["id"] if insert_res.data else None
-
-        # RLS 등으로 insert 반환값이 비어 있으면, 방금 넣은 행을 조회해서 id 사용
-        if new_id is None:
-            fallback = (
-                supabase.table("ocr_data")
-                .select("id")
-                .eq("user_email", email)
-                .order("id", desc=True)
-                .limit(1)
-                .execute()
-            )
-            if fallback.data and len(fallback.data) > 0:
-                new_id = fallback.data[0]["id"]
+        reward_amount = grade_cnt * STUDY_REWARD_PER_CORRECT if grade_cnt > 0 else 0
+        reason = f"초기 학습 리워드: {grade_cnt}개 정답"
 
-        # [2] 학습 로그 + [3] 리워드: 서로 독립이므로 병렬 실행 (DB 왕복 횟수 감소)
-        new_points = None
-        if new_id is not None:
-            if grade_cnt > 0:
-                reward_amount = grade_cnt * 2
-                print(f"reward_amount: {reward_amount}")
-                await asyncio.gather(
-                    asyncio.to_thread(
-                        lambda: supabase.table("study_logs").insert({
-                            "quiz_id": new_id,
-                            "user_email": email,
-                            "completed_at": datetime.now().isoformat(),
-                            "correct_count": grade_cnt,
-                            "question_count": len(correct_ans),
-                        }).execute()
-                    ),
-                    asyncio.to_thread(
-                        lambda: supabase.table("reward_history").insert({
-                            "user_email": email,
-                            "reward_amount": reward_amount,
-                            "reason": f"초기 학습 리워드: {grade_cnt}개 정답"
-                        }).execute()
-                    ),
-                )
-                # 포인트 조회·업데이트는 리워드 insert 이후에만 의미 있음
-                user_res = await asyncio.to_thread(
-                    lambda: supabase.table("users")
-                    .select("points")
-                    .eq("email", email)
-                    .single()
-                    .execute()
-                )
-                current_points = user_res.data.get("points") or 0
-                new_points = current_points + reward_amount
-                await asyncio.to_thread(
-                    lambda: supabase.table("users")
-                    .update({"points": new_points})
-                    .eq("email", email)
-                    .execute()
-                )
-            else:
-                await asyncio.to_thread(
-                    lambda: supabase.table("study_logs").insert({
-                        "quiz_id": new_id,
-                        "user_email": email,
-                        "completed_at": datetime.now().isoformat(),
-                        "correct_count": 0,
-                        "question_count": len(correct_ans),
-                    }).execute()
-                )
+        # [1]~[3]을 DB 함수 1회로 (한 트랜잭션, 새 퀴즈 id·포인트 반환). 함수가 없는 DB면 None → 아래 단계별 저장
+        session = await asyncio.to_thread(
+            record_study_session, email, row, grade_cnt, len(correct_ans), reward_amount, reason
+        )
+        if session is not None:
+            new_id, new_points = session["quiz_id"], session["points"]
+        else:
+            new_id, new_points = await _record_study_session_legacy(email, row, grade_cnt, len(correct_ans), reward_amount, reason)
 
         return {
             "status": "success",
+            "quiz_id": new_id, # 저장된 학습 자료 id
             "score": grade_cnt, # 정답 수
-            "reward_given": grade_cnt * 2 if grade_cnt > 0 else 0,
+            "reward_given": reward_amount,
             "new_points": new_points # 누적 포인트
         }
 
+    except (PointsError, StudySessionError) as e:
+        return {"status": "error", "code": e.code, "message": str(e)}
     except Exception as e:
         print(f"오류: {e}")
         return {"status": "error", "message": str(e)}
@@ -219,15 +220,15 @@ async def review_study_reward(request: Request, email: str = Depends(get_current
                     if str(u).strip() == str(c).strip().lower())
         total_reward = score * 2
 
-        # 리워드 이력 / ocr_data 업데이트 / study_logs — 서로 독립이므로 병렬 실행
-        await asyncio.gather(
-            asyncio.to_thread(
-                lambda: supabase.table("reward_history").insert({
-                    "user_email": email,
-                    "reward_amount": total_reward,
-                    "reason": "복습학습을 통한 정답 리워드"
-                }).execute()
-            ),
+        # 포인트 적립(이력 + 잔액, 원자적) / ocr_data 업데이트 / study_logs — 서로 독립이므로 병렬 실행
+        # 맞힌 문제가 없으면 적립 없이 현재 잔액만
+        reward = (
+            asyncio.to_thread(award_points, email, total_reward, "복습학습을 통한 정답 리워드")
+            if total_reward > 0
+            else asyncio.to_thread(lambda: (False, get_points(email)))
+        )
+        (_, new_total_points), _, _ = await asyncio.gather(
+            reward,
             asyncio.to_thread(
                 lambda: supabase.table("ocr_data")
                 .update({"user_answers": all_user_answers})
@@ -239,28 +240,21 @@ async def review_study_reward(request: Request, email: str = Depends(get_current
                 lambda: supabase.table("study_logs").insert({
                     "user_email": email,
                     "quiz_id": quiz_id,
-                    "completed_at": datetime.now().isoformat(),
+                    "completed_at": datetime.now(KST).isoformat(),
                     "correct_count": score,
                     "question_count": len(all_user_answers),
                 }).execute()
             ),
         )
 
-        # 유저 포인트 합산 업데이트 (리워드 반영 후 1회 조회 + 1회 업데이트)
-        user_res = await asyncio.to_thread(
-            lambda: supabase.table("users").select("points").eq("email", email).single().execute()
-        )
-        new_total_points = (user_res.data.get("points") or 0) + total_reward
-        await asyncio.to_thread(
-            lambda: supabase.table("users").update({"points": new_total_points}).eq("email", email).execute()
-        )
-
         return {
             "status": "success",
             "score": score, # 정답 수
             "reward_given": total_reward, # 리워드 수
             "new_points": new_total_points # 누적 포인트
         }
+    except PointsError as e:
+        return {"status": "error", "code": e.code, "message": str(e)}
     except Exception as e:
         print(f"오류: {e}")
         return {"status": "error", "message": str(e)}
\ No newline at end of file
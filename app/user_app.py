@@ -1,3 +1,4 @@
+import asyncio
 import os
 from dotenv import load_dotenv
 import requests
@@ -9,6 +10,7 @@ from dotenv import load_dotenv
 from core.database import supabase
 from pydantic import BaseModel
 from app.security_app import create_jwt_token, get_current_user
+from service.activity_service import count_studies, get_activity_summary, get_streak, kst_date, kst_midnight, kst_today
 import jwt
 from datetime import datetime, timedelta, date
 from fastapi.responses import JSONResponse
@@ -74,37 +76,17 @@ async def set_nickname_mobile(
 async def get_user_stats(email: str = Depends(get_current_user)):
     """총 학습 횟수, 총 학습일, 연속 학습일, 한달 목표 반환 (study_logs.completed_at 기준)"""
     try:
-        today = date.today()
-
-        # 1. 총 학습 횟수: study_logs 전체 건수 (count만 조회)
-        total_res = supabase.table("study_logs") \
-            .select("id", count="exact") \
-            .eq("user_email", email) \
-            .execute()
-        total_learning_count = getattr(total_res, "count", None)
-        if total_learning_count is None:
-            total_learning_count = len(total_res.data or [])
-
-        # 2. 총 학습일·연속 학습일: study_logs.completed_at 기준 distinct 날짜 계산
-        logs_res = supabase.table("study_logs") \
-            .select("completed_at") \
-            .eq("user_email", email) \
-            .execute()
-        study_dates = set()
-        for row in (logs_res.data or []):
-            completed = row.get("completed_at")
-            if completed:
-                if isinstance(completed, str):
-                    study_dates.add(completed[:10])  # YYYY-MM-DD
-                else:
-                    study_dates.add(str(completed)[:10])
-        consecutive_days = 0  # 연속 학습일: 오늘부터 역순으로 연속된 일수
-        check = today
-        check_str = check.isoformat()
-        while check_str in study_dates:
-            consecutive_days += 1
-            check -= timedelta(days=1)
-            check_str = check.isoformat()
+        # 1. 총 학습 횟수: 학습 집계 1행 / 2. 연속 학습일: 학습일 비트맵 최대 2행 (달력과 같은 계산)
+        # 집계를 쓸 수 없으면 study_logs 전체에서 계산
+        summary, consecutive_days = await asyncio.gather(
+            asyncio.to_thread(get_activity_summary, email), asyncio.to_thread(get_streak, email)
+        )
+        if summary is None or consecutive_days is None:
+            logs_total, logs_streak = _user_stats_from_logs(email)
+            total_learning_count = summary["total_count"] if summary is not None else logs_total
+            consecutive_days = consecutive_days if consecutive_days is not None else logs_streak
+        else:
+            total_learning_count = summary["total_count"]
 
         # 3. 한달 목표: users.monthly_goal
         user_res = supabase.table("users") \
@@ -134,19 +116,51 @@ async def get_user_stats(email: str = Depends(get_current_user)):
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 
+def _user_stats_from_logs(email: str):
+    """
+    집계 테이블이 없는 DB용: study_logs 건수 + 전체 completed_at 으로 (총 학습 횟수, 연속 학습일) 계산.
+    날짜는 집계 테이블과 같이 KST 기준.
+    """
+    today = kst_today()
+
+    # 1. 총 학습 횟수: study_logs 전체 건수 (count만 조회)
+    total_res = supabase.table("study_logs") \
+        .select("id", count="exact") \
+        .eq("user_email", email) \
+        .execute()
+    total_learning_count = getattr(total_res, "count", None)
+    if total_learning_count is None:
+        total_learning_count = len(total_res.data or [])
+
+    # 2. 총 학습일·연속 학습일: study_logs.completed_at 의 KST 날짜 기준 distinct 날짜 계산
+    logs_res = supabase.table("study_logs") \
+        .select("completed_at") \
+        .eq("user_email", email) \
+        .execute()
+    study_dates = {kst_date(row.get("completed_at")) for row in (logs_res.data or [])}
+    consecutive_days = 0  # 연속 학습일: 오늘부터 역순으로 연속된 일수
+    check = today
+    while check in study_dates:
+        consecutive_days += 1
+        check -= timedelta(days=1)
+    return total_learning_count, consecutive_days
+
+
+def _kst_month_range():
+    """이번 달(KST) [1일, 다음 달 1일)"""
+    today = kst_today()
+    first_day = today.replace(day=1)
+    next_first = date(today.year + 1, 1, 1) if today.month == 12 else date(today.year, today.month + 1, 1)
+    return first_day, next_first
+
+
     
 @app.get("/home/stats")
 async def get_home_stats(email: str = Depends(get_current_user)):
     """현재 포인트, 한달 목표, 당월 총 학습 횟수 반환"""
     try:
-        today = date.today()
-        first_day = today.replace(day=1)
-        if today.month == 12:
-            next_first = date(today.year + 1, 1, 1)
-        else:
-            next_first = date(today.year, today.month + 1, 1)
-        start_str = first_day.isoformat()
-        end_str = next_first.isoformat()
+        # 이번 달 (KST) — 집계·원본 이력 경로 모두 같은 기간
+        first_day, next_first = _kst_month_range()
 
         user_res = (
             supabase.table("users")
@@ -159,18 +173,20 @@ async def get_home_stats(email: str = Depends(get_current_user)):
         points = data.get("points")
         monthly_goal = data.get("monthly_goal")
 
-        # 당월 총 학습 횟수: study_logs에서 completed_at이 이번 달인 건수
-        monthly_res = (
-            supabase.table("study_logs")
-            .select("id", count="exact")
-            .eq("user_email", email)
-            .gte("completed_at", start_str)
-            .lt("completed_at", end_str)
-            .execute()
-        )
-        this_month_count = getattr(monthly_res, "count", None)
+        # 당월 총 학습 횟수: 일일 집계(이번 달 최대 31행) 합계, 집계가 없으면 study_logs에서 completed_at이 이번 달인 건수
+        this_month_count = await asyncio.to_thread(count_studies, email, first_day, next_first)
         if this_month_count is None:
-            this_month_count = len(monthly_res.data or [])
+            monthly_res = (
+                supabase.table("study_logs")
+                .select("id", count="exact")
+                .eq("user_email", email)
+                .gte("completed_at", kst_midnight(first_day))
+                .lt("completed_at", kst_midnight(next_first))
+                .execute()
+            )
+            this_month_count = getattr(monthly_res, "count", None)
+            if this_month_count is None:
+                this_month_count = len(monthly_res.data or [])
 
         return {
             "status": "success",
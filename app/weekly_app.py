@@ -1,6 +1,7 @@
 # 학습 주기 세팅 및 주마다의 그래프 도출 
 
-from fastapi import APIRouter, Body, HTTPException, Depends, Form
+import asyncio
+from fastapi import APIRouter, Body, HTTPException, Depends, Form, Query
 from typing import Optional
 from fastapi.responses import HTMLResponse
 import psycopg2
@@ -11,6 +12,19 @@ from datetime import datetime, date, timedelta
 import calendar
 
 from app.security_app import get_current_user
+from service.activity_service import (
+    KST,
+    bitmap_count,
+    bitmap_days,
+    count_studies,
+    get_activity_bitmaps,
+    get_weekly_activity,
+    kst_date,
+    kst_midnight,
+    kst_today,
+    kst_week_start,
+    streak_from_bitmaps,
+)
 
 app = APIRouter(prefix="/cycle", tags=["Weekly"])
 
@@ -48,67 +62,89 @@ async def set_study_goal(
 # 정답률 = (해당 주 전체 정답 수 / 해당 주 전체 문항 수) * 100
 # 출석률 = (실제 출석 일수 / 7일) * 100
 # 주차 점수 = (정답률 * 출석률) / 100 → 0~100
+# weeks: 최근 몇 주 (기본 5, 최대 WEEKLY_GROWTH_MAX_WEEKS) — 주간 집계 테이블이 있으면 N주 = 최대 N행 조회
+WEEKLY_GROWTH_MAX_WEEKS = 104
+
+
+def _weekly_from_logs(email: str, since: date):
+    """
+    주간 집계 테이블이 없는 DB용: since(KST 월요일) 이후 study_logs·출석체크 이력을 KST 주차별로 합산
+    → {주 시작 월요일 ISO: {"correct_sum", "question_sum", "attendance_mask"}} (출석 요일 비트: 월 = bit 0)
+    """
+    # 1) study_logs: 학습지별 정답 수·문항 수 (DB 저장값 사용)
+    logs_res = supabase.table("study_logs") \
+        .select("completed_at, correct_count, question_count") \
+        .eq("user_email", email) \
+        .gte("completed_at", kst_midnight(since)) \
+        .execute()
+    logs = logs_res.data or []
+
+    # 2) reward_history: 출석체크만으로 해당 주 실제 출석 일수
+    reward_res = supabase.table("reward_history") \
+        .select("created_at, reason") \
+        .eq("user_email", email) \
+        .eq("reason", "출석체크") \
+        .gte("created_at", kst_midnight(since)) \
+        .execute()
+    rewards = reward_res.data or []
+
+    def _week(day):
+        week_key = kst_week_start(day).isoformat()
+        if week_key not in weekly:
+            weekly[week_key] = {"correct_sum": 0, "question_sum": 0, "attendance_mask": 0}
+        return weekly[week_key]
+
+    # 주차별: 전체 정답 수 합계, 전체 문항 수 합계, 출석한 요일 비트
+    weekly = {}
+    for row in logs:
+        day = kst_date(row.get("completed_at"))
+        if day is None:
+            continue
+        week = _week(day)
+        week["correct_sum"] += row.get("correct_count") or 0
+        week["question_sum"] += row.get("question_count") or 0
+
+    for row in rewards:
+        day = kst_date(row.get("created_at"))
+        if day is None:
+            continue
+        _week(day)["attendance_mask"] |= 1 << day.weekday()
+    return weekly
+
+
+def _week_score(st) -> float:
+    """주간 집계 1행 → 주차 점수 (0~100)"""
+    question_sum = st.get("question_sum") or 0
+    correct_sum = st.get("correct_sum") or 0
+    # 정답률 = (해당 주 전체 정답 수 / 해당 주 전체 문항 수) * 100
+    correct_rate = (correct_sum / question_sum * 100.0) if question_sum > 0 else 0.0
+    # 출석률 = (실제 출석 일수 / 7일) * 100 — 출석 일수 = 출석 요일 비트 수
+    attend_days = bin(st.get("attendance_mask") or 0).count("1")
+    attendance_rate = min(attend_days / 7.0, 1.0) * 100.0
+    # 주차 점수 = (정답률 * 출석률) / 100 → 0~100
+    return round((correct_rate * attendance_rate) / 100.0, 1)
+
+
 @app.get("/stats/weekly-growth")
 async def get_weekly_growth(
-    email: str = Depends(get_current_user)
+    email: str = Depends(get_current_user),
+    weeks: int = Query(5, ge=1, le=WEEKLY_GROWTH_MAX_WEEKS),
 ):
     print(f"주간 성장 데이터 유저:{email}")
 
     try:
-        five_weeks_ago = (date.today() - timedelta(weeks=5)).isoformat()
-
-        # 1) study_logs: 학습지별 정답 수·문항 수 (DB 저장값 사용)
-        logs_res = supabase.table("study_logs") \
-            .select("completed_at, correct_count, question_count") \
-            .eq("user_email", email) \
-            .gte("completed_at", five_weeks_ago) \
-            .execute()
-        logs = logs_res.data or []
-
-        # 2) reward_history: 출석체크만으로 해당 주 실제 출석 일수
-        reward_res = supabase.table("reward_history") \
-            .select("created_at, reason") \
-            .eq("user_email", email) \
-            .eq("reason", "출석체크") \
-            .gte("created_at", five_weeks_ago) \
-            .execute()
-        rewards = reward_res.data or []
-
-        def _week_start(d):
-            if isinstance(d, str):
-                d = datetime.fromisoformat(d.replace("Z", "+00:00")).date()
-            return (d - timedelta(days=d.weekday())).isoformat()
-
-        # 주차별: 전체 정답 수 합계, 전체 문항 수 합계, 출석한 날 집합
-        weekly = {}
-        for row in logs:
-            completed = row.get("completed_at")
-            if not completed:
-                continue
-            week_key = _week_start(completed)
-            if week_key not in weekly:
-                weekly[week_key] = {"correct_sum": 0, "question_sum": 0, "attend_dates": set()}
-            weekly[week_key]["correct_sum"] += row.get("correct_count") or 0
-            weekly[week_key]["question_sum"] += row.get("question_count") or 0
-
-        for row in rewards:
-            created = row.get("created_at")
-            if not created:
-                continue
-            dt = datetime.fromisoformat(created.replace("Z", "+00:00"))
-            week_key = _week_start(dt.date())
-            if week_key not in weekly:
-                weekly[week_key] = {"correct_sum": 0, "question_sum": 0, "attend_dates": set()}
-            weekly[week_key]["attend_dates"].add(dt.date())
-
-        # 3) 라벨 및 점수: 정답률(%) * 출석률(%) / 100
+        # 주간 집계(KST 주 단위, 트리거로 갱신)에서 최대 weeks행 조회, 없으면 원본 이력에서 합산
+        today_monday = kst_week_start(kst_today())
+        since = today_monday - timedelta(weeks=weeks - 1)
+        weekly = await asyncio.to_thread(get_weekly_activity, email, since, today_monday + timedelta(weeks=1))
+        if weekly is None:
+            weekly = await asyncio.to_thread(_weekly_from_logs, email, since)
+
+        # 라벨 및 점수: 정답률(%) * 출석률(%) / 100
         labels = []
         scores = []
-        today_monday = date.today() - timedelta(days=date.today().weekday())
-
-        for i in range(4, -1, -1):
+        for i in range(weeks - 1, -1, -1):
             target_monday = today_monday - timedelta(weeks=i)
-            target_iso = target_monday.isoformat()
             if i == 0:
                 label = "이번 주"
             elif i == 1:
@@ -117,20 +153,8 @@ async def get_weekly_growth(
                 label = f"{i}주 전"
             labels.append(label)
 
-            st = weekly.get(target_iso)
-            if not st:
-                scores.append(0)
-                continue
-            question_sum = st["question_sum"]
-            correct_sum = st["correct_sum"]
-            # 정답률 = (해당 주 전체 정답 수 / 해당 주 전체 문항 수) * 100
-            correct_rate = (correct_sum / question_sum * 100.0) if question_sum > 0 else 0.0
-            # 출석률 = (실제 출석 일수 / 7일) * 100
-            attend_days = len(st["attend_dates"])
-            attendance_rate = min(attend_days / 7.0, 1.0) * 100.0
-            # 주차 점수 = (정답률 * 출석률) / 100 → 0~100
-            score = (correct_rate * attendance_rate) / 100.0
-            scores.append(round(score, 1))
+            st = weekly.get(target_monday.isoformat())
+            scores.append(_week_score(st) if st else 0)
 
         return {"labels": labels, "data": scores}
     except Exception as e:
@@ -142,16 +166,20 @@ async def get_learning_stats(
 email: str = Depends(get_current_user)
 ):
     
-    today = date.today()
-    this_month_start = today.replace(day=1).isoformat()
+    today = kst_today()
+    kst_month_start = today.replace(day=1)
 
     try:
-        # 1. 이번 달 기록 조회
-        this_res = supabase.table("study_logs") \
-            .select("id", count="exact") \
-            .eq("user_email", email) \
-            .gte("completed_at", this_month_start).execute()
-        this_month_count = this_res.count
+        # 1. 이번 달(KST) 기록 조회: 일일 집계(최대 31행) 합계, 집계가 없으면 study_logs 건수
+        this_month_count = await asyncio.to_thread(
+            count_studies, email, kst_month_start, (kst_month_start + timedelta(days=32)).replace(day=1)
+        )
+        if this_month_count is None:
+            this_res = supabase.table("study_logs") \
+                .select("id", count="exact") \
+                .eq("user_email", email) \
+                .gte("completed_at", kst_midnight(kst_month_start)).execute()
+            this_month_count = this_res.count
 
 
         # 3. 목표 횟수 조회
@@ -168,4 +196,76 @@ email: str = Depends(get_current_user)
             }
         }
     except Exception as e:
-        return {"status": "error", "message": str(e)}
\ No newline at end of file
+        return {"status": "error", "message": str(e)}
+
+
+# 4. 학습 달력(히트맵): 그 해 학습한 날·출석한 날
+# 연도별 비트맵(bit n = 1월 1일 + n일) 1~2행 조회 → 날짜 목록·월별 일수·연속 학습일을 popcount·시프트로 계산
+def _calendar_bits_from_logs(email: str, year: int):
+    """비트맵 테이블이 없는 DB용: 그 해(KST) study_logs·출석체크 이력 → {"study": int, "attendance": int}"""
+    since = datetime(year, 1, 1, tzinfo=KST).isoformat()
+    until = datetime(year + 1, 1, 1, tzinfo=KST).isoformat()
+    logs = supabase.table("study_logs") \
+        .select("completed_at") \
+        .eq("user_email", email) \
+        .gte("completed_at", since) \
+        .lt("completed_at", until) \
+        .execute().data or []
+    rewards = supabase.table("reward_history") \
+        .select("created_at") \
+        .eq("user_email", email) \
+        .eq("reason", "출석체크") \
+        .gte("created_at", since) \
+        .lt("created_at", until) \
+        .execute().data or []
+
+    def _mask(rows, key):
+        mask = 0
+        for row in rows:
+            day = kst_date(row.get(key))
+            if day is not None and day.year == year:
+                mask |= 1 << (day - date(year, 1, 1)).days
+        return mask
+
+    return {"study": _mask(logs, "completed_at"), "attendance": _mask(rewards, "created_at")}
+
+
+@app.get("/stats/calendar")
+async def get_study_calendar(
+    email: str = Depends(get_current_user),
+    year: Optional[int] = Query(None, ge=2000, le=2100),
+):
+    today = kst_today()
+    year = year or today.year
+
+    try:
+        # 올해면 연속 학습일이 1월 1일을 넘어갈 수 있으므로 작년 비트맵도 같이 (최대 2행)
+        years = [year, year - 1] if year == today.year else [year]
+        bitmaps = await asyncio.to_thread(get_activity_bitmaps, email, years)
+        if bitmaps is None:
+            bitmaps = {y: await asyncio.to_thread(_calendar_bits_from_logs, email, y) for y in years}
+        bits = bitmaps.get(year) or {"study": 0, "attendance": 0}
+        study, attendance = bits["study"], bits["attendance"]
+
+        # 월별 학습일 수: 그 달 구간만 시프트해서 popcount
+        monthly = []
+        for month in range(1, 13):
+            start = date(year, month, 1)
+            end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+            monthly.append(bitmap_count(study, year, start, end))
+
+        # 연속 학습일 (오늘 KST 기준, 오늘 학습이 없으면 0) — /auth/user/stats 와 같은 계산 (streak_from_bitmaps)
+        consecutive_days = streak_from_bitmaps(bitmaps, today) if year == today.year else 0
+
+        return {
+            "status": "success",
+            "year": year,
+            "study_days": [d.isoformat() for d in bitmap_days(study, year)],
+            "attendance_days": [d.isoformat() for d in bitmap_days(attendance, year)],
+            "study_day_count": bin(study).count("1"),
+            "attendance_day_count": bin(attendance).count("1"),
+            "monthly_study_days": monthly,
+            "consecutive_days": consecutive_days,
+        }
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
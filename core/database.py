@@ -1,5 +1,6 @@
 import psycopg2
 import os
+from typing import Optional
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
@@ -11,6 +12,11 @@ key: str = os.getenv("SUPABASE_ANON_KEY")
 
 supabase: Client = create_client(url, key)
 
+# 서버 전용 DB 함수(award_points, record_study_session) 호출용 — 실행 권한이 service_role 에만 있음
+# 키가 없으면 None → POINTS_RPC_ENABLED / STUDY_SESSION_RPC_ENABLED 가 켜져 있으면 해당 서비스가 시작 시 RuntimeError
+service_key: str = (os.getenv("SUPABASE_SERVICE_ROLE_KEY") or "").strip()
+supabase_service: Optional[Client] = create_client(url, service_key) if service_key else None
+
 print("--- DB 연결 테스트 시작 ---")
 try:
     # 'ocr_data'라는 이름의 테이블이 실제로 있는지 확인하세요!
@@ -0,0 +1,63 @@
+-- 포인트 적립 (service/points_service.py → supabase_service.rpc("award_points"))
+-- reward_history 이력 INSERT + users.points 증가를 한 트랜잭션에서 처리하고 새 잔액 반환.
+-- - 같은 사용자의 동시 요청(출석 + 복습 제출 등)도 users 행 잠금으로 순서대로 반영 → 갱신 유실 없음
+-- - p_once_since 를 주면 그 시각 이후 같은 사유 이력이 있을 때 적립하지 않음 (출석체크 1일 1회)
+--   사용자별 advisory lock 으로 동시 출석 요청의 중복 적립 방지
+-- - security definer 이므로 실행 권한은 service_role 에만 (서버가 SUPABASE_SERVICE_ROLE_KEY 로 호출).
+--   anon/authenticated 키로는 호출 불가 → 클라이언트가 임의 이메일·금액으로 적립할 수 없음
+-- - p_amount 는 1 ~ 1000 만 허용 (22023), users 행이 없으면 이력을 남기지 않고 실패 (P0002)
+-- Supabase SQL Editor 에서 한 번 실행. (함수가 없으면 서버는 기존 조회 → 계산 → 업데이트 경로로 동작)
+
+create or replace function public.award_points(
+    p_email text,
+    p_amount integer,
+    p_reason text,
+    p_once_since timestamptz default null
+)
+returns table (awarded boolean, points integer)
+language plpgsql
+security definer
+set search_path = public
+as $$
+#variable_conflict use_column
+declare
+    v_points integer;
+begin
+    if p_amount is null or p_amount < 1 or p_amount > 1000 then
+        raise exception 'award_points: invalid amount %', p_amount using errcode = '22023';
+    end if;
+
+    -- 사용자 행 잠금 (없으면 이력을 남기기 전에 실패)
+    select coalesce(u.points, 0) into v_points from users u where u.email = p_email for update;
+    if not found then
+        raise exception 'award_points: user % not found', p_email using errcode = 'P0002';
+    end if;
+
+    if p_once_since is not null then
+        perform pg_advisory_xact_lock(hashtext('award_points:' || p_email));
+        if exists (
+            select 1
+            from reward_history r
+            where r.user_email = p_email
+              and r.reason = p_reason
+              and r.created_at >= p_once_since
+              and r.created_at < p_once_since + interval '1 day'
+        ) then
+            return query select false, v_points;
+            return;
+        end if;
+    end if;
+
+    insert into reward_history (user_email, reward_amount, reason)
+    values (p_email, p_amount, p_reason);
+
+    return query
+        update users u
+        set points = coalesce(u.points, 0) + p_amount
+        where u.email = p_email
+        returning true, u.points;
+end;
+$$;
+
+revoke execute on function public.award_points(text, integer, text, timestamptz) from public, anon, authenticated;
+grant execute on function public.award_points(text, integer, text, timestamptz) to service_role;
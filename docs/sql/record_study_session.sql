@@ -0,0 +1,66 @@
+-- 채점 결과 저장 (service/study_session_service.py → supabase_service.rpc("record_study_session"))
+-- ocr_data INSERT → study_logs INSERT → (정답이 있으면) award_points 를 한 트랜잭션에서 처리하고
+-- 새 퀴즈 id 와 포인트 잔액 반환. 중간에 실패하면 전부 롤백되어 로그·리워드 없는 학습 자료가 남지 않음.
+-- INSERT ... RETURNING id 를 함수 안에서 받으므로 RLS 로 반환값이 비는 경우의 "최근 id 조회" 보정이 필요 없음.
+-- - security definer 이므로 실행 권한은 service_role 에만 (서버가 SUPABASE_SERVICE_ROLE_KEY 로 호출)
+-- - 점수·리워드 검증 (22023): 0 <= 정답 수 <= 문제 수 = 정답 배열 길이, 리워드 = 정답 수 * 2
+--   users 행이 없으면 award_points 가 P0002 로 실패 → 전부 롤백
+-- award_points.sql 을 먼저 실행해야 함. (함수가 없으면 서버는 기존 단계별 저장 경로로 동작)
+
+create or replace function public.record_study_session(
+    p_email text,
+    p_subject_name text,
+    p_study_name text,
+    p_user_answers jsonb,
+    p_answers jsonb,
+    p_ocr_text jsonb,
+    p_quiz_html jsonb,
+    p_correct_count integer,
+    p_question_count integer,
+    p_reward_amount integer,
+    p_reason text,
+    p_completed_at timestamp default null
+)
+returns table (quiz_id bigint, points integer)
+language plpgsql
+security definer
+set search_path = public
+as $$
+#variable_conflict use_column
+declare
+    v_quiz_id bigint;
+    v_points integer;
+begin
+    if p_question_count is null or p_question_count < 1
+       or p_question_count <> coalesce(jsonb_array_length(case when jsonb_typeof(p_answers) = 'array' then p_answers end), -1) then
+        raise exception 'record_study_session: invalid score (question_count %)', p_question_count using errcode = '22023';
+    end if;
+    if p_correct_count is null or p_correct_count < 0 or p_correct_count > p_question_count then
+        raise exception 'record_study_session: invalid score (correct_count % / %)', p_correct_count, p_question_count
+            using errcode = '22023';
+    end if;
+    if p_reward_amount is null or p_reward_amount <> p_correct_count * 2 then
+        raise exception 'record_study_session: invalid reward amount %', p_reward_amount using errcode = '22023';
+    end if;
+
+    insert into ocr_data (user_email, subject_name, study_name, user_answers, answers, ocr_text, quiz_html)
+    values (p_email, p_subject_name, p_study_name, p_user_answers, p_answers, p_ocr_text, p_quiz_html)
+    returning id into v_quiz_id;
+
+    insert into study_logs (quiz_id, user_email, completed_at, correct_count, question_count)
+    values (v_quiz_id, p_email, coalesce(p_completed_at, now()), p_correct_count, p_question_count);
+
+    if p_reward_amount > 0 then
+        select a.points into v_points from award_points(p_email, p_reward_amount, p_reason) a;
+    end if;
+
+    return query select v_quiz_id, v_points;
+end;
+$$;
+
+revoke execute on function public.record_study_session(
+    text, text, text, jsonb, jsonb, jsonb, jsonb, integer, integer, integer, text, timestamp
+) from public, anon, authenticated;
+grant execute on function public.record_study_session(
+    text, text, text, jsonb, jsonb, jsonb, jsonb, integer, integer, integer, text, timestamp
+) to service_role;
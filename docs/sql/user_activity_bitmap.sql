@@ -0,0 +1,93 @@
+-- 사용자별 연도 학습일·출석일 비트맵 (service/activity_service.py → GET /cycle/stats/calendar)
+-- 1년 = 1행, 비트 n = 그 해 1월 1일(KST) + n일 → 366비트 = 46바이트 bytea 두 개.
+-- study_logs / reward_history(출석체크) INSERT 때마다 트리거로 해당 날짜 비트만 켬 → 달력·연속 학습일은 popcount·시프트로 계산.
+-- set_bit 비트 순서: bit n = 바이트 n/8 의 (오른쪽부터) n%8 번째 비트 (서버는 little-endian 정수로 읽음).
+-- Supabase SQL Editor 에서 한 번 실행 (마지막의 기존 이력 backfill 포함). 테이블이 없으면 서버는 기존 원본 이력 조회로 동작.
+
+create table if not exists public.user_activity_bitmap (
+    user_email text not null,
+    year smallint not null,
+    study_bits bytea not null default decode(repeat('00', 46), 'hex'),
+    attend_bits bytea not null default decode(repeat('00', 46), 'hex'),
+    primary key (user_email, year)
+);
+
+
+-- p_kind: 'study' | 'attend'
+create or replace function public.mark_activity_bitmap(p_email text, p_at timestamptz, p_kind text)
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_day date := (coalesce(p_at, now()) at time zone 'Asia/Seoul')::date;
+    v_year smallint := extract(year from v_day)::smallint;
+    v_bit integer := extract(doy from v_day)::integer - 1;
+    v_empty bytea := decode(repeat('00', 46), 'hex');
+begin
+    insert into user_activity_bitmap as b (user_email, year, study_bits, attend_bits)
+    values (
+        p_email,
+        v_year,
+        case when p_kind = 'study' then set_bit(v_empty, v_bit, 1) else v_empty end,
+        case when p_kind = 'attend' then set_bit(v_empty, v_bit, 1) else v_empty end
+    )
+    on conflict (user_email, year) do update
+        set study_bits = case when p_kind = 'study' then set_bit(b.study_bits, v_bit, 1) else b.study_bits end,
+            attend_bits = case when p_kind = 'attend' then set_bit(b.attend_bits, v_bit, 1) else b.attend_bits end;
+end;
+$$;
+
+
+create or replace function public.rollup_bitmap_study_log()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    perform mark_activity_bitmap(new.user_email, new.completed_at, 'study');
+    return new;
+end;
+$$;
+
+drop trigger if exists study_logs_bitmap_rollup on public.study_logs;
+create trigger study_logs_bitmap_rollup
+    after insert on public.study_logs
+    for each row execute function public.rollup_bitmap_study_log();
+
+
+create or replace function public.rollup_bitmap_attendance()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if new.reason = '출석체크' then
+        perform mark_activity_bitmap(new.user_email, new.created_at, 'attend');
+    end if;
+    return new;
+end;
+$$;
+
+drop trigger if exists reward_history_bitmap_rollup on public.reward_history;
+create trigger reward_history_bitmap_rollup
+    after insert on public.reward_history
+    for each row execute function public.rollup_bitmap_attendance();
+
+
+-- 기존 이력 backfill (트리거 생성 후 한 번, 비트를 켜기만 하므로 다시 실행해도 같은 결과)
+select mark_activity_bitmap(user_email, day_at, kind)
+from (
+    select distinct user_email, date_trunc('day', completed_at at time zone 'Asia/Seoul') at time zone 'Asia/Seoul' as day_at, 'study' as kind
+    from study_logs
+    where completed_at is not null
+    union
+    select distinct user_email, date_trunc('day', created_at at time zone 'Asia/Seoul') at time zone 'Asia/Seoul', 'attend'
+    from reward_history
+    where reason = '출석체크' and created_at is not null
+) src;
+
+grant select on public.user_activity_bitmap to anon, authenticated, service_role;
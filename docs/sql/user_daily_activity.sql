@@ -0,0 +1,122 @@
+-- 사용자별 일일 학습 집계 (service/activity_service.py)
+-- study_logs / reward_history(출석체크) INSERT 때마다 트리거로 갱신 → 통계 API는 이력 전체 대신 몇 행만 읽음.
+-- - user_daily_activity: KST 날짜별 학습 횟수, 정답·문항 수 합계, 출석 여부
+-- - user_activity_summary: 총 학습 횟수·학습일, 마지막 학습일, 정답·문항 누적
+--   연속 학습일은 학습일 비트맵(user_activity_bitmap.sql)에서만 계산 (과거 날짜 기록도 비트만 켜면 바로 반영)
+-- 주간 성장 그래프용 주별 집계는 user_weekly_activity.sql (주 N개 = 최대 N행).
+-- study_logs.completed_at / reward_history.created_at 은 timestamptz 기준 (KST 날짜 = at time zone 'Asia/Seoul').
+-- Supabase SQL Editor 에서 한 번 실행 (마지막의 기존 이력 backfill 포함). 테이블이 없으면 서버는 기존 study_logs 조회로 동작.
+
+create table if not exists public.user_daily_activity (
+    user_email text not null,
+    day date not null,
+    study_count integer not null default 0,
+    correct_sum integer not null default 0,
+    question_sum integer not null default 0,
+    attended boolean not null default false,
+    primary key (user_email, day)
+);
+
+create table if not exists public.user_activity_summary (
+    user_email text primary key,
+    total_count bigint not null default 0,
+    total_days integer not null default 0,
+    correct_sum bigint not null default 0,
+    question_sum bigint not null default 0,
+    last_day date
+);
+
+
+create or replace function public.rollup_study_log()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_day date := (coalesce(new.completed_at, now()) at time zone 'Asia/Seoul')::date;
+    v_new_day boolean;
+begin
+    insert into user_daily_activity as d (user_email, day, study_count, correct_sum, question_sum)
+    values (new.user_email, v_day, 1, coalesce(new.correct_count, 0), coalesce(new.question_count, 0))
+    on conflict (user_email, day) do update
+        set study_count = d.study_count + 1,
+            correct_sum = d.correct_sum + excluded.correct_sum,
+            question_sum = d.question_sum + excluded.question_sum
+    -- 학습 없이 출석만 있던 날도 첫 학습이면 새 학습일
+    returning d.study_count = 1 into v_new_day;
+
+    insert into user_activity_summary as s (user_email, total_count, total_days, correct_sum, question_sum, last_day)
+    values (new.user_email, 1, 1, coalesce(new.correct_count, 0), coalesce(new.question_count, 0), v_day)
+    on conflict (user_email) do update
+        set total_count = s.total_count + 1,
+            correct_sum = s.correct_sum + excluded.correct_sum,
+            question_sum = s.question_sum + excluded.question_sum,
+            total_days = s.total_days + (case when v_new_day then 1 else 0 end),
+            last_day = greatest(s.last_day, v_day);
+    return new;
+end;
+$$;
+
+drop trigger if exists study_logs_rollup on public.study_logs;
+create trigger study_logs_rollup
+    after insert on public.study_logs
+    for each row execute function public.rollup_study_log();
+
+
+create or replace function public.rollup_attendance()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if new.reason = '출석체크' then
+        insert into user_daily_activity as d (user_email, day, attended)
+        values (new.user_email, (coalesce(new.created_at, now()) at time zone 'Asia/Seoul')::date, true)
+        on conflict (user_email, day) do update set attended = true;
+    end if;
+    return new;
+end;
+$$;
+
+drop trigger if exists reward_history_attendance_rollup on public.reward_history;
+create trigger reward_history_attendance_rollup
+    after insert on public.reward_history
+    for each row execute function public.rollup_attendance();
+
+
+-- 기존 이력 backfill (트리거 생성 후 한 번, 다시 실행해도 같은 결과)
+insert into user_daily_activity (user_email, day, study_count, correct_sum, question_sum, attended)
+select user_email, day, sum(study_count), sum(correct_sum), sum(question_sum), bool_or(attended)
+from (
+    select user_email, (completed_at at time zone 'Asia/Seoul')::date as day,
+           1 as study_count, coalesce(correct_count, 0) as correct_sum, coalesce(question_count, 0) as question_sum,
+           false as attended
+    from study_logs
+    where completed_at is not null
+    union all
+    select user_email, (created_at at time zone 'Asia/Seoul')::date, 0, 0, 0, true
+    from reward_history
+    where reason = '출석체크' and created_at is not null
+) src
+group by user_email, day
+on conflict (user_email, day) do update
+    set study_count = excluded.study_count,
+        correct_sum = excluded.correct_sum,
+        question_sum = excluded.question_sum,
+        attended = excluded.attended;
+
+insert into user_activity_summary (user_email, total_count, total_days, correct_sum, question_sum, last_day)
+select user_email, sum(study_count), count(*), sum(correct_sum), sum(question_sum), max(day)
+from user_daily_activity
+where study_count > 0
+group by user_email
+on conflict (user_email) do update
+    set total_count = excluded.total_count,
+        total_days = excluded.total_days,
+        correct_sum = excluded.correct_sum,
+        question_sum = excluded.question_sum,
+        last_day = excluded.last_day;
+
+grant select on public.user_daily_activity, public.user_activity_summary to anon, authenticated, service_role;
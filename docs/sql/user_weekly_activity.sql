@@ -0,0 +1,102 @@
+-- 사용자별 주간 학습 집계 (service/activity_service.py → GET /cycle/stats/weekly-growth)
+-- study_logs / reward_history(출석체크) INSERT 때마다 트리거로 갱신 → 주간 그래프는 N주 = 최대 N행 조회.
+-- - week_start: KST 기준 그 주 월요일
+-- - attendance_mask: 출석한 요일 비트 (bit 0 = 월 … bit 6 = 일), 출석 일수 = 켜진 비트 수
+-- user_daily_activity.sql 과 같은 시간 기준: KST 날짜 = (timestamptz at time zone 'Asia/Seoul')::date 를 트리거 안에서 구한 뒤
+-- kst_week_start(date) 로 주 시작일 계산 (시간대 변환이 없는 date 함수라 immutable).
+-- Supabase SQL Editor 에서 한 번 실행 (마지막의 기존 이력 backfill 포함). 테이블이 없으면 서버는 기존 원본 이력 조회로 동작.
+
+create table if not exists public.user_weekly_activity (
+    user_email text not null,
+    week_start date not null,
+    study_count integer not null default 0,
+    correct_sum integer not null default 0,
+    question_sum integer not null default 0,
+    attendance_mask smallint not null default 0,
+    primary key (user_email, week_start)
+);
+
+
+-- KST 날짜 → 그 주 월요일 (isodow: 월 1 … 일 7)
+create or replace function public.kst_week_start(p_day date)
+returns date
+language sql
+immutable
+as $$
+    select p_day - (extract(isodow from p_day)::integer - 1);
+$$;
+
+
+create or replace function public.rollup_weekly_study_log()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_day date := (coalesce(new.completed_at, now()) at time zone 'Asia/Seoul')::date;
+begin
+    insert into user_weekly_activity as w (user_email, week_start, study_count, correct_sum, question_sum)
+    values (new.user_email, kst_week_start(v_day), 1, coalesce(new.correct_count, 0), coalesce(new.question_count, 0))
+    on conflict (user_email, week_start) do update
+        set study_count = w.study_count + 1,
+            correct_sum = w.correct_sum + excluded.correct_sum,
+            question_sum = w.question_sum + excluded.question_sum;
+    return new;
+end;
+$$;
+
+drop trigger if exists study_logs_weekly_rollup on public.study_logs;
+create trigger study_logs_weekly_rollup
+    after insert on public.study_logs
+    for each row execute function public.rollup_weekly_study_log();
+
+
+create or replace function public.rollup_weekly_attendance()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_day date := (coalesce(new.created_at, now()) at time zone 'Asia/Seoul')::date;
+begin
+    if new.reason = '출석체크' then
+        insert into user_weekly_activity as w (user_email, week_start, attendance_mask)
+        values (new.user_email, kst_week_start(v_day), (1 << (extract(isodow from v_day)::integer - 1))::smallint)
+        on conflict (user_email, week_start) do update
+            set attendance_mask = w.attendance_mask | excluded.attendance_mask;
+    end if;
+    return new;
+end;
+$$;
+
+drop trigger if exists reward_history_weekly_attendance_rollup on public.reward_history;
+create trigger reward_history_weekly_attendance_rollup
+    after insert on public.reward_history
+    for each row execute function public.rollup_weekly_attendance();
+
+
+-- 기존 이력 backfill (트리거 생성 후 한 번, 다시 실행해도 같은 결과)
+insert into user_weekly_activity (user_email, week_start, study_count, correct_sum, question_sum, attendance_mask)
+select user_email, kst_week_start(day), sum(study_count), sum(correct_sum), sum(question_sum), bit_or(attendance_mask)::smallint
+from (
+    select user_email, (completed_at at time zone 'Asia/Seoul')::date as day,
+           1 as study_count, coalesce(correct_count, 0) as correct_sum, coalesce(question_count, 0) as question_sum,
+           0 as attendance_mask
+    from study_logs
+    where completed_at is not null
+    union all
+    select user_email, (created_at at time zone 'Asia/Seoul')::date, 0, 0, 0,
+           1 << (extract(isodow from (created_at at time zone 'Asia/Seoul')::date)::integer - 1)
+    from reward_history
+    where reason = '출석체크' and created_at is not null
+) src
+group by user_email, kst_week_start(day)
+on conflict (user_email, week_start) do update
+    set study_count = excluded.study_count,
+        correct_sum = excluded.correct_sum,
+        question_sum = excluded.question_sum,
+        attendance_mask = excluded.attendance_mask;
+
+grant select on public.user_weekly_activity to anon, authenticated, service_role;
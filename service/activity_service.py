@@ -0,0 +1,209 @@
+"""
+사용자 학습 활동 집계 조회 (docs/sql/user_daily_activity.sql).
+- user_activity_summary: 총 학습 횟수·학습일, 마지막 학습일 → 1행
+- user_daily_activity: KST 날짜별 학습 횟수·정답/문항 합계·출석 여부 → 기간 조회도 최대 일수만큼
+- user_weekly_activity: KST 주(월요일 시작)별 정답/문항 합계·출석 요일 비트 (docs/sql/user_weekly_activity.sql) → N주 = 최대 N행
+- user_activity_bitmap: 연도별 학습일·출석일 비트맵 (bit n = 1월 1일 + n일, docs/sql/user_activity_bitmap.sql) → 1년 = 1행
+  연속 학습일·월별 학습일 수는 이 비트맵에서만 계산 (get_streak / bitmap_count)
+집계 테이블은 study_logs / reward_history INSERT 트리거로 갱신되므로 이력 길이와 무관하게 몇 행만 읽음.
+테이블이 아직 없는 DB면 None 반환 → 호출한 API 가 기존 원본 이력 조회로 계산 (이후 호출도 바로 기존 경로).
+ACTIVITY_ROLLUP_ENABLED=0 이면 항상 기존 경로.
+"""
+
+import os
+import threading
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from core.database import supabase
+
+ACTIVITY_ROLLUP_ENABLED = (os.getenv("ACTIVITY_ROLLUP_ENABLED", "1").strip().lower() in ("1", "true", "yes", "on"))
+
+# 집계 날짜 기준 (KST, 서머타임 없음)
+KST = timezone(timedelta(hours=9))
+
+# 없는 것으로 확인된 집계 테이블 (테이블마다 따로 기존 경로로 전환)
+_missing_tables: Set[str] = set()
+_rollup_lock = threading.Lock()
+
+
+def kst_today() -> date:
+    return datetime.now(KST).date()
+
+
+def kst_date(value) -> Optional[date]:
+    """completed_at / created_at 값(ISO 문자열 또는 datetime) → KST 날짜 (시간대 없는 값은 그 날짜 그대로)"""
+    if not value:
+        return None
+    dt = value if isinstance(value, datetime) else datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return dt.astimezone(KST).date() if dt.tzinfo else dt.date()
+
+
+def kst_midnight(day: date) -> str:
+    """KST 날짜 0시 (원본 이력 completed_at 범위 조회용 ISO 문자열)"""
+    return datetime(day.year, day.month, day.day, tzinfo=KST).isoformat()
+
+
+def _missing_table(e: Exception) -> bool:
+    """집계 테이블이 없는 DB 오류인지 (PostgREST 스키마 캐시에 없음 / Postgres relation 없음)"""
+    code = getattr(e, "code", None)
+    text = str(e)
+    return code in ("PGRST205", "42P01") or "PGRST205" in text or "42P01" in text or "does not exist" in text
+
+
+def _disable(table: str, e: Exception) -> None:
+    with _rollup_lock:
+        if table not in _missing_tables:
+            print(f"⚠️ 학습 집계 테이블 {table} 없음 → 기존 원본 이력 조회 사용 (docs/sql/ 적용 필요): {e}")
+        _missing_tables.add(table)
+
+
+def _query(table: str, build) -> Optional[List[Dict[str, Any]]]:
+    """집계 테이블 조회 (build: 테이블 쿼리 → 조건 추가). 사용할 수 없으면 None."""
+    if not ACTIVITY_ROLLUP_ENABLED or table in _missing_tables:
+        return None
+    try:
+        return build(supabase.table(table)).execute().data or []
+    except Exception as e:
+        if not _missing_table(e):
+            raise
+        _disable(table, e)
+        return None
+
+
+def get_activity_summary(email: str) -> Optional[Dict[str, Any]]:
+    """
+    {"total_count", "total_days", "correct_sum", "question_sum", "last_day"}.
+    연속 학습일은 get_streak (학습일 비트맵).
+    """
+    rows = _query("user_activity_summary", lambda q: q.select("*").eq("user_email", email).limit(1))
+    if rows is None:
+        return None
+    row = rows[0] if rows else {}
+    return {
+        "total_count": row.get("total_count") or 0,
+        "total_days": row.get("total_days") or 0,
+        "correct_sum": row.get("correct_sum") or 0,
+        "question_sum": row.get("question_sum") or 0,
+        "last_day": row.get("last_day"),
+    }
+
+
+def get_daily_activity(email: str, start: date, end: date) -> Optional[List[Dict[str, Any]]]:
+    """[start, end) 기간의 날짜별 집계 행 (학습·출석이 있는 날만, 날짜 순)."""
+    return _query(
+        "user_daily_activity",
+        lambda q: q.select("day, study_count, correct_sum, question_sum, attended")
+        .eq("user_email", email)
+        .gte("day", start.isoformat())
+        .lt("day", end.isoformat())
+        .order("day")
+    )
+
+
+def count_studies(email: str, start: date, end: date) -> Optional[int]:
+    """[start, end) 기간 학습 횟수 (최대 기간 일수만큼의 행 합계). 집계를 쓸 수 없으면 None."""
+    rows = get_daily_activity(email, start, end)
+    if rows is None:
+        return None
+    return sum(row.get("study_count") or 0 for row in rows)
+
+
+def kst_week_start(day: date) -> date:
+    """그 주 월요일"""
+    return day - timedelta(days=day.weekday())
+
+
+def get_weekly_activity(email: str, start: date, end: date) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    [start, end) 기간의 주간 집계 (docs/sql/user_weekly_activity.sql) → {주 시작 월요일 ISO: 행}.
+    행: study_count, correct_sum, question_sum, attendance_mask(bit 0 = 월 … bit 6 = 일). 기간 N주 = 최대 N행.
+    """
+    rows = _query(
+        "user_weekly_activity",
+        lambda q: q.select("week_start, study_count, correct_sum, question_sum, attendance_mask")
+        .eq("user_email", email)
+        .gte("week_start", start.isoformat())
+        .lt("week_start", end.isoformat())
+    )
+    if rows is None:
+        return None
+    return {row["week_start"]: row for row in rows}
+
+
+def _bitmap_int(value) -> int:
+    """bytea 비트맵 (PostgREST 는 "\\x..." 16진 문자열) → int. Postgres set_bit 순서 그대로 bit n = 바이트 n//8 의 n%8 번째 비트."""
+    if not value:
+        return 0
+    if isinstance(value, str):
+        value = bytes.fromhex(value[2:] if value.startswith("\\x") else value)
+    return int.from_bytes(value, "little")
+
+
+def get_activity_bitmaps(email: str, years: List[int]) -> Optional[Dict[int, Dict[str, int]]]:
+    """연도별 비트맵 → {연도: {"study": int, "attendance": int}} (기록이 없는 연도는 빠짐). 연도 수 = 최대 행 수."""
+    rows = _query(
+        "user_activity_bitmap",
+        lambda q: q.select("year, study_bits, attend_bits")
+        .eq("user_email", email)
+        .in_("year", list(years))
+    )
+    if rows is None:
+        return None
+    return {
+        int(row["year"]): {
+            "study": _bitmap_int(row.get("study_bits")),
+            "attendance": _bitmap_int(row.get("attend_bits")),
+        }
+        for row in rows
+    }
+
+
+def bitmap_days(mask: int, year: int) -> List[date]:
+    """켜진 비트 → 날짜 (가장 낮은 비트부터 하나씩 떼어냄, 켜진 날 수만큼만 반복)"""
+    jan1 = date(year, 1, 1)
+    days = []
+    while mask:
+        low = mask & -mask
+        days.append(jan1 + timedelta(days=low.bit_length() - 1))
+        mask ^= low
+    return days
+
+
+def bitmap_count(mask: int, year: int, start: date, end: date) -> int:
+    """[start, end) 기간(같은 연도 안)의 켜진 날 수 = 시프트 + 마스크 + popcount"""
+    offset = (start - date(year, 1, 1)).days
+    width = (end - start).days
+    if width <= 0:
+        return 0
+    return bin((mask >> offset) & ((1 << width) - 1)).count("1")
+
+
+def bitmap_streak(mask: int, day: date) -> int:
+    """day 에서 끝나는 연속 켜진 날 수 (day 가 꺼져 있으면 0). 1월 1일까지 이어지면 이전 연도는 호출한 쪽에서 이어 붙임."""
+    idx = (day - date(day.year, 1, 1)).days
+    window = (1 << (idx + 1)) - 1
+    # day 이하에서 가장 높은 꺼진 비트 위치 → 그 위부터 day 까지가 연속 구간
+    gaps = ~mask & window
+    return idx - (gaps.bit_length() - 1) if gaps else idx + 1
+
+
+def streak_from_bitmaps(bitmaps: Dict[int, Dict[str, int]], day: date) -> int:
+    """
+    day(KST)에서 끝나는 연속 학습일 (day 에 학습이 없으면 0).
+    bitmaps: get_activity_bitmaps 결과 — 1월 1일까지 이어지면 작년 비트맵의 12월 31일부터 이어서 셈.
+    """
+    empty = {"study": 0}
+    streak = bitmap_streak((bitmaps.get(day.year) or empty)["study"], day)
+    if streak == (day - date(day.year, 1, 1)).days + 1:
+        streak += bitmap_streak((bitmaps.get(day.year - 1) or empty)["study"], date(day.year - 1, 12, 31))
+    return streak
+
+
+def get_streak(email: str, day: Optional[date] = None) -> Optional[int]:
+    """오늘(KST)까지 이어진 연속 학습일 (비트맵 최대 2행). 비트맵을 쓸 수 없으면 None."""
+    day = day or kst_today()
+    bitmaps = get_activity_bitmaps(email, [day.year, day.year - 1])
+    if bitmaps is None:
+        return None
+    return streak_from_bitmaps(bitmaps, day)
@@ -1,3 +1,4 @@
+import random
 import requests
 import uuid
 import time
@@ -6,19 +7,125 @@ import re
 import os
 from openai import OpenAI
 import io  
+import threading
 from pdf2image import convert_from_bytes 
 from pypdf import PdfReader
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+
+from service.compute_service import ComputeBusyError, ComputeTimeoutError, run_compute
+from service.keyword_cache_service import keyword_cache
+from service.keyword_router_service import keyword_router
+from service.local_keyword_service import corpus_stats, extract_local_keywords
+from service.ocr_layout_service import reconstruct_pages_layout, reconstruct_regions_layout
+from service.resilience_service import (
+    MIN_ATTEMPT_SECONDS,
+    CircuitOpenError,
+    DeadlineExceededError,
+    UpstreamError,
+    clova_upstream,
+    openai_upstream,
+    retryable,
+)
+from service.pdf_service import PDF_TEXT_LAYER_ENABLED, build_pdf, extract_text_layer, is_pdf, open_pdf
+
+# OCR 결과 형식/프롬프트가 바뀌면 올려서 기존 OCR 결과 캐시를 무효화
+OCR_SERVICE_VERSION = "ocr-v2"
+
+# 키워드 추출 모드
+# - sequential: 페이지 순차
+# - concurrent: 페이지 병렬 (동시 요청 수 제한)
+# - batch: 짧은 페이지 여러 개를 토큰 예산 안에서 한 번의 GPT 요청으로 묶음 (묶음끼리는 병렬)
+# - local: GPT 없이 로컬 TF-IDF 추출 (빠른 모드, 외부 호출 없음)
+KEYWORD_MODE_SEQUENTIAL = "sequential"
+KEYWORD_MODE_CONCURRENT = "concurrent"
+KEYWORD_MODE_BATCH = "batch"
+KEYWORD_MODE_LOCAL = "local"
+
+# 페이지 키워드 출처
+KEYWORD_SOURCE_GPT = "gpt"
+KEYWORD_SOURCE_CACHE = "cache"
+KEYWORD_SOURCE_LOCAL = "local"
+# 텍스트가 없어 추출하지 않은 페이지 (GPT 결과가 빈 것과 구분)
+KEYWORD_SOURCE_EMPTY = "empty"
+
+# 페이지 텍스트 출처
+PAGE_SOURCE_TEXT_LAYER = "text_layer"
+PAGE_SOURCE_CLOVA = "clova"
+PAGE_SOURCE_FAILED = "failed"
+
+# Clova OCR 실패 원인 (ClovaOCRError.reason)
+# - circuit_open: 서킷 브레이커가 열려 호출하지 않음 / deadline: 마감 안에 응답 없음
+# - unavailable: 429·5xx·타임아웃·연결 오류가 재시도 후에도 계속됨 (다시 시도하면 될 수 있음)
+# - rejected: 4xx 응답 (입력 파일 문제) / invalid: 응답을 해석하지 못함
+CLOVA_FAILURE_CIRCUIT_OPEN = "circuit_open"
+CLOVA_FAILURE_DEADLINE = "deadline"
+CLOVA_FAILURE_UNAVAILABLE = "unavailable"
+CLOVA_FAILURE_REJECTED = "rejected"
+CLOVA_FAILURE_INVALID = "invalid"
+
+
+class ClovaOCRError(Exception):
+    """Clova OCR 실패. reason 으로 서킷 브레이커·마감·입력 오류를 구분 (retryable: 다시 요청하면 성공할 수 있는지)"""
+
+    def __init__(self, reason, message, status=None, retryable=None):
+        super().__init__(message)
+        self.reason = reason
+        self.status = status
+        self.retryable = reason == CLOVA_FAILURE_UNAVAILABLE if retryable is None else retryable
+
+
+KEYWORD_SYSTEM_PROMPT = (
+    "제공된 텍스트에서 학습에 필요한 핵심 단어(명사)만 추출하세요.\n"
+    "1. 한글 명사와 영어 단어(명사) 모두 추출하세요. 텍스트에 영어가 있으면 영어 단어도 반드시 포함하세요.\n"
+    "2. 숫자나 중요한 고유명사도 포함하세요.\n"
+    "3. 반드시 ['단어1', '단어2'] 형태의 JSON 배열로만 답변하세요.\n"
+    "4. 조사, 형용사는 제외하고 명사만 포함하세요."
+)
+
+# batch 모드: 여러 페이지를 한 번에 보내고 페이지 번호를 키로 한 JSON 객체로 응답받음
+KEYWORD_BATCH_SYSTEM_PROMPT = (
+    "여러 페이지의 텍스트가 [페이지 번호] 머리말과 함께 주어집니다. 페이지마다 학습에 필요한 핵심 단어(명사)만 추출하세요.\n"
+    "1. 한글 명사와 영어 단어(명사) 모두 추출하세요. 텍스트에 영어가 있으면 영어 단어도 반드시 포함하세요.\n"
+    "2. 숫자나 중요한 고유명사도 포함하세요.\n"
+    "3. 조사, 형용사는 제외하고 명사만 포함하세요.\n"
+    '4. 반드시 {"pages": {"페이지 번호": ["단어1", "단어2"], ...}} 형태의 JSON 객체로만 답변하세요. '
+    "주어진 모든 페이지 번호를 키로 포함하세요."
+)
+
 
 class CLOVAOCRService:
-    def __init__(self, api_key):
+    def __init__(self, api_key, keyword_mode=None, keyword_concurrency=None):
         self.api_key = api_key
         # OpenAI 클라이언트 초기화
-        self.gpt_client = OpenAI(api_key=api_key) 
-        self.model = "gpt-4o" 
+        # 재시도는 resilience_service(openai_upstream)에서 마감·서킷 브레이커와 함께 처리
+        self.gpt_client = OpenAI(api_key=api_key, max_retries=0)
+        # 기본(긴 페이지) 모델 — 페이지별 실제 모델은 keyword_router가 길이·지연·마감으로 선택
+        self.model = keyword_router.model
+
+        # 키워드 추출 방식 및 동시 GPT 요청 수 상한 (환경변수로 조정)
+        self.keyword_mode = keyword_mode or os.getenv("GPT_KEYWORD_MODE", KEYWORD_MODE_CONCURRENT)
+        self.keyword_concurrency = max(1, int(keyword_concurrency or os.getenv("GPT_KEYWORD_CONCURRENCY", "4")))
+        # batch 모드: 한 요청에 담을 페이지 텍스트의 추정 토큰 예산 / 최대 페이지 수
+        self.keyword_batch_tokens = int(os.getenv("GPT_KEYWORD_BATCH_TOKENS", "3000"))
+        self.keyword_batch_max_pages = max(1, int(os.getenv("GPT_KEYWORD_BATCH_MAX_PAGES", "10")))
+        # GPT 키워드 추출 시간 예산(초): 넘으면 남은 페이지는 로컬 추출로 대체 (0이면 제한 없음)
+        self.keyword_budget_seconds = float(os.getenv("GPT_KEYWORD_BUDGET_SECONDS", "20"))
         
         # 네이버 클로바 설정 (환경변수)
         self.clova_url = os.getenv("CLOVA_OCR_URL")
         self.clova_secret = os.getenv("CLOVA_OCR_SECRET")
+        # 긴 PDF 분할 전송: 묶음당 페이지 수(0이면 분할 안 함) / 동시 요청 수 / 묶음별 재시도 횟수
+        self.clova_pdf_chunk_pages = int(os.getenv("CLOVA_PDF_CHUNK_PAGES", "5"))
+        self.clova_pdf_concurrency = max(1, int(os.getenv("CLOVA_PDF_CONCURRENCY", "3")))
+        self.clova_chunk_retries = max(0, int(os.getenv("CLOVA_CHUNK_RETRIES", "1")))
+        # PDF 한 건의 전체 Clova 마감(초, 모든 묶음·재시도·페이지 단위 재요청 합계) / 페이지 단위 재요청에 필요한 최소 남은 시간
+        self.clova_pdf_deadline_seconds = float(os.getenv("CLOVA_PDF_DEADLINE_SECONDS", "180"))
+        self.clova_resplit_min_seconds = float(os.getenv("CLOVA_RESPLIT_MIN_SECONDS", "15"))
+
+
+    def cache_version(self):
+        """OCR 결과 캐시 키에 포함할 버전 문자열 (서비스 버전 + Clova API 버전 + GPT 모델 구성)"""
+        return f"{OCR_SERVICE_VERSION}:clova-V2:{keyword_router.signature()}"
 
     
     def get_estimation_message(self, files_data, secret_key):
@@ -57,11 +164,14 @@ class CLOVAOCRService:
     
     
     
-    def extract_text_with_clova(self, file_bytes, filename):
+    def extract_text_with_clova(self, file_bytes, filename, tiles=None, deadline=None):
         """네이버 클로바 OCR을 사용하여 페이지별로 텍스트 추출.
         file_bytes: 원본 또는 ocr_app에서 crop된 잘린 이미지 bytes (좌표 적용 후 넘어옴).
+        tiles: 여러 영역을 이어 붙인 캔버스면 캔버스 안 영역 위치 목록 → 영역별 결과 반환.
+        deadline: 이 호출에 쓸 수 있는 시간(초) — 호출한 쪽 전체 마감의 남은 시간 (없으면 clova_upstream 기본 마감).
+        반환: 페이지(영역)별 {"text", "geometry"(단어 좌표)} 목록. 실패 시 ClovaOCRError (reason 으로 원인 구분).
         """
-        pages_text = []
+        pages = []
         
         try:
             # 파일 확장자 확인
@@ -81,140 +191,605 @@ class CLOVAOCRService:
                 file_ext = 'jpg'  # 알 수 없는 경우 기본값 jpg
 
 
-            # 클로바 OCR 요청 데이터 구성 (lang은 message 최상위, 공식값: ko/ja/zh-TW)
-            request_json = {
-                'version': 'V2',
-                'requestId': str(uuid.uuid4()),
-                'timestamp': int(round(time.time() * 1000)),
-                'lang': 'ko',
-                'images': [{'format': file_ext, 'name': 'ocr_request'}]
-            }
-
             headers = {'X-OCR-SECRET': self.clova_secret}
-            payload = {'message': json.dumps(request_json)}
-            
-            files = [('file', (filename, file_bytes, 'application/octet-stream'))]
-
-            # 클로바 API 호출
-            response = requests.post(
-                self.clova_url, 
-                headers=headers, 
-                data=payload, 
-                files=files,
-                timeout=180
-            )
+
+            # mmap(스풀링된 업로드)은 전송 직전에만 bytes로 (requests가 multipart 본문을 메모리에서 조립)
+            if not isinstance(file_bytes, (bytes, bytearray)):
+                file_bytes = file_bytes[:]
+
+            def post(timeout):
+                # 클로바 OCR 요청 데이터 구성 (lang은 message 최상위, 공식값: ko/ja/zh-TW) — 시도마다 새 requestId
+                request_json = {
+                    'version': 'V2',
+                    'requestId': str(uuid.uuid4()),
+                    'timestamp': int(round(time.time() * 1000)),
+                    'lang': 'ko',
+                    'images': [{'format': file_ext, 'name': 'ocr_request'}]
+                }
+                response = requests.post(
+                    self.clova_url,
+                    headers=headers,
+                    data={'message': json.dumps(request_json)},
+                    files=[('file', (filename, file_bytes, 'application/octet-stream'))],
+                    timeout=timeout
+                )
+                # 429/5xx는 재시도·서킷 브레이커 대상, 그 외 오류 응답은 그대로 반환
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise UpstreamError("Clova", response.status_code, response.text)
+                return response
+
+            # 클로바 API 호출 (시도 제한·마감·재시도·서킷 브레이커: service/resilience_service.py)
+            response = clova_upstream.call(post, deadline=deadline)
             
             if response.status_code == 200:
                 result = response.json()
                 
                 # [핵심] 클로바는 PDF의 각 페이지를 'images' 리스트의 개별 요소로 반환합니다.
-                for image in result.get('images', []):
-                    fields = image.get('fields', [])
-                    if not fields:
-                        pages_text.append("")
-                        continue
-
-                    # --- [정렬 로직 시작] ---
-                    # 1. 모든 필드를 Y좌표 기준으로 먼저 정렬 (위 -> 아래)
-                    fields.sort(key=lambda x: x['boundingPoly']['vertices'][0]['y'])
-
-                    lines = []
-                    current_line = []
-                    # 첫 줄의 기준 Y좌표 설정
-                    last_y = fields[0]['boundingPoly']['vertices'][0]['y']
-
-                    for field in fields:
-                        current_y = field['boundingPoly']['vertices'][0]['y']
-                        
-                        # Y좌표 차이가 15보다 크면 새로운 줄로 간주
-                        if abs(current_y - last_y) > 15:
-                            # 이전 줄이 완성되었으므로 X좌표로 정렬 (왼쪽 -> 오른쪽)
-                            current_line.sort(key=lambda x: x['boundingPoly']['vertices'][0]['x'])
-                            lines.append(current_line)
-                            
-                            current_line = [field]
-                            last_y = current_y
-                        else:
-                            current_line.append(field)
-                    
-                    # 마지막 줄 처리
-                    current_line.sort(key=lambda x: x['boundingPoly']['vertices'][0]['x'])
-                    lines.append(current_line)
-
-                    # 2. 정렬된 줄들을 하나의 텍스트로 합치기
-                    full_page_text = ""
-                    for line in lines:
-                        line_text = " ".join([f.get('inferText', '') for f in line])
-                        full_page_text += line_text + "\n"
-
-                    pages_text.append(full_page_text.strip())
-                    print(f"✅ {len(pages_text)}페이지 추출 및 정렬 완료")
-                    # --- [정렬 로직 끝] ---
-
-                return pages_text
+                pages_fields = [image.get('fields', []) for image in result.get('images', [])]
+                # 줄 복원: 글자 높이 기준 임계값 + 기울기 보정 + 다단 인식 (service/ocr_layout_service.py)
+                # 캔버스(여러 영역)면 필드 좌표로 영역별로 나눈 뒤 영역마다 줄 복원
+                if tiles is not None:
+                    fn, args = reconstruct_regions_layout, (pages_fields[0] if pages_fields else [], tiles)
+                else:
+                    fn, args = reconstruct_pages_layout, (pages_fields,)
+                # CPU 프로세스 풀에서 실행, 풀이 혼잡하거나 느리면 이미 받은 Clova 결과를 버리지 않도록 현재 스레드에서 처리
+                try:
+                    pages = run_compute(fn, *args)
+                except (ComputeBusyError, ComputeTimeoutError) as e:
+                    print(f"⚠️ 레이아웃 복원 프로세스 풀 사용 불가, 직접 처리: {e}")
+                    pages = fn(*args)
+                print(f"✅ {len(pages)}{'개 영역' if tiles is not None else '페이지'} 추출 및 정렬 완료")
+
+                return pages
             else:
                 print(f"❌ Clova API 에러: {response.status_code}, {response.text}")
-                return None
+                raise ClovaOCRError(
+                    CLOVA_FAILURE_REJECTED, f"OCR 요청이 거부되었습니다. ({response.status_code})", response.status_code
+                )
+        except ClovaOCRError:
+            raise
+        except CircuitOpenError as e:
+            print(f"🚧 Clova 호출 생략: {e}")
+            raise ClovaOCRError(CLOVA_FAILURE_CIRCUIT_OPEN, str(e)) from e
+        except DeadlineExceededError as e:
+            print(f"🚧 Clova 호출 중단: {e}")
+            raise ClovaOCRError(CLOVA_FAILURE_DEADLINE, "OCR 응답 시간이 초과되었습니다.") from e
         except Exception as e:
             print(f"❌ OCR 처리 중 예외 발생: {e}")
-            return None
+            if retryable(e):
+                raise ClovaOCRError(
+                    CLOVA_FAILURE_UNAVAILABLE, "OCR 서비스가 일시적으로 응답하지 않습니다.", getattr(e, "status_code", None)
+                ) from e
+            raise ClovaOCRError(CLOVA_FAILURE_INVALID, f"OCR 처리 중 오류가 발생했습니다: {e}") from e
 
 
-    
-    def process_file(self, file_bytes, filename):
-        """텍스트 추출 및 페이지별 GPT 키워드 추출 실행.
-        file_bytes: ocr_app에서 전달 — crop 적용 시 잘린 이미지 bytes만 넘어옴.
+
+    def _clova_with_retry(self, file_bytes, filename, expected_pages, ends):
         """
-        total_start = time.time()
-        # 1. OCR 텍스트 추출 (전달받은 이미지 = 원본 또는 잘린 영역만)
-        all_pages_text = self.extract_text_with_clova(file_bytes, filename)
-        
+        Clova 호출 + 재시도 (clova_chunk_retries회). 페이지 수가 기대와 다르면 실패로 간주. 최종 실패 시 ClovaOCRError.
+        (429/5xx·타임아웃 재시도는 clova_upstream 안에서 처리, 여기서는 응답 내용 불일치 등 retryable 실패만 재시도)
+        ends: PDF 전체 마감 시각(time.time() 기준) — 매 호출에 남은 시간만 넘기고, 남은 시간이 없으면 재시도하지 않음.
+        4xx·서킷 브레이커 열림·마감 초과는 재시도하지 않고 바로 실패.
+        """
+        attempt = 0
+        while True:
+            try:
+                pages = self.extract_text_with_clova(file_bytes, filename, deadline=ends - time.time())
+                if len(pages) == expected_pages:
+                    return pages
+                print(f"⚠️ Clova 응답 페이지 수 불일치: 요청 {expected_pages}, 응답 {len(pages)}")
+                error = ClovaOCRError(
+                    CLOVA_FAILURE_INVALID, f"OCR 응답 페이지 수가 다릅니다. (요청 {expected_pages}, 응답 {len(pages)})",
+                    retryable=True,
+                )
+            except ClovaOCRError as e:
+                error = e
+            if not error.retryable or attempt >= self.clova_chunk_retries:
+                raise error
+            # 짧은 full jitter 대기 후 재시도 (대기 후에도 한 번 시도할 시간이 남아 있을 때만)
+            backoff = random.uniform(0, min(2.0, 0.5 * (2 ** attempt)))
+            if ends - time.time() - backoff < MIN_ATTEMPT_SECONDS:
+                raise error
+            attempt += 1
+            print(f"🔁 Clova 재시도 {attempt}/{self.clova_chunk_retries} ({expected_pages}페이지): {error}")
+            time.sleep(backoff)
 
-        gpt_start = time.time()
 
-        if not all_pages_text:
-            return {"status": "error", "message": "OCR 텍스트를 추출하지 못했습니다."}
+    def _ocr_pdf_chunk(self, file_bytes, reader, chunk, filename, chunked, reader_lock, ends):
+        """
+        PDF 페이지 묶음(chunk) 하나를 OCR 해 (chunk 순서대로 {"text", "geometry"} 목록, 마지막 ClovaOCRError) 반환.
+        실패 페이지는 None. chunked 모드에서 묶음이 재시도 후에도 실패하면 페이지 단위로 나눠 다시 요청
+        → 문제 페이지만 실패 처리. 서킷 브레이커가 열렸거나 마감이 지났거나, 남은 시간이
+        clova_resplit_min_seconds 보다 짧으면 나누지 않음.
+        reader_lock: 여러 묶음 스레드가 같은 PdfReader(같은 스트림 위치)를 동시에 읽지 않도록 보호
+        ends: PDF 전체 마감 시각 (_ocr_pdf_pages)
+        """
+        try:
+            with reader_lock:
+                whole = list(chunk) == list(range(len(reader.pages)))
+                data = file_bytes if whole else build_pdf(reader, chunk)
+        except Exception as e:
+            print(f"❌ 부분 PDF 생성 실패 ({[idx + 1 for idx in chunk]}페이지): {e}")
+            return [None] * len(chunk), ClovaOCRError(CLOVA_FAILURE_INVALID, f"부분 PDF 생성 실패: {e}")
+
+        try:
+            return self._clova_with_retry(data, filename, len(chunk), ends), None
+        except ClovaOCRError as e:
+            error = e
+        if (
+            not chunked
+            or len(chunk) == 1
+            or error.reason in (CLOVA_FAILURE_CIRCUIT_OPEN, CLOVA_FAILURE_DEADLINE)
+            or ends - time.time() < self.clova_resplit_min_seconds
+        ):
+            return [None] * len(chunk), error
 
-        all_keywords = []
+        print(f"⚠️ {chunk[0] + 1}~{chunk[-1] + 1}페이지 묶음 실패 → 페이지 단위로 재요청 (남은 {ends - time.time():.0f}초)")
+        pages = []
+        for idx in chunk:
+            page, page_error = self._ocr_pdf_chunk(file_bytes, reader, [idx], filename, chunked, reader_lock, ends)
+            pages.append(page[0])
+            error = page_error or error
+        return pages, error if None in pages else None
 
-        # 2. 각 페이지별로 루프를 돌며 키워드 추출
-        for i, page_text in enumerate(all_pages_text):
+
+    def _ocr_pdf_pages(self, file_bytes, reader, page_indices, filename, progress_callback=None):
+        """
+        PDF의 page_indices 페이지를 OCR 해 (같은 순서의 {"text", "geometry"} 목록, 첫 ClovaOCRError) 반환 (실패 페이지는 None).
+        페이지 수가 clova_pdf_chunk_pages보다 많으면 로컬에서 페이지 범위로 나눠
+        최대 clova_pdf_concurrency개 묶음을 동시에 Clova로 보냄 → 긴 PDF도 대략 묶음 하나의 시간에 끝남.
+        progress_callback: (OCR 완료 페이지 수, 전체 OCR 페이지 수)
+        전체가 clova_pdf_deadline_seconds 마감 하나를 공유 (묶음 재시도·페이지 단위 재요청 포함) → 그 안에 못 끝난 페이지는 실패.
+        """
+        ends = time.time() + self.clova_pdf_deadline_seconds
+        size = self.clova_pdf_chunk_pages
+        chunked = 0 < size < len(page_indices)
+        chunks = [page_indices[i:i + size] for i in range(0, len(page_indices), size)] if chunked else [page_indices]
+        results = [None] * len(chunks)
+        errors = []
+        reader_lock = threading.Lock()
+        done = 0
+        if progress_callback:
+            progress_callback(0, len(page_indices))
+
+        if len(chunks) == 1:
+            results[0], error = self._ocr_pdf_chunk(file_bytes, reader, chunks[0], filename, chunked, reader_lock, ends)
+            errors.append(error)
+        else:
+            print(f"📦 PDF {len(page_indices)}페이지 → {len(chunks)}개 묶음으로 나눠 OCR (동시 {self.clova_pdf_concurrency}개)")
+            workers = min(self.clova_pdf_concurrency, len(chunks))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="clova-chunk") as executor:
+                futures = {
+                    executor.submit(
+                        self._ocr_pdf_chunk, file_bytes, reader, chunk, filename, chunked, reader_lock, ends
+                    ): pos
+                    for pos, chunk in enumerate(chunks)
+                }
+                for future in as_completed(futures):
+                    pos = futures[future]
+                    results[pos], error = future.result()
+                    errors.append(error)
+                    done += len(chunks[pos])
+                    if progress_callback:
+                        progress_callback(done, len(page_indices))
+        pages = [page for chunk_pages in results for page in chunk_pages]
+        return pages, next((e for e in errors if e is not None), None)
+
+
+    def extract_pages_text(self, file_bytes, filename, progress_callback=None):
+        """
+        페이지별 텍스트·출처·단어 좌표 반환: (pages_text, sources, geometries). 모든 페이지가 실패하면 ClovaOCRError.
+        geometries: Clova로 읽은 페이지만 단어 좌표, 텍스트 레이어·실패 페이지는 None.
+        PDF는 텍스트 레이어가 있는 페이지를 로컬에서 추출하고, 이미지뿐인 페이지만 Clova에 보냄
+        (페이지가 많으면 묶음으로 나눠 병렬 전송). 이미지 파일은 기존처럼 원본 그대로 Clova 호출.
+        progress_callback: (OCR 완료 페이지 수, 전체 OCR 페이지 수)
+        """
+        layer = None
+        if is_pdf(filename):
             try:
-                response = self.gpt_client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {
-                            "role": "system", 
-                            "content": (
-                                "제공된 텍스트에서 학습에 필요한 핵심 단어(명사)만 추출하세요.\n"
-                                "1. 한글 명사와 영어 단어(명사) 모두 추출하세요. 텍스트에 영어가 있으면 영어 단어도 반드시 포함하세요.\n"
-                                "2. 숫자나 중요한 고유명사도 포함하세요.\n"
-                                "3. 반드시 ['단어1', '단어2'] 형태의 JSON 배열로만 답변하세요.\n"
-                                "4. 조사, 형용사는 제외하고 명사만 포함하세요."
-                            )
-                        },
-                        {
-                            "role": "user", 
-                            "content": f"다음 텍스트에서 한글 명사와 영어 단어를 모두 포함해 키워드만 뽑아줘:\n\n{page_text}"
-                        }
-                    ],
-                    temperature=0
-                )
-                
-                content = response.choices[0].message.content.strip()
-                match = re.search(r'\[.*\]', content, re.DOTALL)
-                
-                if match:
-                    json_str = match.group().replace("'", '"')
-                    keywords = json.loads(json_str)
+                reader = open_pdf(file_bytes)
+                layer = extract_text_layer(reader) if PDF_TEXT_LAYER_ENABLED else [None] * len(reader.pages)
+            except Exception as e:
+                print(f"⚠️ PDF 페이지 확인 실패, 전체 OCR 진행: {e}")
+
+        if not layer:
+            pages = self.extract_text_with_clova(file_bytes, filename)
+            if not pages:
+                raise ClovaOCRError(CLOVA_FAILURE_INVALID, "OCR 결과에 페이지가 없습니다.")
+            return [p["text"] for p in pages], [PAGE_SOURCE_CLOVA] * len(pages), [p["geometry"] for p in pages]
+
+        ocr_indices = [i for i, text in enumerate(layer) if text is None]
+        if len(ocr_indices) < len(layer):
+            print(f"📄 텍스트 레이어 {len(layer) - len(ocr_indices)}페이지 로컬 추출, OCR 대상 {len(ocr_indices)}페이지")
+        pages_text = list(layer)
+        sources = [PAGE_SOURCE_TEXT_LAYER if text is not None else PAGE_SOURCE_CLOVA for text in layer]
+        geometries = [None] * len(layer)
+        error = None
+        if ocr_indices:
+            ocr_pages, error = self._ocr_pdf_pages(file_bytes, reader, ocr_indices, filename, progress_callback)
+            # OCR 결과를 원래 페이지 위치로 되돌림. 실패 페이지는 빈 텍스트 (사용량 차감 없음)
+            for idx, page in zip(ocr_indices, ocr_pages):
+                if page is None:
+                    pages_text[idx] = ""
+                    sources[idx] = PAGE_SOURCE_FAILED
                 else:
-                    keywords = []
+                    pages_text[idx] = page["text"]
+                    geometries[idx] = page["geometry"]
+        if all(source == PAGE_SOURCE_FAILED for source in sources):
+            raise error or ClovaOCRError(CLOVA_FAILURE_INVALID, "OCR 텍스트를 추출하지 못했습니다.")
+        return pages_text, sources, geometries
 
-                all_keywords.append(keywords)
 
-            except Exception as e:
-                print(f"페이지 {i+1} GPT 에러: {e}")
-                all_keywords.append([]) 
+    @staticmethod
+    def _parse_keyword_list(content):
+        """GPT 응답에서 키워드 배열 파싱. JSON 배열 우선, 실패 시 [...] 구간을 찾아 작은따옴표 보정 후 파싱."""
+        try:
+            parsed = json.loads(content)
+            if isinstance(parsed, list):
+                return [str(w) for w in parsed]
+        except ValueError:
+            pass
+        match = re.search(r'\[.*\]', content, re.DOTALL)
+        if match:
+            json_str = match.group().replace("'", '"')
+            return json.loads(json_str)
+        return []
+
+
+    @staticmethod
+    def _parse_batch_keywords(content, page_indices):
+        """
+        batch 응답 {"pages": {"0": [...], "3": [...]}} 검증.
+        값이 비어 있지 않은 문자열 배열인 페이지만 {페이지 인덱스: 키워드} 로 반환
+        (누락/형식 오류/빈 배열 페이지는 제외 — 텍스트가 있는 페이지만 보내므로 빈 배열은 모델이 빠뜨린 것으로 봄).
+        """
+        data = json.loads(content)
+        pages = data.get("pages") if isinstance(data, dict) else None
+        if not isinstance(pages, dict):
+            raise ValueError("batch 응답에 pages 객체가 없습니다.")
+        parsed = {}
+        for idx in page_indices:
+            words = pages.get(str(idx))
+            if isinstance(words, list) and all(isinstance(w, str) for w in words):
+                keywords = [w.strip() for w in words if w.strip()]
+                if keywords:
+                    parsed[idx] = keywords
+        return parsed
+
+
+    @staticmethod
+    def _estimate_tokens(text):
+        """토큰 수 대략 추정 (한글 1자 ≈ 1토큰, 그 외 4자 ≈ 1토큰). 배치 예산 계산용."""
+        hangul = sum(1 for ch in text if '가' <= ch <= '힣')
+        return hangul + (len(text) - hangul) // 4 + 1
+
+
+    def _pack_batches(self, pages_text):
+        """
+        페이지 순서대로 토큰 예산(keyword_batch_tokens) 안에서 묶음 생성.
+        예산을 넘는 긴 페이지는 단독 묶음. 빈 페이지는 GPT 호출 없이 [] 처리하므로 제외.
+        """
+        batches = []
+        current, current_tokens = [], 0
+        for i, page_text in enumerate(pages_text):
+            if not page_text.strip():
+                continue
+            tokens = self._estimate_tokens(page_text)
+            if current and (
+                current_tokens + tokens > self.keyword_batch_tokens
+                or len(current) >= self.keyword_batch_max_pages
+            ):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+
+    def _chat_keywords(self, messages, tokens, remaining=None, json_mode=False):
+        """
+        keyword_router로 모델·응답 길이를 골라 GPT 호출 (지연은 라우터에 기록).
+        반환: (응답 본문, {"keyword_model", "keyword_ms"}). 호출 실패 시 예외 그대로 전달.
+        """
+        route = keyword_router.route(tokens, remaining)
+        options = {"response_format": {"type": "json_object"}} if json_mode else {}
+
+        def create(timeout):
+            return self.gpt_client.chat.completions.create(
+                model=route["model"],
+                messages=messages,
+                temperature=0,
+                max_tokens=route["max_tokens"],
+                timeout=timeout,
+                **options,
+            )
+
+        started = time.perf_counter()
+        try:
+            # 마감 = 남은 키워드 예산, 헤징 지연 = 선택된 모델의 최근 p95 (service/resilience_service.py)
+            response = openai_upstream.call(
+                create, deadline=remaining, hedge_after=keyword_router.percentile(route["model"], 95)
+            )
+        except Exception:
+            keyword_router.record(route["model"], time.perf_counter() - started, route["reason"], ok=False)
+            raise
+        elapsed = time.perf_counter() - started
+        keyword_router.record(route["model"], elapsed, route["reason"])
+        return response.choices[0].message.content, {
+            "keyword_model": route["model"],
+            "keyword_ms": round(elapsed * 1000, 1),
+        }
+
+
+    def _extract_page_keywords(self, page_index, page_text, remaining=None):
+        """
+        한 페이지 텍스트에서 GPT로 키워드 추출 → (키워드, 호출 정보).
+        실패 시 (None, {}) 반환 (iter_keywords에서 로컬 추출로 대체). remaining: 남은 시간 예산(초).
+        """
+        try:
+            content, call = self._chat_keywords(
+                [
+                    {"role": "system", "content": KEYWORD_SYSTEM_PROMPT},
+                    {
+                        "role": "user", 
+                        "content": f"다음 텍스트에서 한글 명사와 영어 단어를 모두 포함해 키워드만 뽑아줘:\n\n{page_text}"
+                    }
+                ],
+                self._estimate_tokens(page_text),
+                remaining,
+            )
+            return self._parse_keyword_list(content.strip()), call
+
+        except Exception as e:
+            print(f"페이지 {page_index+1} GPT 에러: {e}")
+            return None, {}
+
+
+    def _extract_batch_keywords(self, page_indices, pages_text, remaining=None):
+        """
+        여러 페이지를 한 번의 GPT 요청(JSON 모드)으로 처리해 {페이지 인덱스: (키워드, 호출 정보)} 반환.
+        모델은 묶음 전체 길이로 선택. 요청 자체가 실패하면 페이지마다 단일 요청으로 다시 추출하고,
+        응답에서 빠진(누락·형식 오류·빈 배열) 페이지는 (None, {}) → iter_keywords 가 로컬 추출(keyword_source=local)로 대체.
+        """
+        if len(page_indices) == 1:
+            idx = page_indices[0]
+            return {idx: self._extract_page_keywords(idx, pages_text[idx], remaining)}
+
+        parsed = None
+        call = {}
+        try:
+            body = "\n\n".join(f"[{idx}]\n{pages_text[idx]}" for idx in page_indices)
+            content, call = self._chat_keywords(
+                [
+                    {"role": "system", "content": KEYWORD_BATCH_SYSTEM_PROMPT},
+                    {
+                        "role": "user",
+                        "content": f"페이지 번호: {', '.join(str(idx) for idx in page_indices)}\n\n{body}"
+                    }
+                ],
+                sum(self._estimate_tokens(pages_text[idx]) for idx in page_indices),
+                remaining,
+                json_mode=True,
+            )
+            parsed = self._parse_batch_keywords(content, page_indices)
+        except Exception as e:
+            print(f"페이지 {[idx + 1 for idx in page_indices]} 배치 GPT 에러: {e}")
+
+        if parsed is None:
+            print(f"⚠️ 배치 요청 실패 페이지 {[idx + 1 for idx in page_indices]} → 단일 요청으로 재시도")
+            return {idx: self._extract_page_keywords(idx, pages_text[idx], remaining) for idx in page_indices}
+
+        results = {idx: (keywords, call) for idx, keywords in parsed.items()}
+        missing = [idx for idx in page_indices if idx not in parsed]
+        if missing:
+            print(f"⚠️ 배치 응답 누락 페이지 {[idx + 1 for idx in missing]} → 로컬 키워드 추출로 대체")
+            results.update({idx: (None, {}) for idx in missing})
+        return results
+
+
+    def iter_keywords(self, pages_text, progress_callback=None, keyword_mode=None, corpus_key=None):
+        """
+        페이지별 키워드를 완료되는 순서대로 (페이지 인덱스, 키워드, 메타) 로 yield.
+        - concurrent: 최대 keyword_concurrency개 페이지를 동시에 GPT 요청 → 전체 시간 ≈ 가장 느린 페이지
+        - batch: 토큰 예산 안에서 페이지를 묶어 요청 수 자체를 줄임 (묶음끼리는 concurrent와 동일하게 병렬)
+        - sequential: 기존처럼 한 페이지씩 순차 요청
+        - local: GPT 없이 로컬 TF-IDF 추출만 (service/local_keyword_service.py)
+        키워드 캐시(service/keyword_cache_service.py)에 같은/거의 같은 텍스트가 있으면 GPT 없이 바로 yield.
+        GPT 오류 페이지, keyword_budget_seconds 안에 끝나지 않은 페이지는 로컬 추출 결과로 대체.
+        GPT 모델은 페이지 길이·최근 지연·남은 예산으로 선택 (service/keyword_router_service.py).
+        메타: {"keyword_source": "gpt" | "cache" | "local" | "empty", "keyword_model", "keyword_ms"} (모델·소요 시간은 GPT 호출 페이지만)
+        empty: 텍스트가 없어 추출하지 않은 페이지. 배치 응답에서 빠진 페이지는 local (GPT 결과가 빈 페이지와 구분).
+        keyword_mode: 요청별 모드 (없으면 GPT_KEYWORD_MODE), corpus_key: 로컬 추출 코퍼스 (사용자 이메일)
+        progress_callback: (완료 페이지 수, 전체 페이지 수)
+        """
+        total = len(pages_text)
+        mode = keyword_mode or self.keyword_mode
+        started = time.time()
+        if progress_callback:
+            progress_callback(0, total)
+
+        def local(indices, reason=None):
+            if reason:
+                print(f"⚠️ 페이지 {[idx + 1 for idx in indices]} {reason} → 로컬 키워드 추출로 대체")
+            return extract_local_keywords(pages_text, indices, corpus_key=corpus_key)
+
+        done = 0
+        if mode == KEYWORD_MODE_LOCAL:
+            for idx, keywords in local(list(range(total))).items():
+                done += 1
+                if progress_callback:
+                    progress_callback(done, total)
+                yield idx, keywords, {"keyword_source": KEYWORD_SOURCE_LOCAL}
+            return
+
+        version = self.cache_version()
+        cached = {}
+        if keyword_cache is not None:
+            for idx, page_text in enumerate(pages_text):
+                keywords = keyword_cache.get(page_text, version) if page_text.strip() else None
+                if keywords is not None:
+                    cached[idx] = keywords
+            if cached:
+                print(f"⚡ 키워드 캐시 적중: {len(cached)}/{total}페이지")
+
+        def remaining_budget():
+            if self.keyword_budget_seconds <= 0:
+                return None
+            return max(0.0, self.keyword_budget_seconds - (time.time() - started))
+
+        def finish(results):
+            """GPT 결과 {idx: (키워드, 호출 정보)} → (idx, 키워드, 메타) 목록. 실패(None) 페이지는 로컬 추출로 대체, 성공 결과만 캐시."""
+            failed = [idx for idx, (keywords, _) in results.items() if keywords is None]
+            fallback = local(failed, "GPT 실패") if failed else {}
+            finished = []
+            for idx, (keywords, call) in results.items():
+                if keywords is None:
+                    finished.append((idx, fallback[idx], {"keyword_source": KEYWORD_SOURCE_LOCAL}))
+                    continue
+                # 빈 결과는 캐시하지 않음
+                if keyword_cache is not None and keywords:
+                    keyword_cache.put(pages_text[idx], version, keywords)
+                finished.append((idx, keywords, {"keyword_source": KEYWORD_SOURCE_GPT, **call}))
+            return finished
+
+        # 남은 예산은 단위 실행이 실제로 시작될 때 계산 (병렬 대기 중에 줄어든 예산 반영)
+        if mode == KEYWORD_MODE_BATCH:
+            # 캐시 적중 페이지는 빈 텍스트로 보고 묶음에서 제외
+            units = self._pack_batches(["" if i in cached else t for i, t in enumerate(pages_text)])
+            run_unit = lambda indices: finish(self._extract_batch_keywords(indices, pages_text, remaining_budget()))
+        else:
+            units = [[i] for i in range(total) if i not in cached]
+            run_unit = lambda indices: finish(
+                {indices[0]: self._extract_page_keywords(indices[0], pages_text[indices[0]], remaining_budget())}
+            )
+
+        # 캐시 적중 페이지, 빈 페이지(batch)는 GPT 호출 없이 바로 완료 처리
+        packed = {idx for unit in units for idx in unit}
+        for idx in range(total):
+            if idx not in packed:
+                done += 1
+                if progress_callback:
+                    progress_callback(done, total)
+                source = KEYWORD_SOURCE_CACHE if idx in cached else KEYWORD_SOURCE_EMPTY
+                yield idx, cached.get(idx, []), {"keyword_source": source}
+
+        if mode == KEYWORD_MODE_SEQUENTIAL or len(units) <= 1:
+            for pos, unit in enumerate(units):
+                budget = remaining_budget()
+                if budget is not None and budget <= 0:
+                    rest = [idx for u in units[pos:] for idx in u]
+                    finished = [(idx, kw, {"keyword_source": KEYWORD_SOURCE_LOCAL})
+                                for idx, kw in local(rest, "GPT 시간 예산 초과").items()]
+                else:
+                    finished = run_unit(unit)
+                for idx, keywords, meta in finished:
+                    done += 1
+                    if progress_callback:
+                        progress_callback(done, total)
+                    yield idx, keywords, meta
+                if budget is not None and budget <= 0:
+                    return
+            return
+
+        workers = min(self.keyword_concurrency, len(units))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gpt-keyword")
+        try:
+            futures = {executor.submit(run_unit, unit): unit for unit in units}
+            pending = set(futures)
+            try:
+                for future in as_completed(futures, timeout=remaining_budget()):
+                    pending.discard(future)
+                    # 단위 실행 함수가 예외를 삼키므로 result()는 항상 목록
+                    for idx, keywords, meta in future.result():
+                        done += 1
+                        if progress_callback:
+                            progress_callback(done, total)
+                        yield idx, keywords, meta
+            except FuturesTimeoutError:
+                # 예산 안에 끝나지 않은 페이지는 로컬 추출 (늦게 끝난 GPT 결과는 키워드 캐시에만 저장됨)
+                rest = [idx for future in pending for idx in futures[future]]
+                for idx, keywords in local(rest, "GPT 시간 예산 초과").items():
+                    done += 1
+                    if progress_callback:
+                        progress_callback(done, total)
+                    yield idx, keywords, {"keyword_source": KEYWORD_SOURCE_LOCAL}
+        finally:
+            # 스트리밍 소비자가 중간에 끊겨도 대기 중인 GPT 요청은 취소
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+    def extract_keywords(self, pages_text, progress_callback=None, keyword_mode=None, corpus_key=None):
+        """페이지별 키워드 리스트를 페이지 순서대로 반환 (iter_keywords 결과를 페이지 순서로 정렬)."""
+        all_keywords = [[] for _ in pages_text]
+        for idx, keywords, _ in self.iter_keywords(
+            pages_text, progress_callback=progress_callback, keyword_mode=keyword_mode, corpus_key=corpus_key
+        ):
+            all_keywords[idx] = keywords
+        return all_keywords
+
+
+    def iter_process_file(
+        self, file_bytes, filename, progress_callback=None, tiles=None, keyword_mode=None, corpus_key=None
+    ):
+        """
+        process_file의 스트리밍 버전. 페이지가 끝나는 대로 이벤트를 yield.
+        tiles: 여러 영역 캔버스의 영역 위치 목록 — 영역 하나가 page 하나 (Clova 호출은 1회, ocr_page_count = 1)
+        keyword_mode / corpus_key: iter_keywords 로 전달 (local이면 GPT 없이 로컬 키워드 추출)
+        - {"event": "page", "page_index", "original_text", "keywords", "source", "keyword_source", "geometry"}  (완료 순서, page_index로 정렬 가능)
+          keyword_source: 키워드 출처 gpt | cache | local | empty, GPT 페이지는 keyword_model·keyword_ms 포함 (iter_keywords 참고)
+          geometry: Clova로 읽은 페이지의 단어 좌표 (service/ocr_geometry_service.py), 그 외 페이지는 없음
+        - {"event": "summary", "page_count", "ocr_page_count", "total_duration"}  (마지막, ocr_page_count = Clova로 보낸 페이지 수)
+        - {"event": "error", "message", "code"?}  (OCR 실패 시 단독, code: ClovaOCRError.reason — circuit_open/deadline/unavailable/rejected/invalid)
+        """
+        def report(stage, done=0, total=0):
+            if progress_callback:
+                progress_callback(stage, done, total)
+
+        total_start = time.time()
+        # 로컬 키워드(빠른 모드·GPT 대체) 코퍼스를 OCR 하는 동안 백그라운드로 미리 불러옴
+        corpus_stats.warm(corpus_key)
+        # 1. OCR 텍스트 추출 (전달받은 이미지 = 원본 또는 잘린 영역만, PDF 텍스트 레이어 페이지는 로컬 추출)
+        report("ocr")
+        try:
+            if tiles is not None:
+                regions = self.extract_text_with_clova(file_bytes, filename, tiles=tiles)
+                all_pages_text = [r["text"] for r in regions]
+                sources = [PAGE_SOURCE_CLOVA] * len(regions)
+                geometries = [r["geometry"] for r in regions]
+            else:
+                all_pages_text, sources, geometries = self.extract_pages_text(
+                    file_bytes, filename, progress_callback=lambda done, total: report("ocr", done, total)
+                )
+        except ClovaOCRError as e:
+            yield {"event": "error", "message": str(e), "code": e.reason}
+            return
+
+        gpt_start = time.time()
+
+        if not all_pages_text:
+            yield {"event": "error", "message": "OCR 텍스트를 추출하지 못했습니다."}
+            return
+
+        # 2. 페이지별 키워드 추출 (GPT_KEYWORD_MODE: concurrent/batch면 병렬, sequential이면 순차)
+        for idx, keywords, meta in self.iter_keywords(
+            all_pages_text,
+            progress_callback=lambda done, total: report("keywords", done, total),
+            keyword_mode=keyword_mode,
+            corpus_key=corpus_key,
+        ):
+            event = {
+                "event": "page",
+                "page_index": idx,
+                "original_text": all_pages_text[idx],
+                "keywords": keywords,
+                "source": sources[idx],
+                **meta,
+            }
+            if geometries[idx] is not None:
+                event["geometry"] = geometries[idx]
+            yield event
 
         gpt_duration = time.time() - gpt_start
         print(f"⏱️ [GPT 키워드 추출 소요 시간]: {gpt_duration:.2f}초")
@@ -222,6 +797,36 @@ class CLOVAOCRService:
         total_duration = time.time() - total_start
         page_count = len(all_pages_text)
         print(f"🚀 [전체 프로세스 총 소요 시간]: {total_duration:.2f}초, 페이지 수: {page_count}")
+        # 캔버스는 영역 수와 무관하게 이미지 1장
+        ocr_page_count = 1 if tiles is not None else sources.count(PAGE_SOURCE_CLOVA)
+        yield {
+            "event": "summary",
+            "page_count": page_count,
+            "ocr_page_count": ocr_page_count,
+            "total_duration": total_duration,
+        }
+
+
+    @staticmethod
+    def result_from_events(events):
+        """
+        iter_process_file 이벤트들을 process_file 응답 형식으로 합침.
+        page 이벤트 → pages[page_index] (event/page_index 제외 필드), summary 이벤트 → 최상위 필드.
+        """
+        pages = {}
+        summary = None
+        for event in events:
+            kind = event.get("event")
+            if kind == "error":
+                return {"status": "error", **{k: v for k, v in event.items() if k != "event"}}
+            if kind == "page":
+                pages[event["page_index"]] = {
+                    k: v for k, v in event.items() if k not in ("event", "page_index")
+                }
+            elif kind == "summary":
+                summary = {k: v for k, v in event.items() if k != "event"}
+        if summary is None:
+            return {"status": "error", "message": "OCR 처리가 완료되지 않았습니다."}
         # 3. 최종 결과 반환
         # 프론트(`front/src/api/ocr.ts`)는 다음 우선순위로 데이터를 사용:
         # 1) inner.pages가 배열이면 각 페이지의 original_text/keywords를 합쳐 사용
@@ -230,13 +835,23 @@ class CLOVAOCRService:
         # 여기서는 멀티 페이지를 정식 지원하기 위해 pages 배열을 내려준다.
         return {
             "status": "success",
-            "pages": [
-                {
-                    "original_text": text,
-                    "keywords": keywords,
-                }
-                for text, keywords in zip(all_pages_text, all_keywords)
-            ],
-            "page_count": page_count,
-            "total_duration": total_duration,
+            "pages": [pages[idx] for idx in sorted(pages)],
+            **summary,
         }
+
+
+    def process_file(self, file_bytes, filename, progress_callback=None, tiles=None, keyword_mode=None, corpus_key=None):
+        """텍스트 추출 및 페이지별 GPT 키워드 추출 실행.
+        file_bytes: ocr_app에서 전달 — crop 적용 시 잘린 이미지 bytes만 넘어옴.
+        progress_callback: (stage, done, total) 형태로 진행 상황 알림 (OCR 작업 큐에서 사용, 선택)
+        """
+        return self.result_from_events(
+            self.iter_process_file(
+                file_bytes,
+                filename,
+                progress_callback=progress_callback,
+                tiles=tiles,
+                keyword_mode=keyword_mode,
+                corpus_key=corpus_key,
+            )
+        )
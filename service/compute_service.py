@@ -0,0 +1,140 @@
+"""
+CPU 작업용 공유 프로세스 풀.
+- 이미지 crop/전처리(디코딩·리사이즈·재인코딩), PDF 페이지 수 계산·페이지 선택, Clova 레이아웃 복원처럼
+  GIL을 잡고 오래 도는 작업을 별도 프로세스에서 실행 → 이미지 요청이 몰려도 모든 코어를 쓰고 다른 API를 막지 않음.
+- 대기(실행 중 포함) 작업이 COMPUTE_MAX_PENDING 이상이면 ComputeBusyError, COMPUTE_TIMEOUT_SECONDS 초과 시 ComputeTimeoutError.
+  (타임아웃은 결과 대기를 포기하는 것이며, 이미 실행 중인 작업 프로세스를 강제로 멈추지는 않음)
+- 인자·반환값은 pickle 되어 전달됨. 스풀링된 업로드 mmap은 파일 경로만 넘어가고 작업 프로세스에서 다시 매핑.
+- COMPUTE_ENABLED=0 이면 호출한 스레드에서 그대로 실행 (기존 동작).
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+COMPUTE_ENABLED = (os.getenv("COMPUTE_ENABLED", "1").strip().lower() in ("1", "true", "yes", "on"))
+COMPUTE_WORKERS = max(1, int(os.getenv("COMPUTE_WORKERS", str(os.cpu_count() or 2))))
+COMPUTE_MAX_PENDING = max(1, int(os.getenv("COMPUTE_MAX_PENDING", str(COMPUTE_WORKERS * 4))))
+COMPUTE_TIMEOUT_SECONDS = float(os.getenv("COMPUTE_TIMEOUT_SECONDS", "30"))
+# 스레드가 많은 서버 프로세스에서 fork는 잠금 상태까지 복제하므로 기본은 spawn
+COMPUTE_START_METHOD = os.getenv("COMPUTE_START_METHOD", "spawn").strip().lower()
+
+_executor: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+_pending = 0
+_stats = {"submitted": 0, "completed": 0, "errors": 0, "timeouts": 0, "rejected": 0, "inline": 0, "max_seconds": 0.0}
+
+
+class ComputeBusyError(Exception):
+    """대기 중인 CPU 작업이 COMPUTE_MAX_PENDING 이상"""
+
+
+class ComputeTimeoutError(Exception):
+    """CPU 작업이 제한 시간 안에 끝나지 않음"""
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    """풀은 첫 사용 시 생성 (_lock 보유 상태에서 호출)"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=COMPUTE_WORKERS,
+            mp_context=multiprocessing.get_context(COMPUTE_START_METHOD),
+        )
+        print(f"🧮 CPU 작업 프로세스 풀 시작: workers={COMPUTE_WORKERS}, start={COMPUTE_START_METHOD}")
+    return _executor
+
+
+def _reset_executor() -> None:
+    """작업 프로세스가 죽어 풀이 깨지면 버리고 다음 호출에서 새로 생성"""
+    global _executor
+    with _lock:
+        broken, _executor = _executor, None
+    if broken is not None:
+        broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit(fn: Callable[..., Any], args: tuple):
+    global _pending
+    with _lock:
+        if _pending >= COMPUTE_MAX_PENDING:
+            _stats["rejected"] += 1
+            raise ComputeBusyError("서버가 혼잡합니다. 잠시 후 다시 시도해주세요.")
+        future = _get_executor().submit(fn, *args)
+        _pending += 1
+        _stats["submitted"] += 1
+    started = time.time()
+
+    def _done(f) -> None:
+        global _pending
+        with _lock:
+            _pending -= 1
+            if f.cancelled():
+                return
+            if f.exception() is not None:
+                _stats["errors"] += 1
+            else:
+                _stats["completed"] += 1
+                _stats["max_seconds"] = max(_stats["max_seconds"], round(time.time() - started, 3))
+
+    future.add_done_callback(_done)
+    return future
+
+
+def _run_inline(fn: Callable[..., Any], args: tuple) -> Any:
+    with _lock:
+        _stats["inline"] += 1
+    return fn(*args)
+
+
+def run_compute(fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+    """
+    fn(*args)를 프로세스 풀에서 실행하고 결과 반환 (동기 — 워커 스레드에서 호출).
+    fn은 모듈 최상위 함수여야 함 (pickle 가능). 예외는 그대로 전달.
+    """
+    if not COMPUTE_ENABLED:
+        return _run_inline(fn, args)
+    future = _submit(fn, args)
+    try:
+        return future.result(timeout=timeout or COMPUTE_TIMEOUT_SECONDS)
+    except FutureTimeoutError:
+        future.cancel()
+        with _lock:
+            _stats["timeouts"] += 1
+        raise ComputeTimeoutError(f"{fn.__name__} 작업이 {timeout or COMPUTE_TIMEOUT_SECONDS:g}초 안에 끝나지 않았습니다.")
+    except BrokenProcessPool:
+        _reset_executor()
+        raise
+
+
+async def run_compute_async(fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+    """run_compute의 async 버전 — 이벤트 루프 스레드를 막지 않고 결과를 기다림 (async 핸들러에서 호출)"""
+    if not COMPUTE_ENABLED:
+        return await asyncio.to_thread(_run_inline, fn, args)
+    future = _submit(fn, args)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout or COMPUTE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        with _lock:
+            _stats["timeouts"] += 1
+        raise ComputeTimeoutError(f"{fn.__name__} 작업이 {timeout or COMPUTE_TIMEOUT_SECONDS:g}초 안에 끝나지 않았습니다.")
+    except BrokenProcessPool:
+        _reset_executor()
+        raise
+
+
+def get_compute_stats() -> Dict[str, Any]:
+    with _lock:
+        return {
+            **_stats,
+            "enabled": COMPUTE_ENABLED,
+            "workers": COMPUTE_WORKERS,
+            "pending": _pending,
+            "max_pending": COMPUTE_MAX_PENDING,
+            "timeout_seconds": COMPUTE_TIMEOUT_SECONDS,
+        }
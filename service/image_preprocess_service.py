@@ -0,0 +1,355 @@
+"""
+Clova 전송 전 업로드 이미지 전처리.
+- EXIF 방향 적용 (폰 사진이 옆으로 누운 채 OCR 되는 문제 방지)
+- 긴 변을 OCR_MAX_LONG_EDGE 이하로 축소 (JPEG는 Pillow draft()로 디코딩 단계에서 축소 → 전체 디코딩 회피)
+- 채도가 거의 없는 학습지 사진은 흑백 변환 (OCR_GRAYSCALE=auto)
+- OCR_JPEG_QUALITY로 재인코딩, 절감 바이트는 누적 지표로 집계 (GET /ocr/metrics)
+- 여러 영역 OCR: 영역들을 한 번의 디코딩에서 잘라 캔버스 한 장에 이어 붙임 (Clova 1회 호출)
+- 자동 영역 감지(auto_crop): crop 없이 올린 사진에서 글자 영역을 찾아 책상·배경 여백을 잘라냄
+"""
+
+import io
+import math
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, ImageStat
+
+from service.upload_service import as_stream
+
+OCR_PREPROCESS_ENABLED = (os.getenv("OCR_PREPROCESS_ENABLED", "1").strip().lower() in ("1", "true", "yes", "on"))
+# Clova 인식 정확도가 유지되는 긴 변 길이 (A4 약 200dpi)
+OCR_MAX_LONG_EDGE = int(os.getenv("OCR_MAX_LONG_EDGE", "2400"))
+OCR_JPEG_QUALITY = int(os.getenv("OCR_JPEG_QUALITY", "85"))
+# auto: 채도가 낮으면 흑백 / on: 항상 흑백 / off: 색상 유지
+OCR_GRAYSCALE = os.getenv("OCR_GRAYSCALE", "auto").strip().lower()
+# auto 모드에서 흑백으로 볼 평균 채도 상한 (HSV S 채널, 0~255)
+OCR_GRAYSCALE_MAX_SATURATION = float(os.getenv("OCR_GRAYSCALE_MAX_SATURATION", "24"))
+# 여러 영역 OCR: 한 요청의 최대 영역 수 / 캔버스에서 영역 사이 여백(px) / 캔버스 긴 변 상한
+OCR_MAX_REGIONS = int(os.getenv("OCR_MAX_REGIONS", "10"))
+OCR_REGION_GAP = int(os.getenv("OCR_REGION_GAP", "40"))
+OCR_MAX_CANVAS_EDGE = int(os.getenv("OCR_MAX_CANVAS_EDGE", "8000"))
+# 자동 영역 감지: 요청에 auto_crop이 없을 때 기본값 / 감지용 축소본 긴 변 / 글자 획으로 볼 줄·열의 경계 픽셀 비율 하한
+OCR_AUTO_CROP = (os.getenv("OCR_AUTO_CROP", "0").strip().lower() in ("1", "true", "yes", "on"))
+OCR_AUTO_CROP_ANALYSIS_EDGE = int(os.getenv("OCR_AUTO_CROP_ANALYSIS_EDGE", "512"))
+OCR_AUTO_CROP_MIN_DENSITY = float(os.getenv("OCR_AUTO_CROP_MIN_DENSITY", "0.02"))
+# 글자 줄/단 사이 빈 띠 허용 폭 (이미지 크기 대비), 감지 영역 바깥 여백, 이보다 넓으면 자르지 않음, 이보다 좁으면 감지 실패로 봄
+OCR_AUTO_CROP_MAX_GAP = float(os.getenv("OCR_AUTO_CROP_MAX_GAP", "0.08"))
+OCR_AUTO_CROP_MARGIN = float(os.getenv("OCR_AUTO_CROP_MARGIN", "0.02"))
+OCR_AUTO_CROP_MAX_AREA = float(os.getenv("OCR_AUTO_CROP_MAX_AREA", "0.85"))
+OCR_AUTO_CROP_MIN_AREA = float(os.getenv("OCR_AUTO_CROP_MIN_AREA", "0.02"))
+# 글자 획 경계로 볼 밝기 기울기 크기 (0~255)
+AUTO_CROP_EDGE_GRADIENT = 40.0
+
+EXIF_ORIENTATION = 0x0112
+# EXIF Orientation 값 → 바로 세우기 위한 변환 (ImageOps.exif_transpose와 동일)
+_ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+_stats = {"images": 0, "bytes_in": 0, "bytes_out": 0, "resized": 0, "rotated": 0, "grayscale": 0, "auto_cropped": 0}
+_stats_lock = threading.Lock()
+
+
+def _is_mostly_gray(img: Image.Image) -> bool:
+    """작은 썸네일의 평균 채도로 흑백 변환 여부 판단"""
+    thumb = img.copy()
+    thumb.thumbnail((128, 128))
+    saturation = ImageStat.Stat(thumb.convert("HSV").getchannel("S")).mean[0]
+    return saturation <= OCR_GRAYSCALE_MAX_SATURATION
+
+
+def _open_with_draft(file_bytes: bytes, box: Optional[Tuple[int, int, int, int]]) -> Tuple[Image.Image, Tuple[int, int], float]:
+    """
+    이미지를 열고, JPEG면 draft()로 필요한 해상도까지만 디코딩.
+    box: 원본 좌표 기준 crop 영역 (x1, y1, x2, y2) — 축소 비율은 잘릴 영역의 긴 변 기준으로 계산.
+    반환: (이미지, 원본 크기, 원본 대비 디코딩 배율)
+    """
+    img = Image.open(as_stream(file_bytes))
+    original_size = img.size
+    if img.format == "JPEG":
+        region_w, region_h = (box[2] - box[0], box[3] - box[1]) if box else original_size
+        scale = min(1.0, OCR_MAX_LONG_EDGE / max(region_w, region_h, 1))
+        if scale < 1.0:
+            mode = "L" if OCR_GRAYSCALE == "on" else "RGB"
+            img.draft(mode, (math.ceil(original_size[0] * scale), math.ceil(original_size[1] * scale)))
+    return img, original_size, img.size[0] / original_size[0]
+
+
+def _encode(img: Image.Image, keep_png: bool) -> Tuple[bytes, str]:
+    buf = io.BytesIO()
+    if keep_png:
+        img.save(buf, format="PNG", optimize=True)
+        return buf.getvalue(), "png"
+    img.save(buf, format="JPEG", quality=OCR_JPEG_QUALITY, optimize=True)
+    return buf.getvalue(), "jpg"
+
+
+def record_preprocess(info: Dict[str, Any]) -> None:
+    """
+    전처리 결과 info를 누적 지표에 반영. 전처리는 CPU 프로세스 풀에서 돌 수 있으므로
+    (작업 프로세스의 지표는 서버 프로세스에 보이지 않음) 결과를 받은 쪽에서 호출.
+    """
+    if "bytes_in" not in info:
+        return
+    with _stats_lock:
+        _stats["images"] += 1
+        _stats["bytes_in"] += info["bytes_in"]
+        _stats["bytes_out"] += info["bytes_out"]
+        for key in ("resized", "rotated", "grayscale", "auto_cropped"):
+            if info.get(key):
+                _stats[key] += 1
+
+
+def _finish(img: Image.Image, exif_orientation: int, info: Dict[str, Any]) -> Image.Image:
+    """EXIF 방향 적용 → 흑백 판단 → 긴 변 축소 (crop된 이미지에도 원본의 방향 값을 그대로 적용)"""
+    transpose = _ORIENTATION_TRANSPOSE.get(exif_orientation)
+    if transpose is not None:
+        img = img.transpose(transpose)
+        info["rotated"] = True
+
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    if OCR_GRAYSCALE == "on" or (OCR_GRAYSCALE == "auto" and img.mode == "RGB" and _is_mostly_gray(img)):
+        if img.mode != "L":
+            img = img.convert("L")
+        info["grayscale"] = True
+
+    long_edge = max(img.size)
+    if long_edge > OCR_MAX_LONG_EDGE:
+        ratio = OCR_MAX_LONG_EDGE / long_edge
+        img = img.resize((max(1, round(img.size[0] * ratio)), max(1, round(img.size[1] * ratio))), Image.Resampling.LANCZOS)
+        info["resized"] = True
+    return img
+
+
+def _clamp_box(px: int, py: int, pw: int, ph: int, w: int, h: int) -> Tuple[int, int, int, int]:
+    """(px, py, pw, ph) 영역을 이미지 경계 안의 (x1, y1, x2, y2)로 보정 (최소 1px)"""
+    x1 = max(0, min(px, w - 1))
+    y1 = max(0, min(py, h - 1))
+    x2 = max(x1 + 1, min(px + pw, w))
+    y2 = max(y1 + 1, min(py + ph, h))
+    return x1, y1, x2, y2
+
+
+def crop_and_preprocess(
+    file_bytes: bytes, filename: str, px: int, py: int, pw: int, ph: int
+) -> Tuple[bytes, str, Dict[str, Any]]:
+    """
+    원본 이미지에서 (px, py) 크기 (pw, ph) 영역만 잘라 전처리 후 (bytes, filename, info) 반환.
+    좌표는 원본 픽셀 기준 (EXIF 방향 적용 전). 디코딩은 잘릴 영역에 필요한 해상도까지만.
+    file_bytes: bytes 또는 mmap (스풀링된 업로드)
+    """
+    ext = (filename or "").split(".")[-1].lower()
+    probe = Image.open(as_stream(file_bytes))
+    # 경계 클램프
+    x1, y1, x2, y2 = _clamp_box(px, py, pw, ph, *probe.size)
+
+    if not OCR_PREPROCESS_ENABLED:
+        # 전처리 끔: 기존 동작 (전체 RGB 디코딩 후 crop, JPEG 95)
+        cropped = probe.convert("RGB").crop((x1, y1, x2, y2))
+        buf = io.BytesIO()
+        if ext == "png":
+            cropped.save(buf, format="PNG")
+        else:
+            cropped.save(buf, format="JPEG", quality=95)
+        return buf.getvalue(), f"cropped.{'png' if ext == 'png' else 'jpg'}", {"box": [x1, y1, x2, y2], "scale": 1.0}
+
+    img, _, decode_scale = _open_with_draft(file_bytes, (x1, y1, x2, y2))
+    orientation = img.getexif().get(EXIF_ORIENTATION, 1)
+    scaled_box = tuple(round(v * decode_scale) for v in (x1, y1, x2, y2))
+    cropped = img.crop(scaled_box)
+
+    info: Dict[str, Any] = {"box": [x1, y1, x2, y2]}
+    cropped = _finish(cropped, orientation, info)
+    data, out_ext = _encode(cropped, keep_png=(ext == "png"))
+    info.update({
+        "scale": max(cropped.size) / max(x2 - x1, y2 - y1),
+        "size": list(cropped.size),
+        "bytes_in": len(file_bytes),
+        "bytes_out": len(data),
+    })
+    return data, f"cropped.{out_ext}", info
+
+
+def crop_regions_to_canvas(
+    file_bytes: bytes, filename: str, regions: Sequence[Tuple[int, int, int, int]]
+) -> Tuple[bytes, str, Dict[str, Any]]:
+    """
+    여러 영역을 한 번 디코딩한 이미지에서 잘라 세로로 이어 붙인 캔버스 한 장으로 만듦 (Clova 1회 호출용).
+    regions: 원본 픽셀 기준 [(x, y, w, h), ...] (EXIF 방향 적용 전)
+    반환: (bytes, filename, info) — info["tiles"]: 캔버스 안 각 영역 위치 [x1, y1, x2, y2] (regions 순서),
+    info["boxes"]: 경계 보정된 원본 좌표 영역
+    """
+    ext = (filename or "").split(".")[-1].lower()
+    probe = Image.open(as_stream(file_bytes))
+    boxes = [_clamp_box(px, py, pw, ph, *probe.size) for px, py, pw, ph in regions]
+
+    # 디코딩 배율은 가장 큰 영역 기준 (작은 영역이 필요 이상으로 뭉개지지 않도록)
+    if OCR_PREPROCESS_ENABLED:
+        largest = max(boxes, key=lambda b: max(b[2] - b[0], b[3] - b[1]))
+        img, _, decode_scale = _open_with_draft(file_bytes, largest)
+    else:
+        img, decode_scale = probe, 1.0
+    orientation = img.getexif().get(EXIF_ORIENTATION, 1)
+
+    info: Dict[str, Any] = {"boxes": [list(b) for b in boxes]}
+    tiles: List[Image.Image] = []
+    for box in boxes:
+        tile = img.crop(tuple(round(v * decode_scale) for v in box))
+        tiles.append(_finish(tile, orientation, info) if OCR_PREPROCESS_ENABLED else tile.convert("RGB"))
+
+    # 모든 영역이 흑백일 때만 흑백 캔버스
+    mode = "L" if all(t.mode == "L" for t in tiles) else "RGB"
+    width = max(t.size[0] for t in tiles)
+    height = sum(t.size[1] for t in tiles) + OCR_REGION_GAP * (len(tiles) - 1)
+    canvas = Image.new(mode, (width, height), 255 if mode == "L" else (255, 255, 255))
+    tile_boxes, y = [], 0
+    for tile in tiles:
+        canvas.paste(tile if tile.mode == mode else tile.convert(mode), (0, y))
+        tile_boxes.append([0, y, tile.size[0], y + tile.size[1]])
+        y += tile.size[1] + OCR_REGION_GAP
+
+    # 영역이 많아 캔버스가 너무 길면 전체를 같은 비율로 축소 (Clova 이미지 크기 제한)
+    long_edge = max(canvas.size)
+    if long_edge > OCR_MAX_CANVAS_EDGE:
+        ratio = OCR_MAX_CANVAS_EDGE / long_edge
+        canvas = canvas.resize((max(1, round(width * ratio)), max(1, round(height * ratio))), Image.Resampling.LANCZOS)
+        tile_boxes = [[round(v * ratio) for v in box] for box in tile_boxes]
+        info["resized"] = True
+
+    data, out_ext = _encode(canvas, keep_png=(ext == "png"))
+    info.update({
+        "tiles": tile_boxes,
+        "size": list(canvas.size),
+        "bytes_in": len(file_bytes),
+        "bytes_out": len(data),
+    })
+    return data, f"regions.{out_ext}", info
+
+
+def _active_span(profile: np.ndarray, threshold: float, max_gap: int) -> Optional[Tuple[int, int]]:
+    """
+    투영 프로파일에서 threshold를 넘는 위치들을 max_gap 이하 간격이면 한 구간으로 이어 붙이고,
+    프로파일 합이 가장 큰 구간 [start, end) 반환 (가장자리 잡음·책상 무늬보다 본문이 큼). 없으면 None.
+    """
+    active = np.flatnonzero(profile > threshold)
+    if active.size == 0:
+        return None
+    breaks = np.flatnonzero(np.diff(active) > max_gap)
+    starts = np.concatenate(([0], breaks + 1))
+    ends = np.concatenate((breaks, [active.size - 1]))
+    cumulative = np.concatenate(([0.0], np.cumsum(profile)))
+    masses = cumulative[active[ends] + 1] - cumulative[active[starts]]
+    best = int(np.argmax(masses))
+    return int(active[starts[best]]), int(active[ends[best]]) + 1
+
+
+def detect_content_box(gray: np.ndarray) -> Optional[Tuple[float, float, float, float]]:
+    """
+    흑백 축소본(0~255) → 글자 영역 (x1, y1, x2, y2), 이미지 크기 대비 비율(0~1).
+    밝기 기울기가 큰 픽셀(글자 획 경계)의 가로/세로 투영 프로파일로 본문 줄 범위 → 그 줄들 안에서 열 범위를 찾음.
+    """
+    if gray.shape[0] < 8 or gray.shape[1] < 8:
+        return None
+    gx = np.abs(np.diff(gray, axis=1))[:-1, :]
+    gy = np.abs(np.diff(gray, axis=0))[:, :-1]
+    edges = (gx + gy) > AUTO_CROP_EDGE_GRADIENT
+    h, w = edges.shape
+    rows = _active_span(edges.mean(axis=1), OCR_AUTO_CROP_MIN_DENSITY, max(1, int(h * OCR_AUTO_CROP_MAX_GAP)))
+    if rows is None:
+        return None
+    cols = _active_span(edges[rows[0]:rows[1]].mean(axis=0), OCR_AUTO_CROP_MIN_DENSITY, max(1, int(w * OCR_AUTO_CROP_MAX_GAP)))
+    if cols is None:
+        return None
+    margin = OCR_AUTO_CROP_MARGIN
+    return (
+        max(0.0, cols[0] / w - margin),
+        max(0.0, rows[0] / h - margin),
+        min(1.0, cols[1] / w + margin),
+        min(1.0, rows[1] / h + margin),
+    )
+
+
+def _auto_crop(img: Image.Image, original_size: Tuple[int, int], info: Dict[str, Any]) -> Image.Image:
+    """
+    img(디코딩본, EXIF 방향 적용 전)에서 글자 영역을 찾아 잘라 반환. 자를 만하지 않으면 그대로.
+    잘랐으면 info["box"]: 원본 좌표 [x1, y1, x2, y2], info["detected_box"]: 원본 좌표 [x, y, width, height] (crop 입력과 같은 형식)
+    """
+    small = img.copy()
+    small.thumbnail((OCR_AUTO_CROP_ANALYSIS_EDGE, OCR_AUTO_CROP_ANALYSIS_EDGE))
+    found = detect_content_box(np.asarray(small.convert("L"), dtype=np.float32))
+    if found is None:
+        return img
+    fx1, fy1, fx2, fy2 = found
+    area = (fx2 - fx1) * (fy2 - fy1)
+    if area > OCR_AUTO_CROP_MAX_AREA or area < OCR_AUTO_CROP_MIN_AREA:
+        return img
+
+    ow, oh = original_size
+    x1, y1, x2, y2 = _clamp_box(
+        math.floor(fx1 * ow), math.floor(fy1 * oh), math.ceil((fx2 - fx1) * ow), math.ceil((fy2 - fy1) * oh), ow, oh
+    )
+    info["box"] = [x1, y1, x2, y2]
+    info["detected_box"] = [x1, y1, x2 - x1, y2 - y1]
+    info["auto_cropped"] = True
+    w, h = img.size
+    return img.crop((round(x1 * w / ow), round(y1 * h / oh), round(x2 * w / ow), round(y2 * h / oh)))
+
+
+def preprocess_image(file_bytes: bytes, filename: str, auto_crop: bool = False) -> Tuple[bytes, str, Dict[str, Any]]:
+    """
+    crop 없는 업로드 이미지 전처리. PDF·열 수 없는 파일·전처리로 더 커지는 경우는 원본 그대로 반환.
+    auto_crop: 글자 영역을 감지해 바깥 배경을 잘라냄 (info["detected_box"], info["box"]).
+    file_bytes: bytes 또는 mmap (원본을 그대로 반환하는 경우 같은 객체)
+    반환: (bytes, filename, info)
+    """
+    ext = (filename or "").split(".")[-1].lower() if "." in (filename or "") else ""
+    if not OCR_PREPROCESS_ENABLED or ext == "pdf":
+        return file_bytes, filename, {}
+
+    try:
+        img, original_size, _ = _open_with_draft(file_bytes, None)
+        orientation = img.getexif().get(EXIF_ORIENTATION, 1)
+        info: Dict[str, Any] = {}
+        if auto_crop:
+            img = _auto_crop(img, original_size, info)
+        processed = _finish(img, orientation, info)
+        data, out_ext = _encode(processed, keep_png=(ext == "png"))
+    except Exception as e:
+        print(f"⚠️ 이미지 전처리 실패, 원본 사용: {e}")
+        return file_bytes, filename, {}
+
+    # 회전·자동 crop이 필요 없었는데 더 커졌다면 원본 유지
+    if len(data) >= len(file_bytes) and not info.get("rotated") and not info.get("auto_cropped"):
+        return file_bytes, filename, {"bytes_in": len(file_bytes), "bytes_out": len(file_bytes)}
+
+    base = (filename or "image").rsplit(".", 1)[0]
+    box = info.get("box")
+    info.update({
+        "scale": max(processed.size) / (max(box[2] - box[0], box[3] - box[1]) if box else max(original_size)),
+        "size": list(processed.size),
+        "bytes_in": len(file_bytes),
+        "bytes_out": len(data),
+    })
+    print(f"🗜️ 이미지 전처리: {len(file_bytes)} → {len(data)} bytes, size={processed.size}")
+    return data, f"{base}.{out_ext}", info
+
+
+def get_preprocess_stats() -> Dict[str, Any]:
+    """누적 전처리 지표 (절감 바이트 포함)"""
+    with _stats_lock:
+        saved = _stats["bytes_in"] - _stats["bytes_out"]
+        return {
+            **_stats,
+            "bytes_saved": saved,
+            "saved_ratio": round(saved / _stats["bytes_in"], 3) if _stats["bytes_in"] else 0.0,
+        }
@@ -0,0 +1,120 @@
+"""
+Clova 호출 전 이미지 품질 검사 (로컬, NumPy).
+흐리거나 어둡거나 너무 작은 사진은 Clova에서 몇 초를 기다린 뒤 빈 결과로 돌아오므로, 보내기 전에 걸러냄.
+- 선명도: 라플라시안 분산 (글자 경계가 뭉개지면 작아짐)
+- 대비: 밝기 상위/하위 2% 차이, 밝기: 평균 밝기
+- 해상도: 짧은 변·전체 픽셀 수
+- 글자 영역 밀도: 밝기 기울기가 큰(글자 획 경계) 픽셀 비율 — 빈 종이·벽·책상 사진은 0에 가까움
+검사는 긴 변 OCR_QUALITY_ANALYSIS_EDGE로 줄인 흑백 사본에서 수행 (기준값도 이 크기 기준).
+OCR_QUALITY_MODE: off(검사 안 함) | warn(결과에 경고만 표시, 기본) | reject(Clova 호출 없이 오류 반환)
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+from PIL import Image
+
+from service.upload_service import as_stream
+
+OCR_QUALITY_MODE = os.getenv("OCR_QUALITY_MODE", "warn").strip().lower()
+OCR_QUALITY_ANALYSIS_EDGE = int(os.getenv("OCR_QUALITY_ANALYSIS_EDGE", "1024"))
+OCR_QUALITY_MIN_SHARPNESS = float(os.getenv("OCR_QUALITY_MIN_SHARPNESS", "30"))
+OCR_QUALITY_MIN_CONTRAST = float(os.getenv("OCR_QUALITY_MIN_CONTRAST", "40"))
+OCR_QUALITY_MIN_BRIGHTNESS = float(os.getenv("OCR_QUALITY_MIN_BRIGHTNESS", "40"))
+OCR_QUALITY_MIN_SIDE = int(os.getenv("OCR_QUALITY_MIN_SIDE", "32"))
+OCR_QUALITY_MIN_PIXELS = int(os.getenv("OCR_QUALITY_MIN_PIXELS", "40000"))
+OCR_QUALITY_MIN_TEXT_DENSITY = float(os.getenv("OCR_QUALITY_MIN_TEXT_DENSITY", "0.002"))
+# 글자 획 경계로 볼 밝기 기울기 크기 (0~255)
+TEXT_EDGE_GRADIENT = 40.0
+
+_stats = {"checked": 0, "warned": 0, "rejected": 0, "issues": {}}
+_stats_lock = threading.Lock()
+
+
+class ImageQualityError(Exception):
+    """OCR_QUALITY_MODE=reject 에서 품질 기준 미달 (report: assess_image_quality 결과)"""
+
+    def __init__(self, report: Dict[str, Any]):
+        super().__init__(" ".join(issue["message"] for issue in report.get("issues", [])) or "이미지 품질이 OCR에 적합하지 않습니다.")
+        self.report = report
+
+
+def _analysis_image(img: Image.Image) -> Image.Image:
+    """긴 변 OCR_QUALITY_ANALYSIS_EDGE 이하의 흑백 사본 (JPEG는 draft로 디코딩 단계에서 축소)"""
+    edge = OCR_QUALITY_ANALYSIS_EDGE
+    if img.format == "JPEG":
+        img.draft("L", (edge, edge))
+    img = img.convert("L")
+    img.thumbnail((edge, edge))
+    return img
+
+
+def measure_quality(gray: np.ndarray) -> Dict[str, float]:
+    """흑백 배열(0~255) → 선명도·대비·밝기·글자 영역 밀도"""
+    if gray.shape[0] < 3 or gray.shape[1] < 3:
+        return {"sharpness": 0.0, "contrast": 0.0, "brightness": float(gray.mean()) if gray.size else 0.0, "text_density": 0.0}
+    # 4-이웃 라플라시안
+    lap = gray[1:-1, :-2] + gray[1:-1, 2:] + gray[:-2, 1:-1] + gray[2:, 1:-1] - 4.0 * gray[1:-1, 1:-1]
+    low, high = np.percentile(gray, (2, 98))
+    gx = np.abs(np.diff(gray, axis=1))[:-1, :]
+    gy = np.abs(np.diff(gray, axis=0))[:, :-1]
+    return {
+        "sharpness": round(float(lap.var()), 1),
+        "contrast": round(float(high - low), 1),
+        "brightness": round(float(gray.mean()), 1),
+        "text_density": round(float(np.mean((gx + gy) > TEXT_EDGE_GRADIENT)), 4),
+    }
+
+
+def assess_image_quality(file_bytes, filename: str) -> Dict[str, Any]:
+    """
+    Clova로 보낼 이미지(전처리·crop 후)의 품질 검사 (CPU 프로세스 풀 작업 단위).
+    반환: {"ok", "issues": [{"code", "message", "value", "threshold"}], "metrics", "duration_ms"}
+    이미지를 열 수 없으면 판단하지 않고 ok (Clova 결과에 맡김).
+    """
+    started = time.perf_counter()
+    try:
+        img = Image.open(as_stream(file_bytes))
+        width, height = img.size
+        gray = np.asarray(_analysis_image(img), dtype=np.float32)
+    except Exception as e:
+        print(f"⚠️ 이미지 품질 검사 생략 ({filename}): {e}")
+        return {"ok": True, "issues": [], "metrics": {}, "duration_ms": 0.0}
+
+    metrics: Dict[str, Any] = {"width": width, "height": height, **measure_quality(gray)}
+    checks = (
+        ("too_small", min(width, height), OCR_QUALITY_MIN_SIDE, "이미지가 너무 작습니다. 더 가까이에서 찍거나 영역을 넓게 선택해주세요."),
+        ("too_small", width * height, OCR_QUALITY_MIN_PIXELS, "이미지 해상도가 너무 낮습니다. 더 가까이에서 찍거나 영역을 넓게 선택해주세요."),
+        ("too_dark", metrics["brightness"], OCR_QUALITY_MIN_BRIGHTNESS, "사진이 너무 어둡습니다. 밝은 곳에서 다시 찍어주세요."),
+        ("low_contrast", metrics["contrast"], OCR_QUALITY_MIN_CONTRAST, "글자와 배경의 대비가 낮습니다. 그림자나 반사가 없도록 다시 찍어주세요."),
+        ("blurry", metrics["sharpness"], OCR_QUALITY_MIN_SHARPNESS, "사진이 흐립니다. 초점을 맞춰 다시 찍어주세요."),
+        ("no_text", metrics["text_density"], OCR_QUALITY_MIN_TEXT_DENSITY, "글자가 거의 보이지 않습니다. 글자가 있는 부분을 찍어주세요."),
+    )
+    issues: List[Dict[str, Any]] = []
+    for code, value, threshold, message in checks:
+        if value < threshold and not any(issue["code"] == code for issue in issues):
+            issues.append({"code": code, "message": message, "value": value, "threshold": threshold})
+    return {
+        "ok": not issues,
+        "issues": issues,
+        "metrics": metrics,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def record_quality(report: Dict[str, Any], rejected: bool) -> None:
+    """검사 결과를 누적 지표에 반영 (프로세스 풀 결과를 받은 서버 프로세스에서 호출)"""
+    with _stats_lock:
+        _stats["checked"] += 1
+        if report.get("issues"):
+            _stats["rejected" if rejected else "warned"] += 1
+        for issue in report.get("issues", []):
+            _stats["issues"][issue["code"]] = _stats["issues"].get(issue["code"], 0) + 1
+
+
+def get_quality_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        return {**_stats, "issues": dict(_stats["issues"]), "mode": OCR_QUALITY_MODE}
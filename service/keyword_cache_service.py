@@ -0,0 +1,189 @@
+"""
+GPT 키워드 추출 결과 캐시 (페이지 텍스트 기준).
+- 정확히 같은 텍스트: 정규화(NFKC·소문자·공백/문장부호 정리)한 텍스트의 SHA-256 키로 조회.
+- 거의 같은 텍스트: 같은 교재 페이지를 다른 학생이 찍으면 OCR 결과가 몇 글자씩 다름 →
+  글자 3-gram 집합의 MinHash 서명(64개)을 4개씩 16개 밴드로 나눈 LSH 색인으로 후보를 찾고,
+  서명 일치 비율(자카드 유사도 추정)이 KEYWORD_CACHE_MIN_SIMILARITY 이상·길이 차이 KEYWORD_CACHE_MAX_LENGTH_DIFF 이하면 적중.
+  (유사도 0.9인 텍스트는 거의 확실히 후보가 되고, 0.5 이하 텍스트는 대부분 후보에서 빠짐)
+- 거의 같은 텍스트에 적중하면 저장된 키워드 중 현재 텍스트에 실제로 있는 것만 반환
+  (남은 비율이 KEYWORD_CACHE_MIN_KEPT_RATIO 미만이면 빗나간 것으로 보고 새로 추출).
+- 적중하면 GPT 호출 없이 키워드 반환. 항목 수 상한(LRU)과 TTL로 제한, 적중률은 GET /ocr/metrics.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+KEYWORD_CACHE_ENABLED = (os.getenv("KEYWORD_CACHE_ENABLED", "1").strip().lower() in ("1", "true", "yes", "on"))
+KEYWORD_CACHE_MAX_ENTRIES = int(os.getenv("KEYWORD_CACHE_MAX_ENTRIES", "5000"))
+KEYWORD_CACHE_TTL_SECONDS = int(os.getenv("KEYWORD_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+KEYWORD_CACHE_MIN_SIMILARITY = float(os.getenv("KEYWORD_CACHE_MIN_SIMILARITY", "0.85"))
+KEYWORD_CACHE_MAX_LENGTH_DIFF = float(os.getenv("KEYWORD_CACHE_MAX_LENGTH_DIFF", "0.1"))
+# 이보다 짧은 텍스트(정규화 후 글자 수)는 유사도 추정이 불안정하므로 정확히 일치할 때만 적중
+KEYWORD_CACHE_MIN_NEAR_CHARS = int(os.getenv("KEYWORD_CACHE_MIN_NEAR_CHARS", "40"))
+# 거의 같은 텍스트 적중 시 현재 텍스트에 남아 있어야 하는 저장 키워드 비율 (미만이면 캐시 미스)
+KEYWORD_CACHE_MIN_KEPT_RATIO = float(os.getenv("KEYWORD_CACHE_MIN_KEPT_RATIO", "0.8"))
+
+MINHASH_SIZE = 64
+MINHASH_BANDS = 16
+SHINGLE_SIZE = 3
+
+_ROWS = MINHASH_SIZE // MINHASH_BANDS
+# 서명 해시 함수 ((h xor r) * m) mod 2^64 계수 (m은 홀수) — 프로세스가 달라도 같은 서명이 나오도록 고정 시드
+_rng = np.random.default_rng(20240601)
+_XOR = _rng.integers(0, np.iinfo(np.uint64).max, size=MINHASH_SIZE, dtype=np.uint64, endpoint=True)
+_MUL = _rng.integers(0, np.iinfo(np.uint64).max, size=MINHASH_SIZE, dtype=np.uint64, endpoint=True) | np.uint64(1)
+_NON_WORD = re.compile(r"[^0-9a-z가-힣]+")
+
+
+def normalize_text(text: str) -> str:
+    """NFKC 정규화 → 소문자 → 한글/영문/숫자 외 문자는 공백 하나로 (OCR 문장부호·줄바꿈 차이 무시)"""
+    return _NON_WORD.sub(" ", unicodedata.normalize("NFKC", text or "").lower()).strip()
+
+
+def minhash(normalized: str) -> np.ndarray:
+    """정규화 텍스트(공백 제거)의 글자 3-gram 집합 → MinHash 서명 (MINHASH_SIZE개). 해시 함수 전체를 한 번에 배열 연산."""
+    compact = normalized.replace(" ", "")
+    if len(compact) < SHINGLE_SIZE:
+        compact = compact.ljust(SHINGLE_SIZE)
+    shingles = {compact[i:i + SHINGLE_SIZE] for i in range(len(compact) - SHINGLE_SIZE + 1)}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    # uint64 곱셈은 2^64에서 넘침(wrap) — 의도된 동작
+    return ((hashes[:, None] ^ _XOR) * _MUL).min(axis=0)
+
+
+def keywords_in_text(keywords: List[str], normalized: str) -> List[str]:
+    """키워드 중 정규화 텍스트(공백 무시)에 나오는 것만 순서대로 반환 (OCR 띄어쓰기 차이는 허용)"""
+    compact = normalized.replace(" ", "")
+    return [kw for kw in keywords if normalize_text(kw).replace(" ", "") in compact]
+
+
+def _bands(signature: np.ndarray) -> List[Tuple[int, bytes]]:
+    return [(band, signature[band * _ROWS:(band + 1) * _ROWS].tobytes()) for band in range(MINHASH_BANDS)]
+
+
+class KeywordCache:
+    def __init__(
+        self,
+        max_entries: int = KEYWORD_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = KEYWORD_CACHE_TTL_SECONDS,
+        min_similarity: float = KEYWORD_CACHE_MIN_SIMILARITY,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.min_similarity = min_similarity
+        # key → (키워드, MinHash 서명 또는 None, 정규화 길이, 만료 시각, 버전)
+        self._items: "OrderedDict[str, Tuple[List[str], Optional[np.ndarray], int, float, str]]" = OrderedDict()
+        # (밴드 번호, 밴드 서명 bytes) → key 집합
+        self._bands: Dict[Tuple[int, bytes], Set[str]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "near_hits": 0, "near_rejected": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    @staticmethod
+    def _key(normalized: str, version: str) -> str:
+        return hashlib.sha256(f"{version}|{normalized}".encode("utf-8")).hexdigest()
+
+    def _remove(self, key: str) -> None:
+        """항목과 밴드 색인 제거 (_lock 보유 상태에서 호출)"""
+        entry = self._items.pop(key, None)
+        if entry is None or entry[1] is None:
+            return
+        for band in _bands(entry[1]):
+            keys = self._bands.get(band)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._bands[band]
+
+    def _alive(self, key: str, now: float) -> bool:
+        """만료된 항목이면 제거하고 False (_lock 보유 상태에서 호출)"""
+        entry = self._items.get(key)
+        if entry is None:
+            return False
+        if entry[3] < now:
+            self._remove(key)
+            self._stats["expired"] += 1
+            return False
+        return True
+
+    def get(self, text: str, version: str) -> Optional[List[str]]:
+        normalized = normalize_text(text)
+        if not normalized:
+            return None
+        key = self._key(normalized, version)
+        signature = minhash(normalized) if len(normalized) >= KEYWORD_CACHE_MIN_NEAR_CHARS else None
+        now = time.time()
+        with self._lock:
+            if self._alive(key, now):
+                self._items.move_to_end(key)
+                self._stats["hits"] += 1
+                return list(self._items[key][0])
+
+            if signature is not None:
+                candidates = set()
+                for band in _bands(signature):
+                    candidates |= self._bands.get(band, set())
+                best, best_similarity = None, self.min_similarity
+                for candidate in candidates:
+                    _, other, length, _, other_version = self._items[candidate]
+                    if other_version != version:
+                        continue
+                    if abs(length - len(normalized)) > KEYWORD_CACHE_MAX_LENGTH_DIFF * max(length, len(normalized)):
+                        continue
+                    similarity = float(np.mean(signature == other))
+                    if similarity >= best_similarity and self._alive(candidate, now):
+                        best, best_similarity = candidate, similarity
+                if best is not None:
+                    # 비슷한 페이지라도 다른 글자가 키워드에 걸렸을 수 있음 → 현재 텍스트에 있는 키워드만
+                    cached = self._items[best][0]
+                    kept = keywords_in_text(cached, normalized)
+                    if kept and len(kept) >= KEYWORD_CACHE_MIN_KEPT_RATIO * len(cached):
+                        self._items.move_to_end(best)
+                        self._stats["near_hits"] += 1
+                        return kept
+                    self._stats["near_rejected"] += 1
+
+            self._stats["misses"] += 1
+        return None
+
+    def put(self, text: str, version: str, keywords: List[str]) -> None:
+        normalized = normalize_text(text)
+        if not normalized:
+            return
+        key = self._key(normalized, version)
+        signature = minhash(normalized) if len(normalized) >= KEYWORD_CACHE_MIN_NEAR_CHARS else None
+        with self._lock:
+            self._remove(key)
+            self._items[key] = (list(keywords), signature, len(normalized), time.time() + self.ttl_seconds, version)
+            if signature is not None:
+                for band in _bands(signature):
+                    self._bands.setdefault(band, set()).add(key)
+            while len(self._items) > self.max_entries:
+                self._remove(next(iter(self._items)))
+                self._stats["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["near_hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._items),
+                "hit_rate": round((self._stats["hits"] + self._stats["near_hits"]) / lookups, 3) if lookups else 0.0,
+                "ttl_seconds": self.ttl_seconds,
+                "min_similarity": self.min_similarity,
+                "min_kept_ratio": KEYWORD_CACHE_MIN_KEPT_RATIO,
+            }
+
+
+keyword_cache = KeywordCache() if KEYWORD_CACHE_ENABLED else None
@@ -0,0 +1,107 @@
+"""
+GPT 키워드 추출 모델 라우팅.
+- 페이지(또는 batch 묶음) 길이로 모델 등급 선택: 추정 토큰이 GPT_KEYWORD_SHORT_TOKENS 이하인 짧은 crop은
+  빠른 모델(GPT_KEYWORD_FAST_MODEL), 긴 페이지는 기본 모델(GPT_KEYWORD_MODEL).
+- 요청 마감: 남은 시간 예산이 기본 모델의 최근 지연 p95보다 짧으면 빠른 모델로 낮춤
+  (빠른 모델 p95로도 부족하면 그대로 빠른 모델 — 예산 초과 페이지는 iter_keywords에서 로컬 추출로 대체).
+- 요청 형태: 응답 max_tokens를 입력 길이에 맞춰 제한 (짧은 페이지는 짧은 응답 → 생성 시간 단축).
+- 모델별 최근 GPT_KEYWORD_LATENCY_WINDOW개 호출 지연으로 p50/p95 계산, GET /ocr/metrics 의 keyword_routing.
+GPT_KEYWORD_ROUTING=0 이면 항상 기본 모델 (기존 동작).
+"""
+
+import os
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+GPT_KEYWORD_ROUTING = (os.getenv("GPT_KEYWORD_ROUTING", "1").strip().lower() in ("1", "true", "yes", "on"))
+GPT_KEYWORD_MODEL = os.getenv("GPT_KEYWORD_MODEL", "gpt-4o")
+GPT_KEYWORD_FAST_MODEL = os.getenv("GPT_KEYWORD_FAST_MODEL", "gpt-4o-mini")
+GPT_KEYWORD_SHORT_TOKENS = int(os.getenv("GPT_KEYWORD_SHORT_TOKENS", "300"))
+GPT_KEYWORD_LATENCY_WINDOW = int(os.getenv("GPT_KEYWORD_LATENCY_WINDOW", "200"))
+# 지연 기록이 이보다 적으면 p95를 믿지 않음 (마감 기반 하향 안 함)
+GPT_KEYWORD_MIN_SAMPLES = 5
+# 응답 토큰 상한: 기본값 + 입력 토큰 비율, 최대값
+KEYWORD_MIN_OUTPUT_TOKENS = 128
+KEYWORD_MAX_OUTPUT_TOKENS = 2048
+KEYWORD_OUTPUT_RATIO = 0.6
+
+
+class KeywordRouter:
+    def __init__(
+        self,
+        model: str = GPT_KEYWORD_MODEL,
+        fast_model: str = GPT_KEYWORD_FAST_MODEL,
+        short_tokens: int = GPT_KEYWORD_SHORT_TOKENS,
+        enabled: bool = GPT_KEYWORD_ROUTING,
+    ):
+        self.model = model
+        self.fast_model = fast_model if enabled else model
+        self.short_tokens = short_tokens
+        self.enabled = enabled
+        # 모델 → 최근 호출 지연(초)
+        self._latency: Dict[str, deque] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def signature(self) -> str:
+        """캐시 버전에 넣을 모델 구성 (라우팅 설정이 바뀌면 키워드 캐시도 새로 채움)"""
+        if not self.enabled:
+            return self.model
+        return f"{self.model}+{self.fast_model}@{self.short_tokens}"
+
+    def percentile(self, model: str, q: float) -> Optional[float]:
+        with self._lock:
+            samples = list(self._latency.get(model, ()))
+        if len(samples) < GPT_KEYWORD_MIN_SAMPLES:
+            return None
+        return float(np.percentile(samples, q))
+
+    def route(self, tokens: int, remaining: Optional[float] = None) -> Dict[str, Any]:
+        """
+        추정 입력 토큰 수, 남은 시간 예산(초, 없으면 마감 없음) → {"model", "max_tokens", "reason"}
+        reason: short(짧은 페이지) | deadline(마감 때문에 하향) | dense(기본 모델) | fixed(라우팅 꺼짐)
+        """
+        max_tokens = int(min(KEYWORD_MAX_OUTPUT_TOKENS, KEYWORD_MIN_OUTPUT_TOKENS + tokens * KEYWORD_OUTPUT_RATIO))
+        if not self.enabled:
+            return {"model": self.model, "max_tokens": max_tokens, "reason": "fixed"}
+        if tokens <= self.short_tokens:
+            return {"model": self.fast_model, "max_tokens": max_tokens, "reason": "short"}
+        if remaining is not None:
+            p95 = self.percentile(self.model, 95)
+            if p95 is not None and remaining < p95:
+                return {"model": self.fast_model, "max_tokens": max_tokens, "reason": "deadline"}
+        return {"model": self.model, "max_tokens": max_tokens, "reason": "dense"}
+
+    def record(self, model: str, seconds: float, reason: str, ok: bool = True) -> None:
+        with self._lock:
+            window = self._latency.setdefault(model, deque(maxlen=GPT_KEYWORD_LATENCY_WINDOW))
+            stats = self._stats.setdefault(model, {"calls": 0, "errors": 0})
+            stats["calls"] += 1
+            stats[reason] = stats.get(reason, 0) + 1
+            if ok:
+                window.append(seconds)
+            else:
+                stats["errors"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = {model: (dict(stats), list(self._latency.get(model, ()))) for model, stats in self._stats.items()}
+        models = {}
+        for model, (stats, samples) in snapshot.items():
+            if samples:
+                p50, p95 = np.percentile(samples, (50, 95))
+                stats.update({"p50_ms": round(float(p50) * 1000, 1), "p95_ms": round(float(p95) * 1000, 1)})
+            models[model] = stats
+        return {
+            "enabled": self.enabled,
+            "model": self.model,
+            "fast_model": self.fast_model,
+            "short_tokens": self.short_tokens,
+            "models": models,
+        }
+
+
+keyword_router = KeywordRouter()
@@ -0,0 +1,271 @@
+"""
+로컬 키워드 추출 (네트워크·외부 형태소 분석기 없음).
+- 후보 단어: 한글 어절에서 조사·서술격 어미를 떼어낸 명사 후보, 영어 단어, 두 자리 이상 숫자.
+  동사/형용사로 끝나는 어절(하다·되다·있다 등)과 불용어는 제외.
+- 점수: TF-IDF. 문서 빈도는 사용자의 이전 학습 자료(ocr_data 페이지) + 이번 요청의 페이지로 계산
+  → 사용자가 매번 보는 흔한 단어는 낮게, 이 페이지에 특징적인 단어는 높게.
+  사용자 코퍼스는 요청 경로에서 DB를 기다리지 않음: 백그라운드 스레드가 불러온 마지막 스냅샷을 사용하고,
+  아직 없으면 이번 요청의 페이지만으로 계산 (OCR 시작 시 warm 으로 미리 불러옴).
+- 사용처: GPT_KEYWORD_MODE=local(요청별 keyword_mode=fast) 빠른 모드, GPT 오류·지연(GPT_KEYWORD_BUDGET_SECONDS 초과) 시 대체.
+키워드는 본문에 그대로 나오는 형태(조사 제거 후)로 반환하므로 빈칸 생성에 바로 사용 가능.
+"""
+
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+LOCAL_KEYWORD_MAX = int(os.getenv("LOCAL_KEYWORD_MAX", "20"))
+# 사용자 코퍼스: 최근 학습 자료 수 / 메모리에 유지할 사용자 수 / 다시 불러오는 주기(초)
+LOCAL_KEYWORD_CORPUS_ROWS = int(os.getenv("LOCAL_KEYWORD_CORPUS_ROWS", "50"))
+LOCAL_KEYWORD_CORPUS_USERS = int(os.getenv("LOCAL_KEYWORD_CORPUS_USERS", "256"))
+LOCAL_KEYWORD_CORPUS_TTL_SECONDS = int(os.getenv("LOCAL_KEYWORD_CORPUS_TTL_SECONDS", "600"))
+# 코퍼스를 불러오는 백그라운드 스레드 수
+LOCAL_KEYWORD_CORPUS_WORKERS = max(1, int(os.getenv("LOCAL_KEYWORD_CORPUS_WORKERS", "2")))
+
+_TOKEN = re.compile(r"[가-힣]+|[A-Za-z][A-Za-z\-]*[A-Za-z]|[A-Za-z]|\d+(?:\.\d+)?")
+
+# 긴 것부터 떼어냄
+_JOSA = sorted({
+    "에서부터", "으로부터", "로부터", "에게서", "이라는", "이라고", "이었다", "이므로", "에서는", "에서도", "으로는", "으로써",
+    "으로서", "이다", "이며", "이고", "이나", "이란", "이라", "에서", "에게", "한테", "께서", "으로", "처럼", "까지", "부터",
+    "보다", "마다", "조차", "밖에", "라는", "라고", "에는", "에도", "와의", "과의", "로서", "로써", "들의", "들은", "들이",
+    "들을", "들과", "들도", "은", "는", "이", "가", "을", "를", "의", "에", "도", "만", "로", "과", "와", "나", "들",
+}, key=len, reverse=True)
+
+# 용언(동사·형용사) 활용형으로 끝나는 어절은 명사가 아님
+_PREDICATE_ENDINGS = (
+    "하다", "되다", "한다", "된다", "했다", "됐다", "있다", "없다", "같다", "하는", "되는", "있는", "없는", "하고",
+    "되고", "하며", "되며", "하여", "되어", "해서", "돼서", "하면", "되면", "하지", "되지", "했고", "하게", "되게", "습니다",
+    "합니다", "됩니다", "니다", "었다", "았다", "였다", "는다", "으면", "하기", "시키", "받는", "위한", "대한", "통한", "관한", "드는", "르는",
+)
+
+_STOPWORDS_KO = {
+    "것", "수", "등", "및", "그", "이", "저", "때", "중", "위", "곳", "점", "바", "더", "또", "즉", "이후", "이전",
+    "경우", "통해", "대해", "대한", "위해", "여러", "모든", "각각", "하나", "우리", "이것", "그것", "저것", "무엇", "어떤",
+    "다음", "아래", "위의", "다른", "같은", "또한", "그리고", "그러나", "하지만", "따라서", "때문", "정도", "부분", "사용",
+}
+
+_STOPWORDS_EN = {
+    "the", "and", "for", "are", "but", "not", "you", "all", "any", "can", "had", "her", "was", "one", "our", "out",
+    "has", "have", "him", "his", "how", "its", "may", "new", "now", "old", "see", "two", "way", "who", "did", "get",
+    "let", "say", "she", "too", "use", "that", "with", "this", "from", "they", "will", "would", "there", "their",
+    "what", "about", "which", "when", "make", "like", "into", "than", "then", "them", "these", "some", "could",
+    "other", "more", "also", "been", "were", "each", "such", "only", "over", "most", "very", "where", "while",
+}
+
+
+# 받침 유무에 따라 형태가 갈리는 조사: 받침 뒤 / 받침 없는 음절 뒤
+_JOSA_AFTER_BATCHIM = {"은", "이", "을", "과"}
+_JOSA_AFTER_VOWEL = {"는", "가", "를", "와"}
+# 받침과 상관없이 붙는 한 글자 조사 (로는 받침 없는 음절·ㄹ 받침 뒤): 두 음절 어절에서는 명사 끝 음절과
+# 구분할 수 없음 (힘의·물도·물로 vs 정의·온도·회로) → 같은 텍스트에 조사가 붙은 형태로도 나올 때만 명사로 봄
+_JOSA_ANY = {"의", "에", "도", "만", "로", "나", "들"}
+_BATCHIM_RIEUL = 8
+
+# 받침 없는 음절 + "다"로 끝나는 용언 기본형 (크다, 다르다, 나타나다 …). 받침 있는 음절 + "다"는 모두 용언
+# (일어난다, 있었다, 높다 …). 바다·캐나다처럼 "다"로 끝나는 명사는 남김
+_PREDICATE_DA = (
+    "지다", "내다", "주다", "르다", "우다", "추다", "치다", "키다", "리다", "기다", "쓰다", "크다", "가다", "오다",
+    "서다", "보다", "어나다", "타나다",
+)
+
+
+def _has_batchim(syllable: str) -> bool:
+    return (ord(syllable) - 0xAC00) % 28 != 0
+
+
+def _josa_fits(syllable: str, josa: str) -> bool:
+    """한 글자 조사가 앞 음절의 받침과 맞는 형태인지"""
+    batchim = (ord(syllable) - 0xAC00) % 28
+    if josa in _JOSA_AFTER_BATCHIM:
+        return batchim != 0
+    if josa in _JOSA_AFTER_VOWEL:
+        return batchim == 0
+    if josa == "로":
+        return batchim in (0, _BATCHIM_RIEUL)
+    return True
+
+
+def _ambiguous_josa(word: str) -> bool:
+    """한 음절 + 받침과 무관한 조사로 읽을 수도 있는 두 음절 어절 (힘의, 온도 …)"""
+    return len(word) == 2 and word[1] in _JOSA_ANY and _josa_fits(word[0], word[1])
+
+
+def _strip_josa(word: str) -> str:
+    """
+    어절 끝 조사를 떼어냄. 어간이 한 음절이면 두 글자 이상 조사(물에서, 땅으로)이거나
+    받침과 형태가 맞는 조사(빛과, 물은, 힘이)일 때만 — 국가·사과·나이 같은 두 음절 명사는 그대로.
+    받침과 무관한 조사로 끝나는 두 음절 어절은 여기서 판단하지 않음 (candidate_terms 에서 처리).
+    """
+    for josa in _JOSA:
+        stem_len = len(word) - len(josa)
+        if stem_len < 1 or not word.endswith(josa):
+            continue
+        if stem_len == 1 and len(josa) == 1 and (josa in _JOSA_ANY or not _josa_fits(word[0], josa)):
+            continue
+        return word[:-len(josa)]
+    return word
+
+
+def _is_predicate_da(word: str) -> bool:
+    """조사를 떼고도 "-다"로 끝나는 용언 종결·기본형인지 (일어난다, 크다 …)"""
+    return len(word) >= 2 and word.endswith("다") and (_has_batchim(word[-2]) or word.endswith(_PREDICATE_DA))
+
+
+def candidate_terms(text: str) -> List[str]:
+    """텍스트 → 키워드 후보 목록 (본문 순서, 중복 포함)"""
+    terms = []
+    # 조사를 떼어내고 남은 어간 / 조사로 끝나는지 애매한 두 음절 어절의 위치
+    stems = set()
+    ambiguous = []
+    for token in _TOKEN.findall(text or ""):
+        first = token[0]
+        if "가" <= first <= "힣":
+            if token.endswith(_PREDICATE_ENDINGS):
+                continue
+            word = _strip_josa(token)
+            if word != token:
+                stems.add(word)
+            if _is_predicate_da(word):
+                continue
+            if len(word) >= 2 and word not in _STOPWORDS_KO:
+                if _ambiguous_josa(word):
+                    ambiguous.append(len(terms))
+                terms.append(word)
+        elif first.isdigit():
+            if len(token.replace(".", "")) >= 2:
+                terms.append(token)
+        elif len(token) >= 3 and token.lower() not in _STOPWORDS_EN:
+            terms.append(token)
+    # 힘의·물도처럼 한 음절 명사 + 조사인 어절은 제외 (조사가 붙은 형태로도 나온 온도·회로 등은 명사로 유지)
+    drop = {i for i in ambiguous if terms[i] not in stems}
+    return [term for i, term in enumerate(terms) if i not in drop] if drop else terms
+
+
+class CorpusStats:
+    """
+    사용자별 문서 빈도(DF). 이전 학습 자료 페이지를 백그라운드 스레드에서 불러와 TTL 동안 재사용 (LRU로 사용자 수 제한).
+    get 은 DB를 기다리지 않음: 마지막 스냅샷(만료됐으면 새로 고침 예약)을 반환하고, 없으면 빈 코퍼스.
+    """
+
+    def __init__(self):
+        self._items: "OrderedDict[str, Tuple[float, int, Counter]]" = OrderedDict()
+        self._loading = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=LOCAL_KEYWORD_CORPUS_WORKERS, thread_name_prefix="keyword-corpus")
+
+    def warm(self, corpus_key: Optional[str]) -> None:
+        """스냅샷이 없거나 만료됐으면 백그라운드로 불러오기 예약 (이미 불러오는 중이면 무시)"""
+        if not corpus_key:
+            return
+        with self._lock:
+            entry = self._items.get(corpus_key)
+            if (entry is not None and entry[0] > time.time()) or corpus_key in self._loading:
+                return
+            self._loading.add(corpus_key)
+        try:
+            self._executor.submit(self._refresh, corpus_key)
+        except RuntimeError:
+            # 인터프리터 종료 중
+            with self._lock:
+                self._loading.discard(corpus_key)
+
+    def _refresh(self, corpus_key: str) -> None:
+        try:
+            docs = _load_user_pages(corpus_key)
+            df: Counter = Counter()
+            for doc in docs:
+                df.update(set(t.lower() for t in candidate_terms(doc)))
+            with self._lock:
+                self._items[corpus_key] = (time.time() + LOCAL_KEYWORD_CORPUS_TTL_SECONDS, len(docs), df)
+                self._items.move_to_end(corpus_key)
+                while len(self._items) > LOCAL_KEYWORD_CORPUS_USERS:
+                    self._items.popitem(last=False)
+        finally:
+            with self._lock:
+                self._loading.discard(corpus_key)
+
+    def get(self, corpus_key: Optional[str]) -> Tuple[int, Counter]:
+        """(문서 수, 용어별 문서 빈도). 아직 불러오지 않았으면 빈 코퍼스 (이번 요청 페이지만 사용)."""
+        if not corpus_key:
+            return 0, Counter()
+        self.warm(corpus_key)
+        with self._lock:
+            entry = self._items.get(corpus_key)
+            if entry is None:
+                return 0, Counter()
+            self._items.move_to_end(corpus_key)
+            return entry[1], entry[2]
+
+
+def _load_user_pages(email: str) -> List[str]:
+    """사용자의 최근 학습 자료(ocr_data.ocr_text.pages) 원문 목록"""
+    try:
+        # DB 클라이언트는 코퍼스가 필요할 때만 불러옴 (추출기 자체는 네트워크 없이 동작)
+        from core.database import supabase
+
+        res = (
+            supabase.table("ocr_data")
+            .select("ocr_text")
+            .eq("user_email", email)
+            .order("created_at", desc=True)
+            .limit(LOCAL_KEYWORD_CORPUS_ROWS)
+            .execute()
+        )
+        pages = []
+        for row in res.data or []:
+            for page in (row.get("ocr_text") or {}).get("pages") or []:
+                if page.get("original_text"):
+                    pages.append(page["original_text"])
+        return pages
+    except Exception as e:
+        print(f"⚠️ 로컬 키워드 코퍼스 불러오기 실패: {e}")
+        return []
+
+
+corpus_stats = CorpusStats()
+
+
+def extract_local_keywords(
+    pages_text: Sequence[str],
+    page_indices: Optional[Sequence[int]] = None,
+    corpus_key: Optional[str] = None,
+    max_keywords: int = LOCAL_KEYWORD_MAX,
+) -> Dict[int, List[str]]:
+    """
+    페이지별 TF-IDF 상위 키워드 {페이지 인덱스: 키워드}. page_indices를 주면 그 페이지만 추출
+    (문서 빈도에는 이번 요청의 모든 페이지 포함). corpus_key: 사용자 이메일 (이전 학습 자료를 코퍼스로 사용).
+    """
+    indices = range(len(pages_text)) if page_indices is None else page_indices
+    page_terms = [candidate_terms(text) for text in pages_text]
+    corpus_docs, corpus_df = corpus_stats.get(corpus_key)
+    df = Counter()
+    for terms in page_terms:
+        df.update(set(t.lower() for t in terms))
+    total_docs = corpus_docs + len(pages_text)
+
+    result: Dict[int, List[str]] = {}
+    for idx in indices:
+        terms = page_terms[idx]
+        if not terms:
+            result[idx] = []
+            continue
+        counts = Counter(t.lower() for t in terms)
+        # 본문에 처음 나온 형태를 키워드로 사용 (대소문자 유지)
+        surface: Dict[str, str] = {}
+        for t in terms:
+            surface.setdefault(t.lower(), t)
+        scored = []
+        for term, count in counts.items():
+            idf = math.log((1 + total_docs) / (1 + df[term] + corpus_df.get(term, 0))) + 1
+            tf = 1 + math.log(count)
+            # 긴 복합명사(전문 용어)일수록 약간 가산
+            scored.append((tf * idf * (1 + 0.1 * min(len(term), 6)), term))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        result[idx] = [surface[term] for _, term in scored[:max_keywords]]
+    return result
@@ -0,0 +1,136 @@
+"""
+OCR 결과 캐시 (내용 주소 기반).
+- 키: Clova로 보내는 최종 bytes(crop 적용 후)의 SHA-256 + 확장자 + 서비스/모델 버전.
+- 1차: 메모리 LRU (항목 수·총 크기 제한), 2차(선택): OCR_CACHE_DIR 디렉터리에 JSON 파일로 영속 저장.
+- 같은 학습지 사진/PDF를 다시 올리면 Clova·GPT 호출 없이 바로 반환.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+OCR_CACHE_ENABLED = (os.getenv("OCR_CACHE_ENABLED", "1").strip().lower() in ("1", "true", "yes", "on"))
+OCR_CACHE_MAX_ENTRIES = int(os.getenv("OCR_CACHE_MAX_ENTRIES", "256"))
+OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# 비우면 영속 계층 사용 안 함
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", "").strip()
+OCR_CACHE_DIR_MAX_ENTRIES = int(os.getenv("OCR_CACHE_DIR_MAX_ENTRIES", "5000"))
+# 캐시 적중도 OCR_PAGE_LIMIT 사용량에 포함할지 (기본: 포함 — 기존 과금 정책 유지)
+OCR_CACHE_COUNT_HITS = (os.getenv("OCR_CACHE_COUNT_HITS", "1").strip().lower() in ("1", "true", "yes", "on"))
+
+
+def make_cache_key(file_bytes: bytes, filename: str, version: str) -> str:
+    """최종 전송 bytes + 확장자 + 버전으로 캐시 키 생성"""
+    ext = (filename or "").split(".")[-1].lower() if "." in (filename or "") else ""
+    digest = hashlib.sha256()
+    digest.update(f"{version}|{ext}|".encode("utf-8"))
+    digest.update(file_bytes)
+    return digest.hexdigest()
+
+
+class OCRResultCache:
+    def __init__(
+        self,
+        max_entries: int = OCR_CACHE_MAX_ENTRIES,
+        max_bytes: int = OCR_CACHE_MAX_BYTES,
+        cache_dir: str = OCR_CACHE_DIR,
+        dir_max_entries: int = OCR_CACHE_DIR_MAX_ENTRIES,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.dir_max_entries = dir_max_entries
+        self._items: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _remember(self, key: str, encoded: bytes) -> None:
+        """메모리 LRU에 저장 후 한도 초과분 제거 (_lock 보유 상태에서 호출)"""
+        if key in self._items:
+            self._size -= len(self._items.pop(key))
+        if len(encoded) > self.max_bytes:
+            return
+        self._items[key] = encoded
+        self._size += len(encoded)
+        while self._items and (len(self._items) > self.max_entries or self._size > self.max_bytes):
+            _, evicted = self._items.popitem(last=False)
+            self._size -= len(evicted)
+            self._stats["evictions"] += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            encoded = self._items.get(key)
+            if encoded is not None:
+                self._items.move_to_end(key)
+                self._stats["hits"] += 1
+                return json.loads(encoded)
+
+        if self.cache_dir:
+            try:
+                with open(self._path(key), "rb") as f:
+                    encoded = f.read()
+                result = json.loads(encoded)
+                with self._lock:
+                    self._remember(key, encoded)
+                    self._stats["disk_hits"] += 1
+                return result
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"⚠️ OCR 캐시 파일 읽기 실패 ({key[:12]}): {e}")
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        encoded = json.dumps(result, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            self._remember(key, encoded)
+
+        if self.cache_dir:
+            try:
+                tmp_path = f"{self._path(key)}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(encoded)
+                os.replace(tmp_path, self._path(key))
+                self._trim_dir()
+            except Exception as e:
+                print(f"⚠️ OCR 캐시 파일 저장 실패 ({key[:12]}): {e}")
+
+    def _trim_dir(self) -> None:
+        """영속 계층 파일 수가 한도를 넘으면 오래된(mtime) 파일부터 삭제"""
+        entries = [e for e in os.scandir(self.cache_dir) if e.name.endswith(".json")]
+        overflow = len(entries) - self.dir_max_entries
+        if overflow <= 0:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:overflow]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["disk_hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._items),
+                "bytes": self._size,
+                "hit_rate": round((self._stats["hits"] + self._stats["disk_hits"]) / lookups, 3) if lookups else 0.0,
+                "persistent": bool(self.cache_dir),
+                "count_hits_in_usage": OCR_CACHE_COUNT_HITS,
+            }
+
+
+ocr_result_cache = OCRResultCache() if OCR_CACHE_ENABLED else None
@@ -0,0 +1,229 @@
+"""
+OCR 단어 좌표(geometry) 저장 형식과 영역 텍스트 조회.
+- Clova 필드(단어)마다 읽기 순서대로 박스 [x0, y0, x1, y1] 와 페이지 텍스트(original_text) 안 위치 [start, end] 를 저장.
+- 배열은 정수 배열을 base64 로 인코딩 (값 범위에 맞춰 uint16 또는 int32) → 필드 dict 목록보다 훨씬 작음.
+  { "v": 1, "count": N, "boxes": {"dtype": "<u2", "data": "..."}, "spans": {...},
+    "origin": [x, y], "scale": s, "rotated": false }
+- 박스 좌표는 Clova에 보낸 이미지(crop·축소 후) 픽셀 기준. origin/scale 은 ocr_app 에서 붙이며
+  원본 좌표 = origin + 박스 좌표 / scale (EXIF 회전이 적용된 이미지는 rotated=true, 원본 좌표 변환 불가).
+- OCR 응답을 만들 때 서버가 페이지 텍스트·geometry 를 ocr_id 로 잠시 보관 (geometry_store) →
+  /study/grade 가 ocr_id 를 받아 ocr_text.pages[i].geometry 로 함께 저장.
+- geometry_store 는 프로세스 메모리라 다른 워커·재시작 후에는 ocr_id 가 없을 수 있음 → 응답의 geometry 에
+  서명(sig: 사용자·원문·좌표의 HMAC)을 붙여 내보내고, 보관분이 없으면 클라이언트가 돌려보낸 geometry 중
+  서명이 맞는 것만 저장 (서명이 없거나 틀린 geometry 는 버림).
+  저장된 좌표로 다시 자르기·빈칸 재생성 시 Clova 재호출 없이 영역 텍스트를 조회.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+GEOMETRY_VERSION = 1
+# 단어 박스가 영역과 이 비율 이상 겹치면 영역 안 단어로 판단
+GEOMETRY_MIN_OVERLAP = 0.5
+# OCR 응답 후 채점·저장까지 geometry 를 보관하는 시간(초) / 최대 항목 수 (프로세스 메모리)
+OCR_GEOMETRY_TTL_SECONDS = float(os.getenv("OCR_GEOMETRY_TTL_SECONDS", str(6 * 3600)))
+OCR_GEOMETRY_MAX_ENTRIES = int(os.getenv("OCR_GEOMETRY_MAX_ENTRIES", "1024"))
+# geometry 서명 키 (없으면 JWT_SECRET_KEY, 둘 다 없으면 서명하지 않고 ocr_id 보관분만 사용)
+OCR_GEOMETRY_SECRET = os.getenv("OCR_GEOMETRY_SECRET") or os.getenv("JWT_SECRET_KEY") or ""
+
+
+def _pack(values: np.ndarray) -> Dict[str, str]:
+    """정수 배열 → {"dtype", "data"(base64)}. 음수가 없고 65535 이하이면 uint16."""
+    values = np.asarray(values, dtype=np.int64)
+    small = values.size == 0 or (values.min() >= 0 and values.max() <= np.iinfo(np.uint16).max)
+    dtype = "<u2" if small else "<i4"
+    return {"dtype": dtype, "data": base64.b64encode(values.astype(dtype).tobytes()).decode("ascii")}
+
+
+def _unpack(packed: Dict[str, str], columns: int) -> np.ndarray:
+    data = base64.b64decode(packed["data"])
+    return np.frombuffer(data, dtype=np.dtype(packed["dtype"])).astype(np.int64).reshape(-1, columns)
+
+
+def encode_geometry(boxes: np.ndarray, spans: np.ndarray) -> Dict[str, Any]:
+    """읽기 순서의 단어 박스 (N, 4) 와 텍스트 위치 (N, 2) → 저장용 dict"""
+    boxes = np.rint(np.asarray(boxes, dtype=np.float64).reshape(-1, 4))
+    spans = np.asarray(spans).reshape(-1, 2)
+    return {
+        "v": GEOMETRY_VERSION,
+        "count": int(len(boxes)),
+        "boxes": _pack(boxes),
+        "spans": _pack(spans),
+    }
+
+
+def decode_geometry(geometry: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """저장된 geometry → (boxes (N, 4), spans (N, 2)). 형식이 맞지 않으면 ValueError."""
+    try:
+        if geometry.get("v") != GEOMETRY_VERSION:
+            raise ValueError(f"지원하지 않는 geometry 버전입니다: {geometry.get('v')}")
+        boxes = _unpack(geometry["boxes"], 4)
+        spans = _unpack(geometry["spans"], 2)
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"geometry 형식이 올바르지 않습니다: {e}")
+    if len(boxes) != len(spans):
+        raise ValueError("geometry 박스 수와 텍스트 위치 수가 다릅니다.")
+    return boxes, spans
+
+
+def _to_ocr_space(geometry: Dict[str, Any], rect: Sequence[float]) -> np.ndarray:
+    """원본 좌표 [x, y, width, height] → Clova 입력 이미지 좌표 [x0, y0, x1, y1]"""
+    x, y, w, h = (float(v) for v in rect)
+    ox, oy = geometry.get("origin") or (0, 0)
+    scale = float(geometry.get("scale") or 1.0)
+    return np.array([(x - ox) * scale, (y - oy) * scale, (x + w - ox) * scale, (y + h - oy) * scale])
+
+
+def _to_original_space(geometry: Dict[str, Any], boxes: np.ndarray) -> np.ndarray:
+    ox, oy = geometry.get("origin") or (0, 0)
+    scale = float(geometry.get("scale") or 1.0)
+    return boxes / scale + np.array([ox, oy, ox, oy])
+
+
+def text_in_rect(
+    text: str,
+    geometry: Dict[str, Any],
+    rect: Sequence[float],
+    space: str = "original",
+    min_overlap: float = GEOMETRY_MIN_OVERLAP,
+) -> Dict[str, Any]:
+    """
+    페이지 텍스트 + geometry 에서 사각형 rect([x, y, width, height]) 안 단어만 읽기 순서로 모아 반환.
+    space: "original"(업로드 원본 좌표, origin/scale 로 변환) 또는 "ocr"(Clova 입력 이미지 좌표 그대로).
+    단어 사이 구분은 원래 텍스트를 따름 (원래 줄이 바뀌던 곳은 줄바꿈, 아니면 공백).
+    반환: {"text", "words": [{"text", "box": [x0, y0, x1, y1]}]}  (box 는 space 좌표)
+    """
+    boxes, spans = decode_geometry(geometry)
+    if space == "original":
+        if geometry.get("rotated"):
+            raise ValueError("회전 보정된 이미지는 원본 좌표로 조회할 수 없습니다. space=ocr 로 조회해주세요.")
+        area = _to_ocr_space(geometry, rect)
+    elif space == "ocr":
+        x, y, w, h = (float(v) for v in rect)
+        area = np.array([x, y, x + w, y + h])
+    else:
+        raise ValueError("space 는 original 또는 ocr 이어야 합니다.")
+
+    # 단어 박스와 영역의 교집합 면적 / 단어 박스 면적
+    ix = np.clip(np.minimum(boxes[:, 2], area[2]) - np.maximum(boxes[:, 0], area[0]), 0, None)
+    iy = np.clip(np.minimum(boxes[:, 3], area[3]) - np.maximum(boxes[:, 1], area[1]), 0, None)
+    word_area = np.maximum((boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]), 1)
+    selected = np.flatnonzero(ix * iy / word_area >= min_overlap)
+
+    parts: List[str] = []
+    words: List[Dict[str, Any]] = []
+    prev_end: Optional[int] = None
+    out_boxes = boxes[selected] if space == "ocr" else _to_original_space(geometry, boxes[selected].astype(np.float64))
+    for idx, box in zip(selected.tolist(), out_boxes.tolist()):
+        start, end = spans[idx].tolist()
+        word = text[start:end]
+        if prev_end is not None:
+            parts.append("\n" if "\n" in text[prev_end:start] else " ")
+        parts.append(word)
+        prev_end = end
+        words.append({"text": word, "box": [round(v, 1) for v in box]})
+    return {"text": "".join(parts), "words": words}
+
+
+class GeometryStore:
+    """
+    OCR 결과의 페이지별 (original_text, geometry) 를 ocr_id 로 보관하는 메모리 LRU (TTL·항목 수 제한).
+    ocr_id 는 요청한 사용자(email)에게만 유효.
+    """
+
+    def __init__(self, ttl: float = OCR_GEOMETRY_TTL_SECONDS, max_entries: int = OCR_GEOMETRY_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._items: "OrderedDict[str, Tuple[float, str, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, email: str, pages: List[Dict[str, Any]]) -> str:
+        """pages: 페이지 순서의 {"original_text", "geometry"} → 새 ocr_id"""
+        ocr_id = uuid.uuid4().hex
+        with self._lock:
+            self._items[ocr_id] = (time.time() + self.ttl, email, pages)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+        return ocr_id
+
+    def get(self, email: str, ocr_id: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        """만료됐거나 다른 사용자의 ocr_id 면 None"""
+        if not ocr_id:
+            return None
+        with self._lock:
+            item = self._items.get(ocr_id)
+            if item is None:
+                return None
+            expires, owner, pages = item
+            if expires < time.time():
+                del self._items[ocr_id]
+                return None
+        return pages if owner == email else None
+
+
+geometry_store = GeometryStore()
+
+
+def _geometry_digest(email: str, text: Optional[str], geometry: Dict[str, Any]) -> str:
+    body = json.dumps(
+        [email, text or "", {k: v for k, v in geometry.items() if k != "sig"}],
+        ensure_ascii=False, sort_keys=True, separators=(",", ":"),
+    )
+    return hmac.new(OCR_GEOMETRY_SECRET.encode("utf-8"), body.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def sign_geometry(email: str, text: Optional[str], geometry: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """응답으로 내보낼 geometry 에 사용자·원문에 묶인 서명(sig) 추가 (서명 키가 없으면 그대로)"""
+    if not geometry or not OCR_GEOMETRY_SECRET:
+        return geometry
+    return {**geometry, "sig": _geometry_digest(email, text, geometry)}
+
+
+def verify_geometry(email: str, text: Optional[str], geometry: Any) -> bool:
+    """클라이언트가 돌려보낸 geometry 의 서명이 이 사용자·원문으로 만든 것인지 확인"""
+    if not OCR_GEOMETRY_SECRET or not isinstance(geometry, dict) or not isinstance(geometry.get("sig"), str):
+        return False
+    try:
+        expected = _geometry_digest(email, text, geometry)
+    except (TypeError, ValueError):
+        return False
+    return hmac.compare_digest(expected, geometry["sig"])
+
+
+def attach_geometry(
+    pages: List[Dict[str, Any]], stored: Optional[List[Dict[str, Any]]], email: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    저장할 ocr_text.pages 에 geometry 를 붙임: 서버가 보관한 것 우선, 없으면 서명이 맞는 클라이언트 geometry.
+    원문이 바뀐 페이지는 텍스트 위치(spans)가 맞지 않으므로 붙이지 않음 (서명에 원문이 포함돼 있어 클라이언트 것도 동일).
+    저장할 때 서명(sig)은 뺌.
+    """
+    stored = stored or []
+    result = []
+    for idx, page in enumerate(pages):
+        if not isinstance(page, dict):
+            result.append(page)
+            continue
+        client = page.get("geometry")
+        page = {k: v for k, v in page.items() if k != "geometry"}
+        saved = stored[idx] if idx < len(stored) else None
+        if saved and saved.get("geometry") and saved.get("original_text") == page.get("original_text"):
+            geometry = saved["geometry"]
+        elif email and verify_geometry(email, page.get("original_text"), client):
+            geometry = client
+        else:
+            geometry = None
+        if geometry:
+            page["geometry"] = {k: v for k, v in geometry.items() if k != "sig"}
+        result.append(page)
+    return result
@@ -0,0 +1,114 @@
+"""
+OCR 비동기 작업 큐.
+- POST /ocr/jobs: 업로드 즉시 job_id 반환, 제한된 워커 풀(스레드)에서 Clova + GPT 실행.
+- GET /ocr/jobs/{job_id}: 진행 상황(progress)과 완료 시 결과 반환.
+- 이벤트 루프를 막지 않으므로 무거운 PDF 1건이 다른 API(/reward/attendance 등)를 멈추지 않음.
+- 작업 상태는 프로세스 메모리에 보관 (워커 1개 gunicorn 기준). 완료 후 OCR_JOB_TTL_SECONDS 지나면 삭제.
+"""
+
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# 동시에 Clova+GPT를 돌릴 워커 수 / 대기열 최대 길이 / 완료 작업 보관 시간(초)
+OCR_JOB_WORKERS = int(os.getenv("OCR_JOB_WORKERS", "2"))
+OCR_JOB_MAX_PENDING = int(os.getenv("OCR_JOB_MAX_PENDING", "20"))
+OCR_JOB_TTL_SECONDS = int(os.getenv("OCR_JOB_TTL_SECONDS", "3600"))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_ERROR = "error"
+
+_executor = ThreadPoolExecutor(max_workers=OCR_JOB_WORKERS, thread_name_prefix="ocr-job")
+_jobs: Dict[str, Dict[str, Any]] = {}
+_lock = threading.Lock()
+
+
+class OCRJobQueueFullError(Exception):
+    """대기 중인 작업이 OCR_JOB_MAX_PENDING 이상이면 발생"""
+
+
+def _cleanup_expired(now: float) -> None:
+    """완료된 지 TTL이 지난 작업 삭제 (_lock 보유 상태에서 호출)"""
+    expired = [
+        job_id for job_id, job in _jobs.items()
+        if job["finished_at"] and now - job["finished_at"] > OCR_JOB_TTL_SECONDS
+    ]
+    for job_id in expired:
+        del _jobs[job_id]
+
+
+def _pending_count() -> int:
+    return sum(1 for job in _jobs.values() if job["state"] in (JOB_QUEUED, JOB_RUNNING))
+
+
+def _update(job_id: str, **fields) -> None:
+    with _lock:
+        job = _jobs.get(job_id)
+        if job:
+            job.update(fields)
+
+
+def _run(job_id: str, fn: Callable[[Callable[..., None]], Dict[str, Any]]) -> None:
+    _update(job_id, state=JOB_RUNNING, started_at=time.time())
+
+    def report(stage: str, done: int = 0, total: int = 0) -> None:
+        _update(job_id, progress={"stage": stage, "done": done, "total": total})
+
+    try:
+        result = fn(report)
+        state = JOB_ERROR if result.get("status") == "error" else JOB_DONE
+        _update(job_id, state=state, result=result, finished_at=time.time())
+        print(f"✅ [OCR Job] {job_id} 완료 (state={state})")
+    except Exception as e:
+        traceback.print_exc()
+        _update(
+            job_id,
+            state=JOB_ERROR,
+            result={"status": "error", "message": str(e)},
+            finished_at=time.time(),
+        )
+        print(f"❌ [OCR Job] {job_id} 실패: {e}")
+
+
+def submit_job(owner: str, fn: Callable[[Callable[..., None]], Dict[str, Any]]) -> str:
+    """
+    작업 등록 후 job_id 반환.
+    fn(report): 워커 스레드에서 실행. report(stage, done, total)로 진행 상황 갱신, 최종 응답 dict 반환.
+    """
+    now = time.time()
+    with _lock:
+        _cleanup_expired(now)
+        if _pending_count() >= OCR_JOB_MAX_PENDING:
+            raise OCRJobQueueFullError("OCR 작업 대기열이 가득 찼습니다. 잠시 후 다시 시도해주세요.")
+        job_id = uuid.uuid4().hex
+        _jobs[job_id] = {
+            "job_id": job_id,
+            "owner": owner,
+            "state": JOB_QUEUED,
+            "progress": {"stage": JOB_QUEUED, "done": 0, "total": 0},
+            "result": None,
+            "created_at": now,
+            "started_at": None,
+            "finished_at": None,
+        }
+    _executor.submit(_run, job_id, fn)
+    print(f"📥 [OCR Job] {job_id} 등록 (owner={owner})")
+    return job_id
+
+
+def get_job(job_id: str, owner: str) -> Optional[Dict[str, Any]]:
+    """작업 상태 스냅샷 반환. 없거나 다른 회원의 작업이면 None"""
+    with _lock:
+        _cleanup_expired(time.time())
+        job = _jobs.get(job_id)
+        if not job or job["owner"] != owner:
+            return None
+        snapshot = {k: v for k, v in job.items() if k != "owner"}
+        snapshot["progress"] = dict(job["progress"])
+        return snapshot
@@ -0,0 +1,399 @@
+"""
+Clova OCR fields → 읽기 순서 텍스트 복원 (NumPy 기반 레이아웃 엔진).
+- 모든 필드의 boundingPoly 대각 꼭짓점을 좌표축별 배열로 만들어 한 번에 계산 (필드별 dict 반복 정렬·튜플 없음).
+- 줄 구분 임계값: 고정 15px 대신 글자 높이 중앙값 기준 → 고해상도 스캔에서도 줄이 합쳐지지 않음.
+- 기울기 보정: 필드 윗변 각도(표본)의 중앙값만큼 좌표를 회전한 뒤 줄을 나눔.
+- 다단 편집: 전체 필드의 가로 점유 구간에서 넓은 빈 세로 띠(gutter)를 찾고, 양쪽이 모두 여러 줄이 나란히 놓인
+  넓고 긴 글 덩어리일 때만 단으로 나눠 위→아래 순서로 읽음 (여백의 문항 번호 등은 줄 단위 정렬 그대로).
+- 텍스트와 함께 단어 좌표(geometry)도 반환 → 저장해 두고 영역 텍스트 조회에 사용.
+
+벤치마크: python -m service.ocr_layout_service <clova 응답 JSON 파일 ...>
+(파일이 없으면 합성 페이지로 측정, 여러 번 실행한 최솟값)
+"""
+
+import gc
+import json
+import sys
+import time
+from operator import itemgetter
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from service.ocr_geometry_service import encode_geometry
+
+# 줄 구분 임계값 = 글자 높이 중앙값 * LINE_GAP_RATIO
+LINE_GAP_RATIO = 0.5
+# 이보다 작은 기울기(라디안, 약 0.5도)는 보정하지 않음
+MIN_SKEW_RAD = 0.0087
+# 단 사이 빈 띠 최소 폭 = 글자 높이 중앙값 * COLUMN_GAP_RATIO
+COLUMN_GAP_RATIO = 2.0
+# 한 단으로 인정할 최소 필드 비율
+MIN_COLUMN_SHARE = 0.1
+# 한 단으로 인정할 최소 폭 / 높이 (페이지 글 영역 대비 비율)
+MIN_COLUMN_WIDTH_SHARE = 0.25
+MIN_COLUMN_HEIGHT_SHARE = 0.5
+# 단 경계 양쪽에서 세로 범위가 겹치는(나란히 놓인) 줄이 각각 이만큼 있어야 단으로 나눔
+MIN_COLUMN_ROWS = 3
+# 필드에 높이 정보가 없을 때 쓰는 기본 글자 높이 (기존 15px 기준과 동일)
+DEFAULT_GLYPH_HEIGHT = 15.0
+
+# 기울기 추정에 쓰는 최대 필드 수 (고르게 뽑은 표본의 윗변 각도 중앙값)
+SKEW_SAMPLE = 256
+
+_TEXT = itemgetter("inferText")
+_POLY = itemgetter("boundingPoly")
+_VERTICES = itemgetter("vertices")
+_TOP_LEFT = itemgetter(0)
+_TOP_RIGHT = itemgetter(1)
+_BOTTOM_RIGHT = itemgetter(2)
+_X = itemgetter("x")
+_Y = itemgetter("y")
+
+
+def _xy(vertices: List[Dict[str, Any]]) -> np.ndarray:
+    """꼭짓점 dict 목록 → (2, N) 배열 (x 행, y 행을 각각 한 번에 읽음)"""
+    n = len(vertices)
+    xy = np.empty((2, n), dtype=np.float64)
+    xy[0] = np.fromiter(map(_X, vertices), dtype=np.float64, count=n)
+    xy[1] = np.fromiter(map(_Y, vertices), dtype=np.float64, count=n)
+    return xy
+
+
+def _skew_angle(top_left: np.ndarray, top_right: np.ndarray) -> float:
+    """필드 윗변(0→1 꼭짓점) 각도의 중앙값 (라디안). MIN_SKEW_RAD 보다 작으면 0."""
+    dx, dy = top_right - top_left
+    valid = np.abs(dx) > 1e-6
+    if not valid.any():
+        return 0.0
+    angle = float(np.median(np.arctan2(dy[valid], dx[valid])))
+    return angle if abs(angle) >= MIN_SKEW_RAD else 0.0
+
+
+def fields_to_arrays(fields: Sequence[Dict[str, Any]]) -> Tuple[List[str], np.ndarray, float]:
+    """
+    Clova fields → (텍스트 목록, (2, 2, N) 대각 꼭짓점 배열, 페이지 기울기). 누락된 좌표는 0.
+    대각 꼭짓점: [0] = x, [1] = y / 열 0 = 왼쪽 위(0번), 열 1 = 오른쪽 아래(2번) 꼭짓점.
+    Clova 박스는 0→1→2→3 순서의 직사각형이라 대각 두 꼭짓점 + 페이지 기울기로 박스가 정해짐
+    → 필드마다 읽는 값이 좌표 4개뿐 (모든 꼭짓점을 읽는 것보다 dict 접근이 절반).
+    기울기는 고르게 뽑은 최대 SKEW_SAMPLE개 필드의 윗변 각도 중앙값.
+    """
+    n = len(fields)
+    try:
+        texts = list(map(_TEXT, fields))
+    except KeyError:
+        texts = [f.get("inferText", "") for f in fields]
+
+    corners = np.empty((2, 2, n), dtype=np.float64)
+    try:
+        polys = list(map(_VERTICES, map(_POLY, fields)))
+        corners[:, 0] = _xy(list(map(_TOP_LEFT, polys)))
+        corners[:, 1] = _xy(list(map(_BOTTOM_RIGHT, polys)))
+        sample = polys[::max(1, n // SKEW_SAMPLE)]
+        angle = _skew_angle(_xy(list(map(_TOP_LEFT, sample))), _xy(list(map(_TOP_RIGHT, sample))))
+        return texts, corners, angle
+    except (IndexError, KeyError, TypeError, ValueError):
+        pass
+
+    # 꼭짓점이 빠진 필드가 섞인 경우: 필드별로 4개로 맞춤
+    points = []
+    for f in fields:
+        vertices = (f.get("boundingPoly") or {}).get("vertices") or []
+        pts = [(v.get("x", 0), v.get("y", 0)) for v in vertices[:4]]
+        pts += [pts[-1] if pts else (0, 0)] * (4 - len(pts))
+        points.append(pts)
+    coords = np.asarray(points, dtype=np.float64).reshape(n, 4, 2).transpose(2, 1, 0)
+    corners[:] = coords[:, [0, 2]]
+    return texts, corners, _skew_angle(coords[:, 0], coords[:, 1])
+
+
+def _rotate(xs: np.ndarray, ys: np.ndarray, angle: float) -> Tuple[np.ndarray, np.ndarray]:
+    cos, sin = np.cos(angle), np.sin(angle)
+    return xs * cos - ys * sin, xs * sin + ys * cos
+
+
+def _deskew(corners: np.ndarray, angle: float) -> np.ndarray:
+    """기울기만큼 반대로 회전한 좌표계의 필드 박스 (4, N): x0, y0, x1, y1"""
+    xs, ys = (corners[0], corners[1]) if angle == 0.0 else _rotate(corners[0], corners[1], -angle)
+    return np.stack([np.minimum(xs[0], xs[1]), np.minimum(ys[0], ys[1]),
+                     np.maximum(xs[0], xs[1]), np.maximum(ys[0], ys[1])])
+
+
+def _page_boxes(rect: np.ndarray, angle: float) -> np.ndarray:
+    """회전 좌표계 박스 (4, N) → 원래 이미지 좌표의 외접 박스 (4, N) (네 모서리를 되돌려 회전)"""
+    if angle == 0.0:
+        return rect
+    x0, y0, x1, y1 = rect
+    xs, ys = _rotate(np.stack([x0, x1, x1, x0]), np.stack([y0, y0, y1, y1]), angle)
+    return np.stack([xs.min(axis=0), ys.min(axis=0), xs.max(axis=0), ys.max(axis=0)])
+
+
+def _row_ranges(cy: np.ndarray, y0: np.ndarray, y1: np.ndarray, threshold: float) -> np.ndarray:
+    """세로 중심 간격이 threshold 이하인 필드를 한 줄로 묶어 줄별 세로 범위 (R, 2) 반환"""
+    by_y = np.argsort(cy)
+    starts = np.flatnonzero(np.concatenate(([True], np.diff(cy[by_y]) > threshold)))
+    return np.stack([np.minimum.reduceat(y0[by_y], starts), np.maximum.reduceat(y1[by_y], starts)], axis=1)
+
+
+def _is_column_split(rect: np.ndarray, left: np.ndarray, right: np.ndarray, threshold: float) -> bool:
+    """
+    빈 띠 양쪽(left/right 필드 마스크)을 서로 다른 단으로 볼지 판단.
+    양쪽 모두 페이지 글 영역 폭·높이의 상당 부분을 차지하고, 상대편과 세로 범위가 겹치는 줄이 여러 개여야 함
+    → 여백의 문항 번호·짧은 표식처럼 좁은 세로 띠는 단이 아니라 각 줄의 앞부분으로 읽힘.
+    """
+    x0, y0, x1, y1 = rect
+    page_width = float(x1.max() - x0.min())
+    page_height = float(y1.max() - y0.min())
+    for side in (left, right):
+        if float(x1[side].max() - x0[side].min()) < page_width * MIN_COLUMN_WIDTH_SHARE:
+            return False
+        if float(y1[side].max() - y0[side].min()) < page_height * MIN_COLUMN_HEIGHT_SHARE:
+            return False
+
+    cy = (y0 + y1) / 2.0
+    left_rows = _row_ranges(cy[left], y0[left], y1[left], threshold)
+    right_rows = _row_ranges(cy[right], y0[right], y1[right], threshold)
+    if len(left_rows) < MIN_COLUMN_ROWS or len(right_rows) < MIN_COLUMN_ROWS:
+        return False
+    overlap = (left_rows[:, None, 0] < right_rows[None, :, 1]) & (right_rows[None, :, 0] < left_rows[:, None, 1])
+    return (np.count_nonzero(overlap.any(axis=1)) >= MIN_COLUMN_ROWS
+            and np.count_nonzero(overlap.any(axis=0)) >= MIN_COLUMN_ROWS)
+
+
+def _column_edges(rect: np.ndarray, glyph_height: float, threshold: float) -> List[float]:
+    """
+    가로 점유 구간 합집합에서 폭이 충분한 빈 띠의 중앙 x좌표 목록 반환 (단 경계).
+    제목처럼 단 경계를 가로지르는 필드가 있으면 빈 띠가 생기지 않아 1단으로 처리됨.
+    빈 띠가 있어도 양쪽이 단다운 글 덩어리가 아니면(_is_column_split) 경계로 쓰지 않음.
+    """
+    x0, x1 = rect[0], rect[2]
+    lo, hi = float(x0.min()), float(x1.max())
+    bin_width = max(1.0, glyph_height / 4.0)
+    bins = int((hi - lo) / bin_width) + 2
+    start = np.clip(((x0 - lo) / bin_width).astype(np.int64), 0, bins - 1)
+    end = np.clip(np.ceil((x1 - lo) / bin_width).astype(np.int64), 0, bins - 1)
+    delta = np.bincount(start, minlength=bins + 1) - np.bincount(end, minlength=bins + 1)
+    empty = np.cumsum(delta)[:bins] <= 0
+
+    # 빈 구간(run) 찾기: 앞뒤 False를 붙여 경계 위치 계산
+    padded = np.concatenate(([False], empty, [False])).astype(np.int8)
+    changes = np.flatnonzero(np.diff(padded))
+    runs = changes.reshape(-1, 2)
+    min_bins = COLUMN_GAP_RATIO * glyph_height / bin_width
+
+    centers = (x0 + x1) / 2.0
+    min_share = max(1, int(len(x0) * MIN_COLUMN_SHARE))
+    edges: List[float] = []
+    for run_start, run_end in runs:
+        if run_start == 0 or run_end >= bins or run_end - run_start < min_bins:
+            continue
+        edge = lo + (run_start + run_end) / 2.0 * bin_width
+        prev_edge = edges[-1] if edges else -np.inf
+        left = (centers > prev_edge) & (centers < edge)
+        right = centers >= edge
+        if (np.count_nonzero(left) >= min_share and np.count_nonzero(right) >= min_share
+                and _is_column_split(rect, left, right, threshold)):
+            edges.append(edge)
+    return edges
+
+
+def order_fields(rect: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    읽기 순서로 정렬한 필드 인덱스와, 같은 순서의 줄 번호(페이지 전체에서 증가) 반환.
+    rect: 기울기 보정된 필드 박스 (4, N) — x0, y0, x1, y1
+    """
+    n = rect.shape[1]
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    x0, y0, x1, y1 = rect
+    heights = y1 - y0
+    positive = heights[heights > 0]
+    glyph_height = float(np.median(positive)) if positive.size else DEFAULT_GLYPH_HEIGHT
+    threshold = glyph_height * LINE_GAP_RATIO
+    cy = (y0 + y1) / 2.0
+
+    edges = _column_edges(rect, glyph_height, threshold) if n > 1 else []
+    column = np.searchsorted(np.asarray(edges), (x0 + x1) / 2.0) if edges else np.zeros(n, dtype=np.int64)
+
+    # 단 → 세로 중심 순으로 정렬 후, 인접 필드 간 세로 간격이 임계값을 넘으면 새 줄
+    # (정렬 키를 단 번호 * 세로 범위 + 세로 중심 하나로 합쳐 1회 정렬, 같은 값끼리는 어차피 같은 줄)
+    y_key = cy - cy.min()
+    if edges:
+        y_key = y_key + column * (float(y_key.max()) + threshold + 1.0)
+    by_y = np.argsort(y_key)
+    new_line = np.empty(n, dtype=bool)
+    new_line[0] = True
+    new_line[1:] = np.diff(y_key[by_y]) > threshold
+    line_of = np.empty(n, dtype=np.int64)
+    line_of[by_y] = np.cumsum(new_line) - 1
+
+    # 줄 번호 → 왼쪽 x 순으로 최종 읽기 순서 (줄 번호 * 가로 범위 + 왼쪽 x 를 키로 1회 정렬)
+    x_key = x0 - x0.min()
+    order = np.argsort(line_of * (float(x_key.max()) + 1.0) + x_key)
+    return order, line_of[order]
+
+
+def _ordered_text(fields: Sequence[Dict[str, Any]]) -> Tuple[List[str], str, np.ndarray, np.ndarray, float]:
+    """fields → (읽기 순서 단어 목록, 줄바꿈으로 합친 텍스트(strip 전), 읽기 순서, 회전 좌표계 박스, 기울기)"""
+    texts, corners, angle = fields_to_arrays(fields)
+    rect = _deskew(corners, angle)
+    order, line_ids = order_fields(rect)
+
+    ordered = list(map(texts.__getitem__, order.tolist()))
+    # 줄 번호가 바뀌는 위치에서 잘라 줄 단위로 합침
+    bounds = [0] + (np.flatnonzero(np.diff(line_ids)) + 1).tolist() + [len(ordered)]
+    joined = "\n".join(" ".join(ordered[a:b]) for a, b in zip(bounds, bounds[1:]))
+    return ordered, joined, order, rect, angle
+
+
+def reconstruct_page_layout(
+    fields: Sequence[Dict[str, Any]], offset: Tuple[float, float] = (0.0, 0.0)
+) -> Dict[str, Any]:
+    """
+    Clova 한 페이지(image)의 fields → {"text": 줄바꿈으로 구분된 텍스트, "geometry": 단어 좌표}.
+    geometry: 읽기 순서의 단어 박스와 text 안 위치 (service/ocr_geometry_service.py 형식).
+    offset: 박스 좌표에서 뺄 원점 (캔버스 안 영역의 왼쪽 위)
+    """
+    if not fields:
+        return {"text": "", "geometry": None}
+    ordered, joined, order, rect, angle = _ordered_text(fields)
+    text = joined.strip()
+
+    # 단어 사이 구분자(공백/줄바꿈)는 항상 1글자 → 길이 누적합으로 text 안 위치 계산 (strip된 앞부분만큼 이동)
+    lengths = np.fromiter(map(len, ordered), dtype=np.int64, count=len(ordered))
+    ends = np.cumsum(lengths + 1) - 1
+    lead = len(joined) - len(joined.lstrip())
+    spans = np.clip(np.stack([ends - lengths, ends], axis=1) - lead, 0, len(text))
+
+    boxes = _page_boxes(rect, angle)[:, order].T
+    boxes -= np.array([offset[0], offset[1], offset[0], offset[1]], dtype=np.float64)
+    return {"text": text, "geometry": encode_geometry(boxes, spans)}
+
+
+def reconstruct_page_text(fields: Sequence[Dict[str, Any]]) -> str:
+    """Clova 한 페이지(image)의 fields → 줄바꿈으로 구분된 텍스트 (geometry 계산 없음)"""
+    if not fields:
+        return ""
+    return _ordered_text(fields)[1].strip()
+
+
+def reconstruct_pages_layout(pages_fields: Sequence[Sequence[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Clova 응답의 페이지(image)별 fields 목록 → 페이지별 {"text", "geometry"} (CPU 프로세스 풀 작업 단위)"""
+    return [reconstruct_page_layout(fields) for fields in pages_fields]
+
+
+def split_fields_by_tiles(
+    fields: Sequence[Dict[str, Any]], tiles: Sequence[Sequence[float]]
+) -> List[List[Dict[str, Any]]]:
+    """
+    여러 영역을 이어 붙인 캔버스의 fields → 영역(tile)별 fields 목록.
+    필드 중심이 들어 있는 tile에 배정하고, 어느 tile에도 없으면(여백에 걸친 필드) 가장 가까운 tile에 배정.
+    tiles: 캔버스 좌표 [x1, y1, x2, y2] 목록
+    """
+    groups: List[List[Dict[str, Any]]] = [[] for _ in tiles]
+    if not fields or not tiles:
+        return groups
+    _, corners, _ = fields_to_arrays(fields)
+    centers = corners.mean(axis=1).T
+    boxes = np.asarray(tiles, dtype=np.float64)
+    # 중심점과 각 tile 사각형 사이 거리 (안에 있으면 0) → (N, T)
+    dx = np.maximum(np.maximum(boxes[None, :, 0] - centers[:, None, 0], centers[:, None, 0] - boxes[None, :, 2]), 0)
+    dy = np.maximum(np.maximum(boxes[None, :, 1] - centers[:, None, 1], centers[:, None, 1] - boxes[None, :, 3]), 0)
+    owner = np.argmin(np.hypot(dx, dy), axis=1)
+    for field, tile_index in zip(fields, owner.tolist()):
+        groups[tile_index].append(field)
+    return groups
+
+
+def reconstruct_regions_layout(
+    fields: Sequence[Dict[str, Any]], tiles: Sequence[Sequence[float]]
+) -> List[Dict[str, Any]]:
+    """캔버스 fields → 영역(tile)별 {"text", "geometry"} (좌표는 각 영역 왼쪽 위 기준, CPU 프로세스 풀 작업 단위)"""
+    return [
+        reconstruct_page_layout(group, offset=(tile[0], tile[1]))
+        for group, tile in zip(split_fields_by_tiles(fields, tiles), tiles)
+    ]
+
+
+def _legacy_page_text(fields: Sequence[Dict[str, Any]]) -> str:
+    """이전 구현 (첫 꼭짓점 y 정렬 + 15px 고정 임계값). 벤치마크 비교용."""
+    fields = sorted(fields, key=lambda x: x['boundingPoly']['vertices'][0]['y'])
+    lines, current_line = [], []
+    last_y = fields[0]['boundingPoly']['vertices'][0]['y']
+    for field in fields:
+        current_y = field['boundingPoly']['vertices'][0]['y']
+        if abs(current_y - last_y) > 15:
+            current_line.sort(key=lambda x: x['boundingPoly']['vertices'][0]['x'])
+            lines.append(current_line)
+            current_line = [field]
+            last_y = current_y
+        else:
+            current_line.append(field)
+    current_line.sort(key=lambda x: x['boundingPoly']['vertices'][0]['x'])
+    lines.append(current_line)
+    return "\n".join(" ".join(f.get('inferText', '') for f in line) for line in lines).strip()
+
+
+def _synthetic_page(lines: int = 120, words: int = 25) -> List[Dict[str, Any]]:
+    """벤치마크용 합성 페이지 (2단, 줄당 words개 단어, Clova 응답처럼 좌표는 float)"""
+    rng = np.random.default_rng(0)
+    fields = []
+    for col, col_x in enumerate((100, 1300)):
+        for line in range(lines):
+            y = float(100 + line * 40 + int(rng.integers(-3, 4)))
+            x = float(col_x)
+            for w in range(words // 2):
+                width = float(rng.integers(20, 60))
+                fields.append({
+                    "inferText": f"c{col}l{line}w{w}",
+                    "boundingPoly": {"vertices": [
+                        {"x": x, "y": y}, {"x": x + width, "y": y},
+                        {"x": x + width, "y": y + 30}, {"x": x, "y": y + 30},
+                    ]},
+                })
+                x += width + 10
+    rng.shuffle(fields)
+    return fields
+
+
+def _benchmark(fns: Dict[str, Any], pages: Sequence[Sequence[Dict[str, Any]]], repeat: int = 20) -> Dict[str, float]:
+    """
+    구현별 pages 전체 처리 시간의 최솟값(ms). 첫 1회는 준비 실행, 구현을 번갈아 측정하고
+    측정 중에는 GC 를 끔 (다른 작업·CPU 클럭 변화 잡음이 한쪽에만 몰리지 않게).
+    """
+    for fn in fns.values():
+        for page in pages:
+            fn(page)
+    best = {name: float("inf") for name in fns}
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            for name, fn in fns.items():
+                start = time.perf_counter()
+                for page in pages:
+                    fn(page)
+                best[name] = min(best[name], time.perf_counter() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return {name: seconds * 1000 for name, seconds in best.items()}
+
+
+if __name__ == "__main__":
+    pages = []
+    for path in sys.argv[1:]:
+        with open(path, encoding="utf-8") as f:
+            pages += [img.get("fields", []) for img in json.load(f).get("images", []) if img.get("fields")]
+    if not pages:
+        pages = [_synthetic_page() for _ in range(5)]
+
+    total_fields = sum(len(p) for p in pages)
+    results = _benchmark({
+        "legacy": _legacy_page_text,
+        "numpy": reconstruct_page_text,
+        "numpy+geometry": reconstruct_page_layout,
+    }, pages)
+    for name, ms in results.items():
+        print(f"{name:>14}: {len(pages)}페이지 / 필드 {total_fields}개 → {ms:.1f}ms")
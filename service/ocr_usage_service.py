@@ -1,9 +1,8 @@
 """회원별 Clova OCR 페이지 사용량 관리"""
 
-import io
 from typing import Tuple
 from core.database import supabase
-from pypdf import PdfReader
+from service.pdf_service import count_pdf_pages
 from app.security_app import get_current_user
 
 
@@ -12,12 +11,11 @@ OCR_PAGE_LIMIT = 50
 
 
 def estimate_page_count(file_bytes: bytes, filename: str) -> int:
-    """OCR 호출 전 페이지 수 추정 (PDF: pypdf, 이미지: 1)"""
+    """OCR 호출 전 페이지 수 추정 (PDF: 페이지 트리 /Count, 이미지: 1). file_bytes는 bytes 또는 mmap."""
     ext = (filename or "").split(".")[-1].lower() if "." in (filename or "") else ""
     if ext == "pdf":
         try:
-            reader = PdfReader(io.BytesIO(file_bytes), strict=False)
-            return len(reader.pages)
+            return count_pdf_pages(file_bytes)
         except Exception:
             return 1
     return 1
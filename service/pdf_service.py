@@ -0,0 +1,122 @@
+"""
+PDF 공통 처리 (pypdf).
+- 텍스트 레이어 추출: 슬라이드/워드 등에서 내보낸 PDF는 이미 글자를 갖고 있으므로 Clova 없이 로컬에서 추출.
+- 페이지 부분 PDF 생성: 이미지뿐인 페이지만 골라 Clova로 보낼 때, 사용자가 고른 페이지(pages/page_range)만 남길 때 사용.
+"""
+
+import io
+import os
+import re
+from typing import List, Optional, Sequence, Tuple
+
+from pypdf import PdfReader, PdfWriter
+
+from service.upload_service import as_stream
+
+PDF_TEXT_LAYER_ENABLED = (os.getenv("PDF_TEXT_LAYER_ENABLED", "1").strip().lower() in ("1", "true", "yes", "on"))
+# 텍스트 레이어로 인정할 최소 글자 수 (공백 제외)
+PDF_TEXT_LAYER_MIN_CHARS = int(os.getenv("PDF_TEXT_LAYER_MIN_CHARS", "20"))
+# 공백 제외 글자 중 한글/영문/숫자 비율 하한 (글꼴 매핑이 깨진 PDF의 의미 없는 문자열 걸러냄)
+PDF_TEXT_LAYER_MIN_READABLE = float(os.getenv("PDF_TEXT_LAYER_MIN_READABLE", "0.6"))
+
+_READABLE = re.compile(r"[0-9A-Za-z가-힣]")
+_CID = re.compile(r"\(cid:\d+\)")
+
+
+def is_pdf(filename: str) -> bool:
+    ext = (filename or "").split(".")[-1].lower() if "." in (filename or "") else ""
+    return ext == "pdf"
+
+
+def open_pdf(file_bytes) -> PdfReader:
+    """bytes 또는 mmap(스풀링된 업로드)으로 PdfReader 생성 — mmap은 복사 없이 그대로 읽음"""
+    return PdfReader(as_stream(file_bytes), strict=False)
+
+
+def count_pdf_pages(file_bytes) -> int:
+    """
+    페이지 수만 빠르게 계산: 상호 참조 테이블 → 트레일러 /Root → 페이지 트리 루트의 /Count 만 읽음.
+    (len(reader.pages)는 페이지 트리 전체를 펼치므로 /Count가 없거나 잘못된 경우에만 사용)
+    """
+    reader = open_pdf(file_bytes)
+    try:
+        count = int(reader.trailer["/Root"]["/Pages"]["/Count"])
+        if count > 0:
+            return count
+    except Exception:
+        pass
+    return len(reader.pages)
+
+
+def build_pdf(reader: PdfReader, page_indices: Sequence[int]) -> bytes:
+    """reader에서 page_indices(0부터) 페이지만 순서대로 담은 새 PDF bytes"""
+    writer = PdfWriter()
+    for idx in page_indices:
+        writer.add_page(reader.pages[idx])
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+def _usable_text(text: str) -> Optional[str]:
+    """추출 텍스트가 OCR 대신 쓸 만하면 정리된 텍스트, 아니면 None"""
+    if not text or _CID.search(text):
+        return None
+    compact = re.sub(r"\s+", "", text)
+    if len(compact) < PDF_TEXT_LAYER_MIN_CHARS:
+        return None
+    if len(_READABLE.findall(compact)) / len(compact) < PDF_TEXT_LAYER_MIN_READABLE:
+        return None
+    lines = [re.sub(r"[ \t]+", " ", line).strip() for line in text.splitlines()]
+    return "\n".join(line for line in lines if line)
+
+
+def extract_text_layer(reader: PdfReader) -> List[Optional[str]]:
+    """페이지별 텍스트 레이어. 쓸 만한 텍스트가 없는 페이지(스캔 이미지 등)는 None."""
+    texts: List[Optional[str]] = []
+    for idx, page in enumerate(reader.pages):
+        try:
+            texts.append(_usable_text(page.extract_text() or ""))
+        except Exception as e:
+            print(f"⚠️ PDF {idx + 1}페이지 텍스트 레이어 추출 실패: {e}")
+            texts.append(None)
+    return texts
+
+
+def parse_page_selection(spec: str, page_count: int) -> List[int]:
+    """
+    페이지 선택 문자열 → 0부터 시작하는 페이지 인덱스 (오름차순, 중복 제거).
+    형식: 1부터 시작, 쉼표 구분 — "3", "1-5", "8-"(끝까지), "-4"(처음부터). 예: "1-3,7,10-"
+    범위를 벗어나거나 형식이 잘못되면 ValueError.
+    """
+    selected = set()
+    for token in (spec or "").replace(" ", "").split(","):
+        if not token:
+            continue
+        try:
+            if "-" in token:
+                start, end = token.split("-", 1)
+                first = int(start) if start else 1
+                last = int(end) if end else page_count
+            else:
+                first = last = int(token)
+        except ValueError:
+            raise ValueError(f"페이지 선택 형식이 올바르지 않습니다: '{token}' (예: 1-3,5,8-)")
+        if first < 1 or last > page_count or first > last:
+            raise ValueError(f"선택한 페이지 '{token}'가 문서 범위(1~{page_count})를 벗어났습니다.")
+        selected.update(range(first - 1, last))
+    if not selected:
+        raise ValueError("선택한 페이지가 없습니다.")
+    return sorted(selected)
+
+
+def select_pages(file_bytes: bytes, spec: str) -> Tuple[bytes, List[int]]:
+    """
+    PDF에서 spec으로 고른 페이지만 남긴 (bytes, 0부터 시작하는 원본 페이지 인덱스) 반환.
+    전체 페이지를 고른 경우 원본 bytes를 그대로 반환.
+    """
+    reader = open_pdf(file_bytes)
+    indices = parse_page_selection(spec, len(reader.pages))
+    if len(indices) == len(reader.pages):
+        return file_bytes, indices
+    return build_pdf(reader, indices), indices
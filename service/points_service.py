@@ -0,0 +1,135 @@
+"""
+포인트 적립 (reward_history 이력 + users.points 잔액).
+- 기본: Postgres 함수 award_points (docs/sql/award_points.sql) 를 Supabase RPC 로 1회 호출
+  → 이력 INSERT 와 잔액 증가가 한 트랜잭션, 새 잔액 반환. 동시 요청에도 갱신 유실 없음.
+  함수 실행 권한은 service_role 에만 있으므로 SUPABASE_SERVICE_ROLE_KEY 클라이언트(supabase_service)로 호출.
+- 함수가 아직 없는 DB(PGRST202)면 기존 경로(잔액 조회 → 이력 INSERT → 업데이트)로 동작하고,
+  이후 호출은 바로 기존 경로 사용 (서버 재시작 시 다시 RPC 시도).
+- POINTS_RPC_ENABLED=0 이면 항상 기존 경로. 켜져 있는데 SUPABASE_SERVICE_ROLE_KEY 가 없으면 서버 시작 실패
+  (배포에서 키가 빠진 것을 기존 경로로 조용히 넘기지 않음).
+- 금액은 1 ~ POINTS_MAX_AWARD, 사용자(users 행)가 없으면 이력을 남기지 않고 PointsError.
+"""
+
+import os
+import threading
+from typing import Optional, Tuple
+
+from core.database import supabase, supabase_service
+
+POINTS_RPC_ENABLED = (os.getenv("POINTS_RPC_ENABLED", "1").strip().lower() in ("1", "true", "yes", "on"))
+# 한 번에 적립 가능한 최대 포인트 (docs/sql/award_points.sql 의 상한과 같아야 함)
+POINTS_MAX_AWARD = 1000
+
+# PointsError.code
+POINTS_ERROR_INVALID_AMOUNT = "invalid_amount"
+POINTS_ERROR_USER_NOT_FOUND = "user_not_found"
+
+_rpc_available = POINTS_RPC_ENABLED and supabase_service is not None
+_rpc_lock = threading.Lock()
+
+if POINTS_RPC_ENABLED and supabase_service is None:
+    raise RuntimeError(
+        "SUPABASE_SERVICE_ROLE_KEY가 설정되지 않았습니다 (award_points DB 함수 호출용). "
+        ".env / 배포 시크릿에 SUPABASE_SERVICE_ROLE_KEY=... 를 추가하거나, 기존 경로를 쓰려면 POINTS_RPC_ENABLED=0 으로 설정하세요."
+    )
+
+
+class PointsError(Exception):
+    """포인트 적립 실패. code: invalid_amount (금액 범위 밖) | user_not_found (users 행 없음)"""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+def points_error(e: Exception) -> Optional[PointsError]:
+    """award_points 가 올린 DB 오류(22023 금액, P0002 사용자 없음) → PointsError, 그 외 None"""
+    code = getattr(e, "code", None)
+    text = str(e)
+    if code == "P0002" or "P0002" in text:
+        return PointsError(POINTS_ERROR_USER_NOT_FOUND, "사용자 정보를 찾을 수 없습니다.")
+    if code == "22023" or "22023" in text:
+        return PointsError(POINTS_ERROR_INVALID_AMOUNT, "적립할 수 없는 포인트입니다.")
+    return None
+
+
+def check_amount(amount: int) -> None:
+    if not isinstance(amount, int) or isinstance(amount, bool) or not 1 <= amount <= POINTS_MAX_AWARD:
+        raise PointsError(POINTS_ERROR_INVALID_AMOUNT, f"적립 포인트는 1 ~ {POINTS_MAX_AWARD} 이어야 합니다. (요청 {amount})")
+
+
+def is_missing_rpc(e: Exception) -> bool:
+    """PostgREST 가 RPC 함수를 찾지 못한 오류인지 (함수 미배포)"""
+    code = getattr(e, "code", None)
+    text = str(e)
+    return code == "PGRST202" or "PGRST202" in text or "Could not find the function" in text
+
+
+def _disable_rpc(e: Exception) -> None:
+    global _rpc_available
+    with _rpc_lock:
+        if _rpc_available:
+            print(f"⚠️ award_points RPC 없음 → 기존 포인트 갱신 경로 사용 (docs/sql/award_points.sql 적용 필요): {e}")
+        _rpc_available = False
+
+
+def get_points(email: str) -> int:
+    res = supabase.table("users").select("points").eq("email", email).limit(1).execute()
+    if not res.data:
+        raise PointsError(POINTS_ERROR_USER_NOT_FOUND, "사용자 정보를 찾을 수 없습니다.")
+    return res.data[0].get("points") or 0
+
+
+def _award_points_legacy(email: str, amount: int, reason: str, once_since: Optional[str]) -> Tuple[bool, int]:
+    """기존 경로: 잔액 조회(사용자 확인) → (1일 1회 확인) → 이력 INSERT → 업데이트 (DB 왕복 3~4회, 동시 요청 시 갱신 유실 가능)"""
+    points = get_points(email)
+    if once_since is not None:
+        check_res = supabase.table("reward_history") \
+            .select("id") \
+            .eq("user_email", email) \
+            .eq("reason", reason) \
+            .gte("created_at", once_since) \
+            .limit(1) \
+            .execute()
+        if check_res.data:
+            return False, points
+
+    supabase.table("reward_history").insert({
+        "user_email": email,
+        "reward_amount": amount,
+        "reason": reason,
+    }).execute()
+    new_points = points + amount
+    supabase.table("users").update({"points": new_points}).eq("email", email).execute()
+    return True, new_points
+
+
+def award_points(email: str, amount: int, reason: str, once_since: Optional[str] = None) -> Tuple[bool, int]:
+    """
+    포인트 적립 → (적립 여부, 새 잔액).
+    once_since: ISO 시각. 그 시각부터 하루 안에 같은 reason 이력이 있으면 적립하지 않고 (False, 현재 잔액) (출석체크).
+    금액이 범위 밖이거나 사용자가 없으면 PointsError (이력·잔액 변경 없음).
+    """
+    check_amount(amount)
+    if _rpc_available:
+        try:
+            res = supabase_service.rpc("award_points", {
+                "p_email": email,
+                "p_amount": amount,
+                "p_reason": reason,
+                "p_once_since": once_since,
+            }).execute()
+            rows = res.data if isinstance(res.data, list) else [res.data] if res.data else []
+            if not rows:
+                raise PointsError(POINTS_ERROR_USER_NOT_FOUND, "사용자 정보를 찾을 수 없습니다.")
+            return bool(rows[0].get("awarded")), rows[0].get("points") or 0
+        except PointsError:
+            raise
+        except Exception as e:
+            mapped = points_error(e)
+            if mapped is not None:
+                raise mapped from e
+            if not is_missing_rpc(e):
+                raise
+            _disable_rpc(e)
+    return _award_points_legacy(email, amount, reason, once_since)
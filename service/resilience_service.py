@@ -0,0 +1,264 @@
+"""
+외부 API(Clova OCR, OpenAI) 호출 보호 계층.
+- 호출 마감: 시도마다 timeout = min(시도 제한, 남은 마감) — 느린 응답 하나가 요청·워커를 몇 분씩 잡지 않음.
+  호출한 쪽이 전체 마감의 남은 시간을 deadline 으로 넘기면 그 마감 안에서만 시도 (0 이하면 시도 없이 실패).
+- 재시도: 429·5xx·타임아웃·연결 오류만 지수 백오프 + full jitter 로 재시도 (마감 안에서만). 4xx 는 즉시 실패.
+- 헤징(선택): 첫 시도가 최근 지연 p95 를 넘기면 같은 요청을 한 번 더 보내 먼저 끝난 응답 사용 (비용이 2배가 될 수 있어 기본 꺼짐).
+- 서킷 브레이커: 연속 실패가 기준 이상이면 일정 시간 호출 없이 바로 CircuitOpenError → 장애 중에도 빠르게 대체 경로로.
+  열린 시간이 지나면 시험 호출 1건만 통과(half_open), 성공하면 닫힘.
+상태·지표는 GET /ocr/metrics 의 upstreams.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+# 재시도 대상 HTTP 상태
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+# 지연 기록이 이보다 적으면 헤징하지 않음
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+# 남은 마감이 이보다 짧으면 새 시도를 시작하지 않음
+MIN_ATTEMPT_SECONDS = 0.5
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+# 헤징 시도용 공유 스레드 (첫 시도 + 중복 시도)
+_hedge_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("UPSTREAM_HEDGE_WORKERS", "16")), thread_name_prefix="upstream-hedge"
+)
+
+
+class UpstreamError(Exception):
+    """외부 API 오류 응답 (status: HTTP 상태, 재시도 가능 여부는 retryable 로 판단)"""
+
+    def __init__(self, name: str, status: int, message: str = ""):
+        super().__init__(f"{name} 응답 오류 {status}: {message[:200]}")
+        self.status_code = status
+
+
+class CircuitOpenError(Exception):
+    """서킷 브레이커가 열려 있어 호출하지 않음"""
+
+
+class DeadlineExceededError(Exception):
+    """마감 안에 성공한 응답이 없음"""
+
+
+def retryable(e: BaseException) -> bool:
+    """429/5xx, 타임아웃, 연결 오류면 True (requests·openai 예외 모두 상태 코드/클래스 이름으로 판단)"""
+    status = getattr(e, "status_code", None)
+    if status is None:
+        status = getattr(getattr(e, "response", None), "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    name = type(e).__name__
+    return any(key in name for key in ("Timeout", "Connection")) or isinstance(e, (TimeoutError, ConnectionError))
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CIRCUIT_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opened_count = 0
+        self.short_circuited = 0
+        self._probe = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> None:
+        """호출 가능 여부 확인. 열려 있으면 CircuitOpenError (열린 시간이 지나면 시험 호출 1건만 허용)."""
+        with self._lock:
+            if self.state == CIRCUIT_OPEN and time.time() - self.opened_at >= self.reset_seconds:
+                self.state = CIRCUIT_HALF_OPEN
+                self._probe = False
+            if self.state == CIRCUIT_CLOSED:
+                return
+            if self.state == CIRCUIT_HALF_OPEN and not self._probe:
+                self._probe = True
+                return
+            self.short_circuited += 1
+            retry_in = max(0.0, self.reset_seconds - (time.time() - self.opened_at))
+        raise CircuitOpenError(f"외부 서비스 장애로 호출을 잠시 중단했습니다. ({retry_in:.0f}초 후 재시도)")
+
+    def success(self) -> None:
+        with self._lock:
+            self.state = CIRCUIT_CLOSED
+            self.failures = 0
+            self._probe = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == CIRCUIT_HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != CIRCUIT_OPEN:
+                    self.opened_count += 1
+                    print(f"🚧 서킷 브레이커 열림 (연속 실패 {self.failures}회, {self.reset_seconds:.0f}초)")
+                self.state = CIRCUIT_OPEN
+                self.opened_at = time.time()
+                self._probe = False
+
+    def release(self) -> None:
+        """시험 호출이 서킷과 무관한 이유(4xx 등)로 끝나면 다음 시험 호출 허용"""
+        with self._lock:
+            self._probe = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "opened": self.opened_count,
+                "short_circuited": self.short_circuited,
+                "open_seconds_left": (
+                    round(max(0.0, self.reset_seconds - (time.time() - self.opened_at)), 1)
+                    if self.state == CIRCUIT_OPEN else 0.0
+                ),
+            }
+
+
+class Upstream:
+    """외부 API 하나의 호출 정책 (시도 제한·전체 마감·재시도·헤징·서킷 브레이커)"""
+
+    def __init__(self, name: str, timeout: float, deadline: float):
+        # 환경변수: {NAME}_TIMEOUT_SECONDS, {NAME}_DEADLINE_SECONDS, {NAME}_RETRIES, {NAME}_HEDGE, {NAME}_BREAKER_FAILURES …
+        prefix = f"{name.upper()}_"
+        self.name = name
+        self.attempt_timeout = float(os.getenv(f"{prefix}TIMEOUT_SECONDS", str(timeout)))
+        self.deadline_seconds = float(os.getenv(f"{prefix}DEADLINE_SECONDS", str(deadline)))
+        self.retries = max(0, int(os.getenv(f"{prefix}RETRIES", "2")))
+        self.backoff_base = float(os.getenv(f"{prefix}BACKOFF_SECONDS", "0.5"))
+        self.backoff_max = float(os.getenv(f"{prefix}BACKOFF_MAX_SECONDS", "8"))
+        self.hedge = (os.getenv(f"{prefix}HEDGE", "0").strip().lower() in ("1", "true", "yes", "on"))
+        self.breaker = CircuitBreaker(
+            failure_threshold=max(1, int(os.getenv(f"{prefix}BREAKER_FAILURES", "5"))),
+            reset_seconds=float(os.getenv(f"{prefix}BREAKER_RESET_SECONDS", "30")),
+        )
+        self._latency: deque = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "attempts": 0, "retries": 0, "hedged": 0, "hedge_wins": 0, "failures": 0, "deadline_exceeded": 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            samples = list(self._latency)
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return float(np.percentile(samples, 95))
+
+    def _timed(self, fn: Callable[[float], Any], timeout: float) -> Any:
+        started = time.perf_counter()
+        result = fn(timeout)
+        with self._lock:
+            self._latency.append(time.perf_counter() - started)
+        return result
+
+    def _attempt(self, fn: Callable[[float], Any], timeout: float, hedge_after: Optional[float]) -> Any:
+        """시도 1회. 헤징이 켜져 있고 hedge_after 안에 끝나지 않으면 중복 요청 후 먼저 성공한 결과 사용."""
+        if not self.hedge or hedge_after is None or hedge_after >= timeout:
+            return self._timed(fn, timeout)
+        first = _hedge_executor.submit(self._timed, fn, timeout)
+        done, _ = wait([first], timeout=hedge_after)
+        if done:
+            return first.result()
+        self._count("hedged")
+        second = _hedge_executor.submit(self._timed, fn, timeout - hedge_after)
+        pending = {first, second}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def call(
+        self,
+        fn: Callable[[float], Any],
+        deadline: Optional[float] = None,
+        hedge_after: Optional[float] = None,
+    ) -> Any:
+        """
+        fn(timeout) 을 보호 정책으로 실행. fn 은 한 번 요청하고 결과를 반환하거나 예외를 던짐
+        (재시도할 응답은 UpstreamError 등 status_code 가 있는 예외로).
+        deadline: 이번 호출에 쓸 수 있는 최대 시간(초, 없으면 DEADLINE_SECONDS). 호출한 쪽 전체 마감의 남은 시간을
+          넘기면 여러 단계(묶음 재시도 등)에 걸쳐도 전체 시간이 그 마감을 넘지 않음. 0 이하면 시도 없이 바로 실패.
+        hedge_after: 헤징 지연(초, 없으면 최근 지연 p95).
+        실패: CircuitOpenError / DeadlineExceededError / 마지막 시도의 예외.
+        """
+        self._count("calls")
+        budget = self.deadline_seconds if deadline is None else min(deadline, self.deadline_seconds)
+        if budget <= 0:
+            self._count("deadline_exceeded")
+            raise DeadlineExceededError(f"{self.name} 호출 마감이 이미 지났습니다.")
+        ends = time.time() + budget
+        attempt = 0
+        while True:
+            self.breaker.allow()
+            # 시도 제한은 남은 마감 이하 (마감보다 길게 늘리지 않음)
+            timeout = min(self.attempt_timeout, ends - time.time())
+            if timeout <= 0:
+                self._count("failures")
+                self._count("deadline_exceeded")
+                raise DeadlineExceededError(f"{self.name} 응답 마감({budget:.0f}초) 초과")
+            self._count("attempts")
+            try:
+                result = self._attempt(fn, timeout, hedge_after if hedge_after is not None else self.p95())
+            except Exception as e:
+                if not retryable(e):
+                    self.breaker.release()
+                    raise
+                self.breaker.failure()
+                if attempt >= self.retries:
+                    self._count("failures")
+                    raise
+                backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+                if ends - time.time() - backoff < MIN_ATTEMPT_SECONDS:
+                    self._count("failures")
+                    self._count("deadline_exceeded")
+                    raise DeadlineExceededError(f"{self.name} 응답 마감({budget:.0f}초) 초과: {e}") from e
+                attempt += 1
+                self._count("retries")
+                print(f"🔁 {self.name} 재시도 {attempt}/{self.retries} ({backoff:.2f}초 후): {e}")
+                time.sleep(backoff)
+                continue
+            self.breaker.success()
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.p95()
+        with self._lock:
+            stats = dict(self._stats)
+        return {
+            **stats,
+            "circuit": self.breaker.snapshot(),
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "timeout_seconds": self.attempt_timeout,
+            "deadline_seconds": self.deadline_seconds,
+            "hedge": self.hedge,
+        }
+
+
+# Clova: 긴 PDF 묶음(CLOVA_PDF_CHUNK_PAGES)도 한 시도 안에 끝나는 시간, OpenAI: 키워드 응답 기준
+clova_upstream = Upstream("clova", timeout=60, deadline=120)
+openai_upstream = Upstream("openai", timeout=30, deadline=60)
+
+
+def get_upstream_stats() -> Dict[str, Any]:
+    return {upstream.name: upstream.stats() for upstream in (clova_upstream, openai_upstream)}
@@ -0,0 +1,102 @@
+"""
+채점 결과 저장 (POST /study/grade).
+- 기본: Postgres 함수 record_study_session (docs/sql/record_study_session.sql) 을 Supabase RPC 로 1회 호출
+  → ocr_data INSERT + study_logs INSERT + 포인트 적립(award_points)이 한 트랜잭션, 새 퀴즈 id·포인트 잔액 반환.
+  함수 실행 권한은 service_role 에만 있으므로 SUPABASE_SERVICE_ROLE_KEY 클라이언트(supabase_service)로 호출.
+- 함수가 아직 없는 DB(PGRST202)면 None 반환 → study_app 의 기존 단계별 저장 경로 사용 (이후 호출도 바로 기존 경로).
+- STUDY_SESSION_RPC_ENABLED=0 이면 항상 기존 경로. 켜져 있는데 SUPABASE_SERVICE_ROLE_KEY 가 없으면 서버 시작 실패.
+- 점수·리워드는 호출 전(check_score)과 DB 함수 안에서 모두 검증: 0 <= 정답 수 <= 문제 수, 리워드 = 정답 수 * STUDY_REWARD_PER_CORRECT.
+"""
+
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from core.database import supabase_service
+from service.activity_service import KST
+from service.points_service import is_missing_rpc, points_error
+
+STUDY_SESSION_RPC_ENABLED = (os.getenv("STUDY_SESSION_RPC_ENABLED", "1").strip().lower() in ("1", "true", "yes", "on"))
+# 정답 1개당 리워드 (docs/sql/record_study_session.sql 검증과 같아야 함)
+STUDY_REWARD_PER_CORRECT = 2
+
+STUDY_SESSION_ERROR_INVALID_SCORE = "invalid_score"
+
+_rpc_available = STUDY_SESSION_RPC_ENABLED and supabase_service is not None
+_rpc_lock = threading.Lock()
+
+if STUDY_SESSION_RPC_ENABLED and supabase_service is None:
+    raise RuntimeError(
+        "SUPABASE_SERVICE_ROLE_KEY가 설정되지 않았습니다 (record_study_session DB 함수 호출용). "
+        ".env / 배포 시크릿에 SUPABASE_SERVICE_ROLE_KEY=... 를 추가하거나, 기존 경로를 쓰려면 STUDY_SESSION_RPC_ENABLED=0 으로 설정하세요."
+    )
+
+
+class StudySessionError(Exception):
+    """채점 저장 거부. code: invalid_score (정답 수·문제 수·리워드 불일치)"""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+def check_score(correct_count: int, question_count: int, reward_amount: int) -> None:
+    """0 <= 정답 수 <= 문제 수, 리워드 = 정답 수 * STUDY_REWARD_PER_CORRECT 가 아니면 StudySessionError"""
+    if not 0 <= correct_count <= question_count or question_count < 1:
+        raise StudySessionError(
+            STUDY_SESSION_ERROR_INVALID_SCORE, f"정답 수가 올바르지 않습니다. ({correct_count} / {question_count})"
+        )
+    if reward_amount != correct_count * STUDY_REWARD_PER_CORRECT:
+        raise StudySessionError(STUDY_SESSION_ERROR_INVALID_SCORE, f"리워드가 정답 수와 맞지 않습니다. ({reward_amount})")
+
+
+def record_study_session(
+    email: str,
+    row: Dict[str, Any],
+    correct_count: int,
+    question_count: int,
+    reward_amount: int,
+    reason: str,
+) -> Optional[Dict[str, Any]]:
+    """
+    row: ocr_data 에 넣을 값 (subject_name, study_name, user_answers, answers, ocr_text, quiz_html).
+    반환: {"quiz_id", "points"} (reward_amount 가 0이면 points 는 None), RPC 를 쓸 수 없으면 None.
+    점수·리워드가 맞지 않으면 StudySessionError, 사용자가 없으면 PointsError (DB 함수는 전부 롤백).
+    """
+    global _rpc_available
+    check_score(correct_count, question_count, reward_amount)
+    if not _rpc_available:
+        return None
+    try:
+        res = supabase_service.rpc("record_study_session", {
+            "p_email": email,
+            "p_subject_name": row["subject_name"],
+            "p_study_name": row["study_name"],
+            "p_user_answers": row["user_answers"],
+            "p_answers": row["answers"],
+            "p_ocr_text": row["ocr_text"],
+            "p_quiz_html": row["quiz_html"],
+            "p_correct_count": correct_count,
+            "p_question_count": question_count,
+            "p_reward_amount": reward_amount,
+            "p_reason": reason,
+            "p_completed_at": datetime.now(KST).isoformat(),
+        }).execute()
+    except Exception as e:
+        if "invalid score" in str(e) or "invalid reward" in str(e):
+            raise StudySessionError(STUDY_SESSION_ERROR_INVALID_SCORE, "채점 결과가 올바르지 않습니다.") from e
+        mapped = points_error(e)
+        if mapped is not None:
+            raise mapped from e
+        if not is_missing_rpc(e):
+            raise
+        with _rpc_lock:
+            if _rpc_available:
+                print(f"⚠️ record_study_session RPC 없음 → 기존 채점 저장 경로 사용 (docs/sql/record_study_session.sql 적용 필요): {e}")
+            _rpc_available = False
+        return None
+    rows = res.data if isinstance(res.data, list) else [res.data] if res.data else []
+    if not rows:
+        raise RuntimeError("record_study_session 결과가 비어 있습니다.")
+    return {"quiz_id": rows[0].get("quiz_id"), "points": rows[0].get("points")}
@@ -0,0 +1,214 @@
+"""
+업로드 파일 스풀링 (메모리 상한).
+- UploadFile을 청크 단위로 임시 파일에 복사하면서 UPLOAD_MAX_BYTES 초과 시 즉시 중단 (413).
+- 복사한 파일은 mmap으로 열어 pypdf·Pillow에 넘김 → 업로드 전체를 bytes로 들고 있지 않음.
+  (mmap은 len/슬라이스/hashlib를 지원하고 read/seek가 있어 PdfReader·Image.open에 그대로 전달 가능)
+- mmap을 CPU 프로세스 풀(service/compute_service.py)로 넘기면 내용 대신 파일 경로만 pickle 되어 작업 프로세스에서 다시 매핑.
+- 요청별 RSS(상주 메모리) 증가량과 프로세스 최대 RSS를 집계해 GET /ocr/metrics 로 노출 (워커 수 산정용).
+"""
+
+import io
+import mmap
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+# 비우면 시스템 임시 디렉터리
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR", "").strip() or None
+
+_MB = 1024 * 1024
+_stats = {
+    "uploads": 0,
+    "rejected": 0,
+    "bytes": 0,
+    "max_upload_bytes": 0,
+    "max_request_rss_growth_mb": 0.0,
+    "max_request_peak_rss_mb": 0.0,
+}
+_stats_lock = threading.Lock()
+
+
+class UploadTooLargeError(Exception):
+    """업로드가 UPLOAD_MAX_BYTES를 넘음 (HTTP 413)"""
+
+
+def current_rss_mb() -> Optional[float]:
+    """현재 프로세스 RSS (MB). /proc 이 없는 환경이면 None."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / _MB
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """프로세스 시작 이후 최대 RSS (MB)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux는 KB, macOS는 bytes 단위
+    return peak / _MB if sys.platform == "darwin" else peak / 1024
+
+
+def as_stream(data) -> Any:
+    """bytes면 BytesIO로 감싸고, mmap 등 파일 객체는 처음 위치로 되돌려 그대로 반환 (pypdf·Pillow 입력용)"""
+    if hasattr(data, "read"):
+        data.seek(0)
+        return data
+    return io.BytesIO(data)
+
+
+class MappedUpload(mmap.mmap):
+    """스풀링된 업로드의 읽기 전용 mmap. pickle 시 경로만 전달 (작업 프로세스에서 _remap으로 다시 매핑)."""
+
+    path = ""
+
+    def __reduce__(self):
+        return (_remap, (self.path,))
+
+
+def _remap(path: str) -> MappedUpload:
+    with open(path, "rb") as f:
+        mapped = MappedUpload(f.fileno(), 0, access=mmap.ACCESS_READ)
+    mapped.path = path
+    return mapped
+
+
+class SpooledUpload:
+    """임시 파일에 스풀링된 업로드. open_map()으로 읽기 전용 mmap을 얻고, 끝나면 close()."""
+
+    def __init__(self, filename: str, path: str, size: int):
+        self.filename = filename
+        self.path = path
+        self.size = size
+        self._maps: List[MappedUpload] = []
+        self._file = open(path, "rb")
+        self._started = time.time()
+        self._rss_start = current_rss_mb()
+        self._peak_start = peak_rss_mb()
+        self._closed = False
+
+    def open_map(self):
+        """
+        읽기 전용 mmap (호출마다 읽기 위치가 독립적인 새 매핑, 페이지 캐시는 공유).
+        빈 파일은 mmap이 불가능하므로 b"" 반환.
+        """
+        if self.size == 0:
+            return b""
+        mapped = MappedUpload(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        mapped.path = self.path
+        self._maps.append(mapped)
+        return mapped
+
+    def close(self) -> Dict[str, Any]:
+        """mmap·임시 파일 정리 후 요청 메모리 지표 기록/반환 (여러 번 호출해도 안전)"""
+        if self._closed:
+            return {}
+        self._closed = True
+        for mapped in self._maps:
+            try:
+                mapped.close()
+            except BufferError:
+                # 아직 참조 중인 memoryview가 있으면 GC 시 해제
+                pass
+        self._file.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            # Windows는 매핑이 남아 있으면 삭제 불가 → 임시 디렉터리 정리에 맡김
+            pass
+        return _record_request(self)
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _record_request(upload: SpooledUpload) -> Dict[str, Any]:
+    """
+    요청 메모리 지표: RSS 증가량(종료 - 시작)과 요청 중 최대 RSS.
+    요청 중 최대 RSS는 프로세스 최대 RSS가 이 요청 동안 올랐으면 그 값, 아니면 시작/종료 RSS 중 큰 값.
+    (프로세스 단위 측정이므로 동시 요청이 있으면 서로의 사용량이 섞임)
+    """
+    rss_end = current_rss_mb()
+    peak_end = peak_rss_mb()
+    growth = (rss_end - upload._rss_start) if rss_end is not None and upload._rss_start is not None else None
+    if peak_end is not None and upload._peak_start is not None and peak_end > upload._peak_start:
+        request_peak = peak_end
+    else:
+        request_peak = max((v for v in (upload._rss_start, rss_end) if v is not None), default=None)
+
+    with _stats_lock:
+        if growth is not None:
+            _stats["max_request_rss_growth_mb"] = max(_stats["max_request_rss_growth_mb"], round(growth, 1))
+        if request_peak is not None:
+            _stats["max_request_peak_rss_mb"] = max(_stats["max_request_peak_rss_mb"], round(request_peak, 1))
+
+    info = {
+        "upload_bytes": upload.size,
+        "rss_growth_mb": round(growth, 1) if growth is not None else None,
+        "peak_rss_mb": round(request_peak, 1) if request_peak is not None else None,
+        "duration": round(time.time() - upload._started, 2),
+    }
+    print(f"📈 업로드 처리 메모리: {upload.filename} {upload.size} bytes, RSS 증가 {info['rss_growth_mb']}MB, 최대 RSS {info['peak_rss_mb']}MB")
+    return info
+
+
+async def spool_upload(file, max_bytes: int = UPLOAD_MAX_BYTES) -> SpooledUpload:
+    """
+    UploadFile → 임시 파일 (UPLOAD_CHUNK_BYTES 단위 복사). max_bytes 초과 시 UploadTooLargeError.
+    반환된 SpooledUpload는 호출 측에서 close() 해야 함.
+    """
+    filename = file.filename or "image.jpg"
+    suffix = os.path.splitext(filename)[1][:10]
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=suffix, dir=UPLOAD_SPOOL_DIR)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(
+                        f"파일이 너무 큽니다. 최대 {max_bytes // _MB}MB까지 업로드할 수 있습니다."
+                    )
+                out.write(chunk)
+    except BaseException as e:
+        os.remove(path)
+        if isinstance(e, UploadTooLargeError):
+            with _stats_lock:
+                _stats["rejected"] += 1
+        raise
+
+    with _stats_lock:
+        _stats["uploads"] += 1
+        _stats["bytes"] += size
+        _stats["max_upload_bytes"] = max(_stats["max_upload_bytes"], size)
+    return SpooledUpload(filename, path, size)
+
+
+def get_upload_stats() -> Dict[str, Any]:
+    """누적 업로드·메모리 지표"""
+    rss, peak = current_rss_mb(), peak_rss_mb()
+    with _stats_lock:
+        return {
+            **_stats,
+            "max_bytes": UPLOAD_MAX_BYTES,
+            "rss_mb": round(rss, 1) if rss is not None else None,
+            "peak_rss_mb": round(peak, 1) if peak is not None else None,
+        }
@@ -0,0 +1,19 @@
+"""
+테스트 공통 설정.
+core.database 는 import 시 Supabase 클라이언트를 만들고 접속 테스트를 하므로,
+DB 없이 서비스 로직만 검증하도록 가짜 모듈로 대체 (필요한 테스트는 supabase 속성을 monkeypatch).
+"""
+
+import os
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+if "core.database" not in sys.modules:
+    fake_database = types.ModuleType("core.database")
+    fake_database.supabase = None
+    fake_database.supabase_service = None
+    sys.modules["core.database"] = fake_database
@@ -0,0 +1,108 @@
+from datetime import date, datetime, timezone
+
+from service.activity_service import (
+    KST,
+    bitmap_count,
+    bitmap_days,
+    bitmap_streak,
+    kst_date,
+    kst_midnight,
+    streak_from_bitmaps,
+)
+
+
+def _mask(*days):
+    mask = 0
+    for day in days:
+        mask |= 1 << (day - date(day.year, 1, 1)).days
+    return mask
+
+
+def test_bitmap_days_and_count():
+    mask = _mask(date(2026, 1, 1), date(2026, 3, 2), date(2026, 3, 4))
+    assert bitmap_days(mask, 2026) == [date(2026, 1, 1), date(2026, 3, 2), date(2026, 3, 4)]
+    assert bitmap_count(mask, 2026, date(2026, 3, 1), date(2026, 3, 5)) == 2
+    assert bitmap_count(mask, 2026, date(2026, 3, 5), date(2026, 3, 5)) == 0
+
+
+def test_bitmap_streak():
+    mask = _mask(date(2026, 5, 1), date(2026, 5, 3), date(2026, 5, 4), date(2026, 5, 5))
+    assert bitmap_streak(mask, date(2026, 5, 5)) == 3
+    assert bitmap_streak(mask, date(2026, 5, 2)) == 0
+    assert bitmap_streak(mask, date(2026, 5, 1)) == 1
+
+
+def test_streak_from_bitmaps_continues_into_previous_year():
+    bitmaps = {
+        2026: {"study": _mask(date(2026, 1, 1), date(2026, 1, 2)), "attendance": 0},
+        2025: {"study": _mask(date(2025, 12, 29), date(2025, 12, 30), date(2025, 12, 31)), "attendance": 0},
+    }
+    assert streak_from_bitmaps(bitmaps, date(2026, 1, 2)) == 5
+    assert streak_from_bitmaps(bitmaps, date(2026, 1, 3)) == 0
+
+
+def test_streak_from_bitmaps_without_previous_year_row():
+    bitmaps = {2026: {"study": _mask(date(2026, 1, 1)), "attendance": 0}}
+    assert streak_from_bitmaps(bitmaps, date(2026, 1, 1)) == 1
+    assert streak_from_bitmaps({}, date(2026, 6, 1)) == 0
+
+
+def test_streak_from_bitmaps_leap_year_end():
+    # 2024 는 윤년 (12월 31일 = 366번째 날)
+    bitmaps = {
+        2025: {"study": _mask(date(2025, 1, 1))},
+        2024: {"study": _mask(date(2024, 12, 31))},
+    }
+    assert streak_from_bitmaps(bitmaps, date(2025, 1, 1)) == 2
+
+
+def test_kst_date_and_midnight():
+    # UTC 15시 = KST 다음 날 0시
+    assert kst_date("2026-03-01T15:00:00+00:00") == date(2026, 3, 2)
+    assert kst_date("2026-03-01T14:59:59Z") == date(2026, 3, 1)
+    assert kst_date(datetime(2026, 3, 1, 23, 0, tzinfo=KST)) == date(2026, 3, 1)
+    assert kst_midnight(date(2026, 3, 2)) == "2026-03-02T00:00:00+09:00"
+    written = datetime.now(KST).isoformat()
+    assert datetime.fromisoformat(written).utcoffset() == KST.utcoffset(None)
+    assert kst_date(datetime(2026, 3, 1, 15, 0, tzinfo=timezone.utc)) == date(2026, 3, 2)
+
+
+class _FakeQuery:
+    def __init__(self, table, calls, rows, error=None):
+        self.table, self.calls, self.rows, self.error = table, calls, rows, error
+
+    def __getattr__(self, name):
+        def method(*args):
+            self.calls.append((self.table, name, args))
+            return self
+        return method
+
+    def execute(self):
+        if self.error is not None:
+            raise self.error
+        return type("Response", (), {"data": self.rows})()
+
+
+def test_get_weekly_activity_reads_one_row_per_week(monkeypatch):
+    from service import activity_service
+
+    calls = []
+    rows = [{"week_start": "2026-03-02", "study_count": 2, "correct_sum": 7, "question_sum": 10, "attendance_mask": 5}]
+    fake = type("Client", (), {"table": lambda self, name: _FakeQuery(name, calls, rows)})()
+    monkeypatch.setattr(activity_service, "supabase", fake)
+    monkeypatch.setattr(activity_service, "_missing_tables", set())
+
+    weekly = activity_service.get_weekly_activity("a@x.com", date(2026, 2, 23), date(2026, 3, 9))
+    assert weekly == {"2026-03-02": rows[0]}
+    assert ("user_weekly_activity", "gte", ("week_start", "2026-02-23")) in calls
+    assert ("user_weekly_activity", "lt", ("week_start", "2026-03-09")) in calls
+
+
+def test_get_weekly_activity_missing_table_returns_none(monkeypatch):
+    from service import activity_service
+
+    error = Exception('relation "public.user_weekly_activity" does not exist (42P01)')
+    fake = type("Client", (), {"table": lambda self, name: _FakeQuery(name, [], [], error)})()
+    monkeypatch.setattr(activity_service, "supabase", fake)
+    monkeypatch.setattr(activity_service, "_missing_tables", set())
+    assert activity_service.get_weekly_activity("a@x.com", date(2026, 2, 23), date(2026, 3, 9)) is None
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from service import clova_ocr_service
+from service.clova_ocr_service import (
+    KEYWORD_MODE_BATCH,
+    KEYWORD_SOURCE_EMPTY,
+    KEYWORD_SOURCE_GPT,
+    KEYWORD_SOURCE_LOCAL,
+    CLOVAOCRService,
+)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(clova_ocr_service, "keyword_cache", None)
+    svc = CLOVAOCRService("test-key", keyword_mode=KEYWORD_MODE_BATCH)
+    svc.keyword_budget_seconds = 0
+    return svc
+
+
+def test_parse_batch_keywords_skips_missing_invalid_and_empty_pages():
+    content = json.dumps({"pages": {"0": ["광합성", " 엽록체 "], "1": "광합성", "2": [], "4": ["세포", 3]}})
+    assert CLOVAOCRService._parse_batch_keywords(content, [0, 1, 2, 3, 4]) == {0: ["광합성", "엽록체"]}
+
+
+def test_parse_batch_keywords_requires_pages_object():
+    with pytest.raises(ValueError):
+        CLOVAOCRService._parse_batch_keywords(json.dumps({"0": ["광합성"]}), [0])
+
+
+def test_batch_missing_page_falls_back_to_local(service, monkeypatch):
+    call = {"keyword_model": "m", "keyword_ms": 1.0}
+    monkeypatch.setattr(
+        service, "_chat_keywords", lambda *a, **k: (json.dumps({"pages": {"0": ["광합성"]}}), call)
+    )
+    pages = ["광합성은 빛 에너지를 이용한다", "세포 호흡은 미토콘드리아에서 일어난다", ""]
+    results = {idx: (keywords, meta) for idx, keywords, meta in service.iter_keywords(pages)}
+
+    assert results[0] == (["광합성"], {"keyword_source": KEYWORD_SOURCE_GPT, **call})
+    # 응답에서 빠진 페이지는 빈 GPT 결과가 아니라 로컬 추출로 표시
+    keywords, meta = results[1]
+    assert meta == {"keyword_source": KEYWORD_SOURCE_LOCAL}
+    assert "미토콘드리아" in keywords
+    # 텍스트가 없는 페이지는 GPT 로 보내지 않고 empty
+    assert results[2] == ([], {"keyword_source": KEYWORD_SOURCE_EMPTY})
+
+
+def test_batch_request_failure_retries_each_page(service, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    retried = []
+    monkeypatch.setattr(service, "_chat_keywords", fail)
+    monkeypatch.setattr(
+        service, "_extract_page_keywords", lambda idx, text, remaining=None: retried.append(idx) or (["단어"], {})
+    )
+    results = service._extract_batch_keywords([0, 1], ["가나다 라마바", "사아자 차카타"])
+    assert retried == [0, 1]
+    assert results == {0: (["단어"], {}), 1: (["단어"], {})}
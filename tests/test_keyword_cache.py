@@ -0,0 +1,41 @@
+from service.keyword_cache_service import KeywordCache, keywords_in_text, normalize_text
+
+PAGE = (
+    "광합성은 식물이 빛 에너지를 이용해 이산화탄소와 물로 포도당을 만드는 과정이다. "
+    "엽록체의 틸라코이드에서 명반응이, 스트로마에서 캘빈 회로가 일어난다."
+)
+
+
+def test_exact_hit_returns_stored_keywords():
+    cache = KeywordCache()
+    cache.put(PAGE, "v1", ["광합성", "엽록체"])
+    assert cache.get(PAGE, "v1") == ["광합성", "엽록체"]
+    assert cache.get(PAGE, "v2") is None
+
+
+def test_near_hit_keeps_only_keywords_present_in_new_text():
+    cache = KeywordCache(min_similarity=0.5)
+    keywords = ["광합성", "엽록체", "틸라코이드", "스트로마", "캘빈 회로"]
+    cache.put(PAGE, "v1", keywords)
+
+    # OCR 오차로 띄어쓰기만 달라진 페이지 → 그대로 적중
+    assert cache.get(PAGE.replace("캘빈 회로", "캘빈회로"), "v1") == keywords
+
+    # 한 키워드가 OCR 오류로 바뀐 페이지 → 그 키워드는 빼고 반환 (4/5 남음)
+    changed = PAGE.replace("틸라코이드", "틸라코이트")
+    assert cache.get(changed, "v1") == ["광합성", "엽록체", "스트로마", "캘빈 회로"]
+    assert cache.stats()["near_hits"] == 2
+
+
+def test_near_hit_with_too_few_keywords_left_is_a_miss():
+    cache = KeywordCache(min_similarity=0.5)
+    cache.put(PAGE, "v1", ["광합성", "틸라코이드", "스트로마"])
+    changed = PAGE.replace("틸라코이드", "그라나").replace("스트로마", "기질")
+    assert cache.get(changed, "v1") is None
+    stats = cache.stats()
+    assert stats["near_rejected"] == 1 and stats["misses"] == 1
+
+
+def test_keywords_in_text_ignores_spacing_and_case():
+    normalized = normalize_text("DNA 복제는 세포 주기의 S기에 일어난다")
+    assert keywords_in_text(["dna", "세포주기", "RNA"], normalized) == ["dna", "세포주기"]
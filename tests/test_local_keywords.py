@@ -0,0 +1,39 @@
+import pytest
+
+from service.local_keyword_service import _strip_josa, candidate_terms
+
+
+@pytest.mark.parametrize("word, stem", [
+    ("광합성은", "광합성"),
+    ("엽록체에서", "엽록체"),
+    ("물에서", "물"),
+    ("땅으로", "땅"),
+    ("빛과", "빛"),
+    ("힘이", "힘"),
+    ("국가", "국가"),
+    ("사과", "사과"),
+    ("나이", "나이"),
+    ("경로", "경로"),
+])
+def test_strip_josa(word, stem):
+    assert _strip_josa(word) == stem
+
+
+def test_one_syllable_nouns_with_josa_are_not_candidates():
+    assert candidate_terms("힘의 방향 땅에 물도 빛만 물로 힘이 빛과 강은 물에서 땅으로") == ["방향"]
+
+
+def test_two_syllable_nouns_kept_when_seen_with_josa():
+    text = "온도가 오르면 온도 변화가 생긴다. 도로에 차가 많으면 도로 위 속도가 줄어 속도 제한을 둔다."
+    terms = candidate_terms(text)
+    assert terms.count("온도") == 2 and terms.count("도로") == 2 and terms.count("속도") == 2
+    assert "차가" not in terms and "생긴다" not in terms
+
+
+def test_nouns_ending_in_da_are_kept_but_predicates_dropped():
+    text = "캐나다의 바다는 넓다. 빙하가 녹으면 해수면이 높아졌다. 기온이 크다 다르다 나타나다 일어난다 이동했다"
+    assert candidate_terms(text) == ["캐나다", "바다", "빙하", "해수면", "기온"]
+
+
+def test_english_and_numbers():
+    assert candidate_terms("DNA 복제는 1953년 the Watson 모델로 3 설명") == ["DNA", "복제", "1953", "Watson", "모델", "설명"]
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from service import ocr_geometry_service
+from service.ocr_geometry_service import (
+    GeometryStore,
+    attach_geometry,
+    encode_geometry,
+    sign_geometry,
+    text_in_rect,
+    verify_geometry,
+)
+
+TEXT = "광합성 은\n엽록체 에서"
+
+
+@pytest.fixture
+def geometry():
+    boxes = np.array([[0, 0, 60, 30], [70, 0, 100, 30], [0, 40, 60, 70], [70, 40, 120, 70]])
+    spans = np.array([[0, 3], [4, 5], [6, 9], [10, 13]])
+    return {**encode_geometry(boxes, spans), "origin": [10, 20], "scale": 0.5, "rotated": False}
+
+
+@pytest.fixture(autouse=True)
+def secret(monkeypatch):
+    monkeypatch.setattr(ocr_geometry_service, "OCR_GEOMETRY_SECRET", "test-secret")
+
+
+def test_text_in_rect_original_space(geometry):
+    # 원본 좌표 = origin + 박스 / scale → 첫 줄 두 단어는 (10, 20) ~ (210, 80)
+    found = text_in_rect(TEXT, geometry, (10, 20, 200, 60))
+    assert found["text"] == "광합성 은"
+    assert found["words"][0]["box"] == [10.0, 20.0, 130.0, 80.0]
+
+
+def test_signature_is_bound_to_user_and_text(geometry):
+    signed = sign_geometry("a@x.com", TEXT, geometry)
+    assert verify_geometry("a@x.com", TEXT, signed)
+    assert not verify_geometry("b@x.com", TEXT, signed)
+    assert not verify_geometry("a@x.com", TEXT + " 수정", signed)
+    assert not verify_geometry("a@x.com", TEXT, {**signed, "scale": 1.0})
+    assert not verify_geometry("a@x.com", TEXT, geometry)
+
+
+def test_attach_geometry_prefers_store_then_signed_client(geometry):
+    signed = sign_geometry("a@x.com", TEXT, geometry)
+    pages = [{"original_text": TEXT, "geometry": signed}, {"original_text": "다른 페이지", "geometry": geometry}]
+
+    # 보관분이 없는 워커: 서명이 맞는 페이지만 저장, 서명은 빼고 저장
+    attached = attach_geometry(pages, None, "a@x.com")
+    assert attached[0]["geometry"] == geometry
+    assert "geometry" not in attached[1]
+
+    # 다른 사용자가 보낸 서명 geometry 는 버림
+    assert "geometry" not in attach_geometry(pages, None, "b@x.com")[0]
+
+    stored = [{"original_text": TEXT, "geometry": {**geometry, "scale": 0.25}}]
+    assert attach_geometry(pages, stored, "a@x.com")[0]["geometry"]["scale"] == 0.25
+
+
+def test_geometry_store_scopes_ids_to_owner():
+    store = GeometryStore(ttl=60, max_entries=1)
+    first = store.put("a@x.com", [{"original_text": TEXT}])
+    assert store.get("a@x.com", first) == [{"original_text": TEXT}]
+    assert store.get("b@x.com", first) is None
+    store.put("a@x.com", [])
+    assert store.get("a@x.com", first) is None
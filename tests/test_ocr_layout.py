@@ -0,0 +1,89 @@
+import numpy as np
+
+from service.ocr_layout_service import _synthetic_page, order_fields, reconstruct_page_layout, reconstruct_page_text
+
+
+def _field(text, x, y, width=None, height=30):
+    width = width if width is not None else 20 * len(text)
+    return {
+        "inferText": text,
+        "boundingPoly": {"vertices": [
+            {"x": x, "y": y}, {"x": x + width, "y": y},
+            {"x": x + width, "y": y + height}, {"x": x, "y": y + height},
+        ]},
+    }
+
+
+def _line(words, x, y):
+    fields = []
+    for word in words:
+        fields.append(_field(word, x, y))
+        x += 20 * len(word) + 12
+    return fields
+
+
+def test_margin_question_numbers_stay_on_their_lines():
+    questions = [
+        "다음 문장을 읽으시오",
+        "빈칸에 알맞은 말을 쓰시오",
+        "밑줄 친 부분의 뜻을 고르시오",
+        "글의 주제를 찾으시오",
+        "틀린 것을 모두 고르시오",
+    ]
+    fields = []
+    for i, question in enumerate(questions):
+        y = 100 + i * 60
+        fields.append(_field(f"{i + 1}.", 50, y, width=30))
+        fields += _line(question.split(), 150, y)
+
+    assert reconstruct_page_text(fields[::-1]) == "\n".join(
+        f"{i + 1}. {question}" for i, question in enumerate(questions)
+    )
+
+
+def test_two_column_page_reads_left_column_first():
+    left = [f"왼쪽{i} 단의 본문 내용이 이어지는 문장" for i in range(6)]
+    right = [f"오른쪽{i} 단의 본문 내용이 이어지는 문장" for i in range(6)]
+    fields = []
+    for i, (l_text, r_text) in enumerate(zip(left, right)):
+        y = 100 + i * 45
+        fields += _line(l_text.split(), 100, y)
+        fields += _line(r_text.split(), 900, y)
+
+    assert reconstruct_page_text(fields) == "\n".join(left + right)
+
+
+def test_heading_across_columns_keeps_single_column():
+    heading = "두 단을 가로지르는 아주 긴 제목 한 줄이 페이지 위쪽에 놓여 있어 빈 세로 띠가 생기지 않음"
+    fields = _line(heading.split(), 100, 40)
+    for i in range(4):
+        y = 100 + i * 45
+        fields += _line(["왼쪽", "단의", f"본문{i}", "문장"], 100, y)
+        fields += _line(["오른쪽", "단의", f"본문{i}", "문장"], 900, y)
+
+    lines = reconstruct_page_text(fields).split("\n")
+    assert lines == [heading] + [f"왼쪽 단의 본문{i} 문장 오른쪽 단의 본문{i} 문장" for i in range(4)]
+
+
+def test_synthetic_two_column_page_geometry_matches_text():
+    layout = reconstruct_page_layout(_synthetic_page(lines=8, words=25))
+    lines = layout["text"].split("\n")
+    assert len(lines) == 16
+    assert lines[0].startswith("c0l0w0") and lines[8].startswith("c1l0w0")
+
+
+def test_order_fields_line_numbers_and_reading_order():
+    # x0, y0, x1, y1 — 두 줄, 입력 순서는 뒤섞임 (같은 줄 안 세로 위치가 조금씩 다름)
+    rect = np.array([
+        [200, 100, 260, 130],
+        [100, 104, 160, 134],
+        [100, 150, 160, 180],
+        [300, 98, 360, 128],
+        [200, 152, 260, 182],
+    ], dtype=np.float64).T
+    order, lines = order_fields(rect)
+    assert order.tolist() == [1, 0, 3, 2, 4]
+    assert lines.tolist() == [0, 0, 0, 1, 1]
+
+    empty_order, empty_lines = order_fields(np.zeros((4, 0)))
+    assert empty_order.size == 0 and empty_lines.size == 0
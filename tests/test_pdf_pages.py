@@ -0,0 +1,21 @@
+import pytest
+
+from service.pdf_service import parse_page_selection
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("3", [2]),
+    ("1-3", [0, 1, 2]),
+    ("8-", [7, 8, 9]),
+    ("-2", [0, 1]),
+    ("1-3, 2, 10", [0, 1, 2, 9]),
+    ("5,,1", [0, 4]),
+])
+def test_parse_page_selection(spec, expected):
+    assert parse_page_selection(spec, 10) == expected
+
+
+@pytest.mark.parametrize("spec", ["", "a", "1-x", "0", "11", "5-3", "9-12", ","])
+def test_parse_page_selection_rejects_invalid(spec):
+    with pytest.raises(ValueError):
+        parse_page_selection(spec, 10)
@@ -0,0 +1,129 @@
+import time
+
+import pytest
+
+from service import resilience_service
+from service.resilience_service import (
+    CIRCUIT_CLOSED,
+    CIRCUIT_HALF_OPEN,
+    CIRCUIT_OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceededError,
+    Upstream,
+    UpstreamError,
+    retryable,
+)
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    monkeypatch.setattr(resilience_service.time, "sleep", lambda seconds: None)
+    up = Upstream("test", timeout=5, deadline=10)
+    up.retries = 2
+    up.backoff_base = 0.0
+    up.hedge = False
+    return up
+
+
+def test_retryable_classification():
+    assert retryable(UpstreamError("x", 503))
+    assert retryable(UpstreamError("x", 429))
+    assert not retryable(UpstreamError("x", 400))
+    assert retryable(TimeoutError())
+    assert retryable(ConnectionError())
+    assert not retryable(ValueError())
+
+
+def test_expired_deadline_fails_without_attempt(upstream):
+    calls = []
+    with pytest.raises(DeadlineExceededError):
+        upstream.call(lambda timeout: calls.append(timeout), deadline=0)
+    assert calls == []
+    assert upstream.stats()["deadline_exceeded"] == 1
+
+
+def test_attempt_timeout_never_exceeds_remaining_deadline(upstream):
+    timeouts = []
+    assert upstream.call(lambda timeout: timeouts.append(timeout) or "ok", deadline=1.5) == "ok"
+    assert 0 < timeouts[0] <= 1.5
+
+
+def test_retries_retryable_errors_then_succeeds(upstream):
+    attempts = []
+
+    def flaky(timeout):
+        attempts.append(timeout)
+        if len(attempts) < 3:
+            raise UpstreamError("test", 503)
+        return "ok"
+
+    assert upstream.call(flaky) == "ok"
+    stats = upstream.stats()
+    assert len(attempts) == 3 and stats["retries"] == 2
+    assert stats["circuit"]["state"] == CIRCUIT_CLOSED and stats["circuit"]["consecutive_failures"] == 0
+
+
+def test_non_retryable_error_is_raised_immediately(upstream):
+    attempts = []
+
+    def rejected(timeout):
+        attempts.append(timeout)
+        raise UpstreamError("test", 400)
+
+    with pytest.raises(UpstreamError):
+        upstream.call(rejected)
+    assert len(attempts) == 1
+    assert upstream.breaker.failures == 0
+
+
+def test_no_retry_when_backoff_would_pass_deadline(upstream, monkeypatch):
+    # 지터 없이 최대 대기(8초)를 고르도록 고정
+    monkeypatch.setattr(resilience_service.random, "uniform", lambda low, high: high)
+    upstream.backoff_base = 10.0
+    attempts = []
+
+    def failing(timeout):
+        attempts.append(timeout)
+        raise UpstreamError("test", 503)
+
+    with pytest.raises(DeadlineExceededError):
+        upstream.call(failing, deadline=resilience_service.MIN_ATTEMPT_SECONDS + 0.1)
+    assert len(attempts) == 1
+
+
+def test_breaker_opens_after_retries_exhaust_and_short_circuits(upstream):
+    upstream.breaker = CircuitBreaker(failure_threshold=3, reset_seconds=60)
+    attempts = []
+
+    def failing(timeout):
+        attempts.append(timeout)
+        raise UpstreamError("test", 502)
+
+    # 시도 3회 (재시도 2회) 모두 실패 → 연속 실패 3회로 서킷 열림
+    with pytest.raises(UpstreamError):
+        upstream.call(failing)
+    assert len(attempts) == 3 and upstream.breaker.state == CIRCUIT_OPEN
+
+    with pytest.raises(CircuitOpenError):
+        upstream.call(failing)
+    assert len(attempts) == 3
+
+
+def test_breaker_half_open_allows_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+    breaker.failure()
+    breaker.opened_at = time.time() - 61
+
+    breaker.allow()
+    assert breaker.state == CIRCUIT_HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+    # 시험 호출 실패 → 다시 열림, 성공 → 닫힘
+    breaker.failure()
+    assert breaker.state == CIRCUIT_OPEN
+    breaker.opened_at = time.time() - 61
+    breaker.allow()
+    breaker.success()
+    assert breaker.state == CIRCUIT_CLOSED
@@ -0,0 +1,42 @@
+import importlib
+import sys
+
+import pytest
+
+
+def _reload(monkeypatch, module, **env):
+    for key, value in env.items():
+        monkeypatch.setenv(key, value)
+    sys.modules.pop(module, None)
+    return importlib.import_module(module)
+
+
+@pytest.fixture(autouse=True)
+def restore_modules():
+    saved = {name: sys.modules.get(name) for name in ("service.points_service", "service.study_session_service")}
+    yield
+    for name, module in saved.items():
+        if module is None:
+            sys.modules.pop(name, None)
+        else:
+            sys.modules[name] = module
+
+
+def test_missing_service_key_fails_at_startup(monkeypatch):
+    # conftest 의 core.database 는 supabase_service=None (키 없음)
+    with pytest.raises(RuntimeError, match="SUPABASE_SERVICE_ROLE_KEY"):
+        _reload(monkeypatch, "service.points_service", POINTS_RPC_ENABLED="1")
+    _reload(monkeypatch, "service.points_service", POINTS_RPC_ENABLED="0")
+    with pytest.raises(RuntimeError, match="SUPABASE_SERVICE_ROLE_KEY"):
+        _reload(monkeypatch, "service.study_session_service", STUDY_SESSION_RPC_ENABLED="1")
+
+
+def test_legacy_path_and_score_check_when_rpc_disabled(monkeypatch):
+    _reload(monkeypatch, "service.points_service", POINTS_RPC_ENABLED="0")
+    study = _reload(monkeypatch, "service.study_session_service", STUDY_SESSION_RPC_ENABLED="0")
+    row = {"subject_name": "", "study_name": "", "user_answers": [], "answers": [], "ocr_text": {}, "quiz_html": {}}
+    assert study.record_study_session("a@x.com", row, 3, 5, 6, "채점") is None
+    with pytest.raises(study.StudySessionError):
+        study.record_study_session("a@x.com", row, 6, 5, 12, "채점")
+    with pytest.raises(study.StudySessionError):
+        study.record_study_session("a@x.com", row, 3, 5, 100, "채점")